@@ -1,19 +1,167 @@
-from flask import Flask, render_template
+import hmac
+import logging
+import os
+
+from flask import Flask, Response, render_template, request, jsonify
 from projects.irrigation_projects1.routes import irrigation1_bp
 from projects.irrigation_projects2.routes import irrigation2_bp
 from projects.irrigation_projects3.routes import irrigation3_bp
+from projects.api import api_bp
+from projects.dataset_cache import dataset_cache
+from projects.datasets import DATASETS
+from projects.snapshots import build_snapshot
+from projects.adapters import read_options
+from projects.render_cache import map_cache
+from projects.spatial_index import spatial_indexes
+from projects.search_index import search_index
+from projects.warmup import warm_up, readiness
+from projects.http_cache import conditional_page, page_cache
+from projects.metrics import init_metrics, exposition
+from projects.assets import assets, init_assets
+from projects.precompute import precomputed
+from projects.sources import source_files, source_frames
+from projects.watcher import data_watcher
+from projects.reports import extract_reports, report_index
+from projects.compare import comparisons, DEFAULT_BEFORE, DEFAULT_AFTER
 
 app = Flask(__name__)
 
+# Shared secret for POST /api/cache/invalidate, sent as X-Cache-Token; the
+# endpoint is refused while it is unset
+app.config['CACHE_ADMIN_TOKEN'] = os.environ.get('CACHE_ADMIN_TOKEN')
+
 # Register Blueprints for each team member’s dashboard
 app.register_blueprint(irrigation1_bp)
 app.register_blueprint(irrigation2_bp)
 app.register_blueprint(irrigation3_bp)
 
+# JSON data API shared by all dashboards
+app.register_blueprint(api_bp)
+
+# Server-Timing headers, /metrics histograms and the ?profile=1 hook
+init_metrics(app)
+
+# Shared dashboard CSS / JS as fingerprinted bundles under /assets
+init_assets(app)
+
 # Home page with tabs
 @app.route('/')
+@conditional_page()
 def home():
     return render_template('home_tabs.html')
 
+# Dataset / source file, rendered-map / page, spatial / search index,
+# precomputed dashboard and comparison counters (per worker process)
+@app.route('/api/cache')
+def cache_stats():
+    return jsonify({'datasets': dataset_cache.stats(), 'sources': source_frames.stats(),
+                    'maps': map_cache.stats(), 'pages': page_cache.stats(),
+                    'spatial': spatial_indexes.stats(), 'search': search_index.stats(),
+                    'precompute': precomputed.stats(), 'watcher': data_watcher.stats(),
+                    'reports': report_index.stats(), 'compare': comparisons.stats(),
+                    'assets': assets.stats()})
+
+# Drop cached frames so the next request re-reads the workbook(s);
+# rendered maps / pages, spatial / search indexes, precomputed dashboards
+# and dataset comparisons are keyed by data version, so they are cleared as well
+def invalidate_caches(path=None):
+    dropped = dataset_cache.invalidate(path)
+    source_frames.clear()
+    map_cache.clear()
+    page_cache.clear()
+    spatial_indexes.clear()
+    search_index.clear()
+    precomputed.clear()
+    report_index.clear()
+    comparisons.clear()
+    return dropped
+
+
+# Every worker re-parses the workbooks afterwards, so only callers holding
+# CACHE_ADMIN_TOKEN may trigger it
+@app.route('/api/cache/invalidate', methods=['POST'])
+def cache_invalidate():
+    token = app.config.get('CACHE_ADMIN_TOKEN')
+    sent = request.headers.get('X-Cache-Token', '')
+    if not token or not hmac.compare_digest(sent.encode(), token.encode()):
+        return jsonify({'error': 'cache invalidation needs a valid X-Cache-Token'}), 403
+    dropped = invalidate_caches(request.args.get('path'))
+    return jsonify({'invalidated': dropped, 'datasets': dataset_cache.stats(), 'maps': map_cache.stats()})
+
+# Prometheus text: per-route stage latency, response size and row count
+# histograms plus cache hit / miss counters (per worker process)
+@app.route('/metrics')
+def metrics():
+    caches = {'datasets': dataset_cache.stats(), 'sources': source_frames.stats(),
+              'maps': map_cache.stats(), 'pages': page_cache.stats(),
+              'spatial': spatial_indexes.stats(), 'search': search_index.stats(),
+              'precompute': precomputed.stats()}
+    return Response(exposition(caches), mimetype='text/plain; version=0.0.4')
+
+# Readiness probe: 503 while warmup is still running in this process; reports
+# the worker's pid and resident / shared / private memory either way
+@app.route('/api/ready')
+def ready():
+    status = readiness()
+    return jsonify(status), 200 if status['ready'] else 503
+
+# flask --app app warmup
+# Load every dataset and render the dashboards once, printing the timings
+@app.cli.command('warmup')
+def warmup():
+    stats = warm_up(app)
+    for name, info in stats['datasets'].items():
+        if 'error' in info:
+            print(f"{name}: failed ({info['error']})")
+        else:
+            print(f"{name}: {info['rows']} rows in {info['seconds']}s")
+    for url, info in stats['dashboards'].items():
+        print(f"{url}: HTTP {info['status']} in {info['seconds']}s")
+    print(f"warmup: {stats['seconds']}s")
+
+# flask --app app build-snapshots
+# Compile every registered workbook (each file of a multi-file dataset) into
+# a columnar snapshot for fast cold start
+@app.cli.command('build-snapshots')
+def build_snapshots():
+    for name, dataset in DATASETS.items():
+        options = read_options(dataset['schema']) if dataset['schema'] else None
+        for source in source_files(dataset['path']):
+            try:
+                path, rows = build_snapshot(source, dataset['normalize'], options)
+                print(f"{name}: {rows} rows -> {path}")
+            except Exception as e:
+                print(f"{name}: {source} failed ({e})")
+
+# flask --app app build-assets
+# Write the fingerprinted bundles (plus .gz / .br) to static/assets so a
+# front proxy can serve them without reaching the app
+@app.cli.command('build-assets')
+def build_assets():
+    for path, size in assets.write():
+        print(f"{os.path.relpath(path)}: {size} bytes")
+
+# flask --app app extract-reports
+# Extract the page text of every PDF in static/reports (cached by content
+# hash) for /api/reports/search and the project -> report page links
+@app.cli.command('extract-reports')
+def extract_reports_command():
+    reports, seconds = extract_reports()
+    for report in reports:
+        print(f"{report['file']}: {report['status']}")
+    print(f"extracted in {seconds}s")
+
+# Projects matched between two datasets: status transitions, amount and
+# hectare changes. The page is a static shell; its summary and rows come
+# from /api/compare with the page's query string.
+@app.route('/compare')
+@conditional_page()
+def compare():
+    return render_template('compare.html', datasets={name: d['title'] for name, d in DATASETS.items()},
+                           before=DEFAULT_BEFORE, after=DEFAULT_AFTER)
+
 if __name__ == '__main__':
+    # Changed workbooks are picked up by the data watcher (refreshes logged)
+    logging.basicConfig(level=logging.INFO)
+    data_watcher.start()
     app.run(debug=True)
@@ -0,0 +1,530 @@
+// Shared dashboard behaviour: the project list, map zoom and the server-side
+// data table. Each template defines TABLE_API, EXPORT_API, PROJECTS_API and
+// TABLE_COLUMNS inline before this bundle and may override functions after it.
+
+let currentFilter = 'all';
+let currentPage = 1;
+let entriesPerPage = 25;
+let sortColumn = -1;
+let sortAscending = true;
+
+let totalEntries = 0;
+let tableSearch = '';
+let sortKey = '';
+let searchTimer = null;
+
+// Project list paging (see loadProjects)
+const PROJECTS_PAGE_SIZE = 100;
+let projectsPage = 0;
+let projectsPages = 1;
+let projectsLoading = false;
+let projectsRequest = 0;
+let projectsTimer = null;
+
+// Initialize table data
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('#projectsTable thead th').forEach((header, index) => {
+        header.style.cursor = 'pointer';
+        header.addEventListener('click', () => sortTable(index));
+    });
+    loadTablePage();
+
+    // Next page of the project list when its end scrolls into view
+    const projectsList = document.getElementById('projectsList');
+    projectsList.addEventListener('scroll', () => {
+        if (projectsList.scrollTop + projectsList.clientHeight >= projectsList.scrollHeight - 200) {
+            loadProjects(false);
+        }
+    });
+    loadProjects(true);
+});
+
+// Fetch the current page (keeps the page's own query filters, e.g. dam_type)
+function loadTablePage() {
+    if (!TABLE_COLUMNS.length) return;
+    const params = new URLSearchParams(window.location.search);
+    params.set('page', currentPage);
+    params.set('size', entriesPerPage);
+    if (sortKey) params.set('sort', sortKey);
+    if (tableSearch) params.set('q', tableSearch);
+
+    fetch(`${TABLE_API}?${params.toString()}`)
+        .then(response => response.json())
+        .then(renderTablePage)
+        .catch(() => {
+            document.getElementById('paginationInfo').textContent = 'Could not load table data';
+        });
+}
+
+// Download the whole table as filtered / searched / sorted right now
+function exportTable(format) {
+    const params = new URLSearchParams(window.location.search);
+    params.set('format', format);
+    if (sortKey) params.set('sort', sortKey);
+    if (tableSearch) params.set('q', tableSearch);
+    window.location.href = `${EXPORT_API}?${params.toString()}`;
+}
+
+function renderTablePage(data) {
+    const tbody = document.getElementById('tableBody');
+    tbody.innerHTML = '';
+    data.rows.forEach(row => {
+        const tr = document.createElement('tr');
+        row.forEach(value => {
+            const td = document.createElement('td');
+            td.textContent = value === null ? '' : value;
+            tr.appendChild(td);
+        });
+        tbody.appendChild(tr);
+    });
+    totalEntries = data.filtered;
+    currentPage = data.page;
+    updatePagination();
+}
+
+// Search table (debounced, searched on the server)
+function searchTable() {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+        tableSearch = document.getElementById('tableSearchInput').value.trim();
+        currentPage = 1;
+        loadTablePage();
+    }, 250);
+}
+
+// Change entries per page
+function changeEntriesPerPage() {
+    entriesPerPage = parseInt(document.getElementById('entriesPerPage').value);
+    currentPage = 1;
+    loadTablePage();
+}
+
+// Sort table
+function sortTable(columnIndex) {
+    const headers = document.querySelectorAll('#projectsTable thead th');
+
+    // Toggle sort direction if same column
+    if (sortColumn === columnIndex) {
+        sortAscending = !sortAscending;
+    } else {
+        sortColumn = columnIndex;
+        sortAscending = true;
+    }
+
+    // Update header classes
+    headers.forEach((header, index) => {
+        header.classList.remove('sort-asc', 'sort-desc');
+        if (index === columnIndex) {
+            header.classList.add(sortAscending ? 'sort-asc' : 'sort-desc');
+        }
+    });
+
+    sortKey = (sortAscending ? '' : '-') + TABLE_COLUMNS[columnIndex];
+    currentPage = 1;
+    loadTablePage();
+}
+
+function goToPage(page) {
+    currentPage = page;
+    loadTablePage();
+}
+
+// Update pagination
+function updatePagination() {
+    const paginationInfo = document.getElementById('paginationInfo');
+    const paginationButtons = document.getElementById('paginationButtons');
+
+    // Calculate pagination
+    const totalPages = Math.ceil(totalEntries / entriesPerPage);
+    const startIndex = (currentPage - 1) * entriesPerPage;
+    const endIndex = Math.min(startIndex + entriesPerPage, totalEntries);
+
+    // Update info
+    if (totalEntries === 0) {
+        paginationInfo.textContent = 'No entries to show';
+    } else {
+        paginationInfo.textContent = `Showing ${startIndex + 1} to ${endIndex} of ${totalEntries} entries`;
+    }
+
+    // Update buttons
+    paginationButtons.innerHTML = '';
+
+    if (totalPages > 1) {
+        // Previous button
+        const prevBtn = document.createElement('button');
+        prevBtn.className = 'pagination-btn';
+        prevBtn.textContent = '← Previous';
+        prevBtn.disabled = currentPage === 1;
+        prevBtn.onclick = () => {
+            if (currentPage > 1) goToPage(currentPage - 1);
+        };
+        paginationButtons.appendChild(prevBtn);
+
+        // Page numbers
+        const maxButtons = 5;
+        let startPage = Math.max(1, currentPage - Math.floor(maxButtons / 2));
+        let endPage = Math.min(totalPages, startPage + maxButtons - 1);
+
+        if (endPage - startPage < maxButtons - 1) {
+            startPage = Math.max(1, endPage - maxButtons + 1);
+        }
+
+        if (startPage > 1) {
+            const firstBtn = document.createElement('button');
+            firstBtn.className = 'pagination-btn';
+            firstBtn.textContent = '1';
+            firstBtn.onclick = () => goToPage(1);
+            paginationButtons.appendChild(firstBtn);
+
+            if (startPage > 2) {
+                const dots = document.createElement('span');
+                dots.textContent = '...';
+                dots.style.padding = '0 0.5rem';
+                dots.style.color = 'rgba(255, 255, 255, 0.5)';
+                paginationButtons.appendChild(dots);
+            }
+        }
+
+        for (let i = startPage; i <= endPage; i++) {
+            const pageBtn = document.createElement('button');
+            pageBtn.className = 'pagination-btn' + (i === currentPage ? ' active' : '');
+            pageBtn.textContent = i;
+            pageBtn.onclick = () => goToPage(i);
+            paginationButtons.appendChild(pageBtn);
+        }
+
+        if (endPage < totalPages) {
+            if (endPage < totalPages - 1) {
+                const dots = document.createElement('span');
+                dots.textContent = '...';
+                dots.style.padding = '0 0.5rem';
+                dots.style.color = 'rgba(255, 255, 255, 0.5)';
+                paginationButtons.appendChild(dots);
+            }
+
+            const lastBtn = document.createElement('button');
+            lastBtn.className = 'pagination-btn';
+            lastBtn.textContent = totalPages;
+            lastBtn.onclick = () => goToPage(totalPages);
+            paginationButtons.appendChild(lastBtn);
+        }
+
+        // Next button
+        const nextBtn = document.createElement('button');
+        nextBtn.className = 'pagination-btn';
+        nextBtn.textContent = 'Next →';
+        nextBtn.disabled = currentPage === totalPages;
+        nextBtn.onclick = () => {
+            if (currentPage < totalPages) goToPage(currentPage + 1);
+        };
+        paginationButtons.appendChild(nextBtn);
+    }
+}
+
+// Tab switching
+function showTab(tab) {
+    const mapView = document.getElementById('mapView');
+    const tableView = document.getElementById('tableView');
+    const navLinks = document.querySelectorAll('.nav-link');
+
+    navLinks.forEach(link => link.classList.remove('active'));
+
+    if (tab === 'map') {
+        mapView.style.display = 'flex';
+        tableView.classList.remove('active');
+        navLinks[0].classList.add('active');
+    } else {
+        mapView.style.display = 'none';
+        tableView.classList.add('active');
+        navLinks[1].classList.add('active');
+    }
+}
+
+// Filter by status
+function filterByStatus(status) {
+    currentFilter = status;
+
+    document.querySelectorAll('.filter-btn').forEach(btn => {
+        btn.classList.remove('active');
+    });
+    event.target.classList.add('active');
+
+    filterProjects();
+}
+
+// Filter projects (searched on the server, debounced)
+function filterProjects() {
+    clearTimeout(projectsTimer);
+    projectsTimer = setTimeout(() => loadProjects(true), 250);
+}
+
+// Dashboard-specific list filters (irrigation3 adds its dam type / length)
+function projectFilters(params) {}
+
+// The page's own query filters plus the search box and status button
+function projectParams(page) {
+    const params = new URLSearchParams(window.location.search);
+    const searchTerm = document.getElementById('searchInput').value.trim();
+    if (searchTerm) params.set('q', searchTerm);
+    if (currentFilter !== 'all') params.append('status', currentFilter);
+    projectFilters(params);
+    params.set('page', page);
+    params.set('size', PROJECTS_PAGE_SIZE);
+    return params;
+}
+
+// Project list: fetched from PROJECTS_API a page at a time, so the page
+// itself carries no per-project markup. reset starts again from page 1.
+function loadProjects(reset) {
+    if (reset) {
+        projectsRequest++;
+        projectsPage = 0;
+        projectsPages = 1;
+    } else if (projectsLoading || projectsPage >= projectsPages) {
+        return;
+    }
+    const request = projectsRequest;
+    projectsLoading = true;
+
+    fetch(`${PROJECTS_API}?${projectParams(projectsPage + 1).toString()}`)
+        .then(response => response.json())
+        .then(data => {
+            if (request !== projectsRequest) return;  // superseded by a newer search
+            const projectsList = document.getElementById('projectsList');
+            if (reset) {
+                projectsList.innerHTML = '';
+                projectsList.scrollTop = 0;
+            }
+            data.projects.forEach(project => projectsList.appendChild(renderProject(project)));
+            projectsPage = data.page;
+            projectsPages = data.pages;
+            updateProjectCount(data.filtered);
+        })
+        .catch(() => {
+            document.getElementById('projectCount').textContent = 'Could not load projects';
+        })
+        .finally(() => {
+            if (request === projectsRequest) projectsLoading = false;
+        });
+}
+
+const STATUS_COLORS = {
+    'Completed': '#10b981',
+    'Ongoing': '#f59e0b',
+    'Planned': '#6366f1',
+    'Under Construction': '#f97316',
+    'Approved': '#8b5cf6'
+};
+
+function statusColor(status) {
+    return STATUS_COLORS[status] || '#6b7280';
+}
+
+// Text shown for a project (amounts in crore, hectares rounded)
+function formatProject(project) {
+    return {
+        status: project.status,
+        amount: `₹${Number(project.amount || 0).toFixed(1)}Cr`,
+        hectares: `${Number(project.hectares || 0).toFixed(0)} Ha`,
+        region: project.region
+    };
+}
+
+function metaItem(icon, text) {
+    const item = document.createElement('span');
+    item.className = 'project-meta-item';
+    const i = document.createElement('i');
+    i.className = `fas ${icon}`;
+    item.append(i, ` ${text}`);
+    return item;
+}
+
+// One .project-item; every value goes in as text, never as markup
+function renderProject(project) {
+    const text = formatProject(project);
+    const item = document.createElement('div');
+    item.className = 'project-item';
+    item.style.setProperty('--status-color', statusColor(project.status));
+    item.onclick = () => selectProject(item, project.lat, project.lng);
+
+    const name = document.createElement('div');
+    name.className = 'project-name';
+    name.textContent = project.name;
+
+    const meta = document.createElement('div');
+    meta.className = 'project-meta';
+    const badge = document.createElement('span');
+    badge.className = 'status-badge';
+    badge.textContent = text.status;
+    meta.append(badge, metaItem('fa-rupee-sign', text.amount), metaItem('fa-seedling', text.hectares));
+
+    const place = document.createElement('div');
+    place.className = 'project-meta';
+    place.style.marginTop = '0.4rem';
+    place.append(metaItem('fa-map-marker-alt', text.region));
+
+    item.append(name, meta, place);
+    return item;
+}
+
+function updateProjectCount(count) {
+    document.getElementById('projectCount').textContent =
+        `Showing ${count} project${count !== 1 ? 's' : ''}`;
+
+    const projectsList = document.getElementById('projectsList');
+    let noResultsMsg = document.getElementById('noResultsMsg');
+
+    if (count === 0) {
+        if (!noResultsMsg) {
+            noResultsMsg = document.createElement('div');
+            noResultsMsg.id = 'noResultsMsg';
+            noResultsMsg.className = 'no-results';
+            noResultsMsg.innerHTML = `
+                <i class="fas fa-search"></i>
+                <p>No projects found matching your criteria</p>
+            `;
+            projectsList.appendChild(noResultsMsg);
+        }
+    } else if (noResultsMsg) {
+        noResultsMsg.remove();
+    }
+}
+
+// Select project and zoom to location
+function selectProject(element, lat, lng) {
+    document.querySelectorAll('.project-item').forEach(item => {
+        item.classList.remove('selected');
+    });
+
+    element.classList.add('selected');
+    element.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+
+    if (lat == null || lng == null) {
+        showNotification('Project has no coordinates to show on map.');
+        return;
+    }
+
+    // Zoom to project location on map
+    zoomToLocation(lat, lng);
+}
+
+// Function to zoom and center map on Folium
+function zoomToLocation(lat, lng) {
+    try {
+        // Get all iframes in the map div
+        const mapDiv = document.querySelector('#map');
+        const iframe = mapDiv.querySelector('iframe');
+
+        if (iframe) {
+            // Access the iframe's window
+            const iframeWindow = iframe.contentWindow;
+
+            // Send a message to the iframe to zoom to location
+            // This works by injecting a script into the iframe
+            const script = iframe.contentDocument.createElement('script');
+            script.textContent = `
+                (function() {
+                    // Wait for map to be available
+                    var checkMap = setInterval(function() {
+                        // Try to find the Leaflet map object
+                        if (typeof L !== 'undefined') {
+                            // Get all map instances
+                            var maps = [];
+                            for (var key in window) {
+                                if (window[key] instanceof L.Map) {
+                                    maps.push(window[key]);
+                                }
+                            }
+
+                            // If we found a map, zoom to it
+                            if (maps.length > 0) {
+                                var map = maps[0];
+                                map.setView([${lat}, ${lng}], 13, {
+                                    animate: true,
+                                    duration: 1
+                                });
+
+                                // Try to open the popup for this location: click the
+                                // marker, which opens a bound popup and fetches it
+                                // first for lazy (GeoJSON) and bulk markers. Lazy
+                                // markers only exist once the new view's points
+                                // have loaded, so look again for a few seconds.
+                                var tries = 0;
+                                var opener = setInterval(function() {
+                                    var opened = false;
+                                    map.eachLayer(function(layer) {
+                                        if (!opened && (layer instanceof L.CircleMarker || layer instanceof L.Marker)) {
+                                            var latlng = layer.getLatLng();
+                                            if (latlng && Math.abs(latlng.lat - ${lat}) < 0.001 && 
+                                                Math.abs(latlng.lng - ${lng}) < 0.001) {
+                                                layer.fire('click', {latlng: latlng}, true);
+                                                opened = true;
+                                            }
+                                        }
+                                    });
+                                    if (opened || ++tries >= 10) clearInterval(opener);
+                                }, 400);
+
+                                clearInterval(checkMap);
+                            }
+                        }
+                    }, 100);
+
+                    // Stop trying after 5 seconds
+                    setTimeout(function() {
+                        clearInterval(checkMap);
+                    }, 5000);
+                })();
+            `;
+
+            // Inject the script
+            if (iframe.contentDocument && iframe.contentDocument.body) {
+                iframe.contentDocument.body.appendChild(script);
+            }
+
+            // Show notification
+            showNotification(`Zooming to project location`);
+        } else {
+            showNotification(`Selected project at coordinates: ${lat.toFixed(4)}, ${lng.toFixed(4)}`);
+        }
+    } catch (error) {
+        console.log('Map zoom attempted:', lat, lng, error);
+        showNotification(`Selected project - Location: ${lat.toFixed(4)}, ${lng.toFixed(4)}`);
+    }
+}
+
+// Show notification
+function showNotification(message) {
+    // Remove existing notification
+    const existingNotification = document.querySelector('.notification-toast');
+    if (existingNotification) {
+        existingNotification.remove();
+    }
+
+    const notification = document.createElement('div');
+    notification.className = 'notification-toast';
+    notification.style.cssText = `
+        position: fixed;
+        top: 100px;
+        right: 2rem;
+        background: linear-gradient(135deg, #6366f1, #a855f7);
+        color: white;
+        padding: 1rem 1.5rem;
+        border-radius: 12px;
+        box-shadow: 0 8px 24px rgba(99, 102, 241, 0.4);
+        z-index: 10000;
+        font-size: 0.9rem;
+        max-width: 300px;
+        animation: slideInRight 0.3s ease-out;
+    `;
+    notification.innerHTML = `
+        <i class="fas fa-map-marker-alt" style="margin-right: 0.5rem;"></i>
+        ${message}
+    `;
+    document.body.appendChild(notification);
+
+    setTimeout(() => {
+        notification.style.animation = 'slideOutRight 0.3s ease-out';
+        setTimeout(() => notification.remove(), 300);
+    }, 3000);
+}
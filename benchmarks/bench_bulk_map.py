@@ -0,0 +1,70 @@
+# Map documents with every marker inline: folium's CircleMarker + Popup per
+# row (MAP_MODE = 'markers') vs one packed data array drawn on a canvas
+# (MAP_MODE = 'bulk', projects/geo.py BulkPoints), on synthetic rows.
+# Reports server render time, document size (raw / gzip) and, when node is
+# installed, the time to parse the document's scripts as a stand-in for the
+# browser's JS parse cost.
+#
+#   python -m benchmarks.bench_bulk_map [--sizes 1000,10000,50000] [--dataset irrigation1]
+import argparse
+import gzip
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from benchmarks.synthetic import make_irr1, make_irr2, make_irr3
+from projects.adapters import adapt
+from projects.snapshots import coerce_columns
+from projects import app_original as irr1
+from projects.irrigation_projects2 import routes as irr2
+from projects.irrigation_projects3 import routes as irr3
+
+DATASETS = {
+    'irrigation1': (make_irr1, irr1),
+    'irrigation2': (make_irr2, irr2),
+    'irrigation3': (make_irr3, irr3),
+}
+SCRIPT_RE = re.compile(r'<script>(.*?)</script>', re.S)
+
+
+# Seconds node takes to parse the inline scripts, minus its start-up time
+def parse_seconds(document, node, baseline):
+    with tempfile.NamedTemporaryFile('w', suffix='.js', delete=False) as f:
+        f.write('\n'.join(SCRIPT_RE.findall(document)))
+    try:
+        start = time.perf_counter()
+        subprocess.run([node, '--check', f.name], check=True)
+        return max(time.perf_counter() - start - baseline, 0.0)
+    finally:
+        os.unlink(f.name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,50000')
+    parser.add_argument('--dataset', choices=list(DATASETS), default='irrigation1')
+    args = parser.parse_args()
+
+    make, module = DATASETS[args.dataset]
+    node = shutil.which('node')
+    baseline = parse_seconds('', node, 0.0) if node else None
+
+    print(f"{args.dataset}: {'rows':>7} {'mode':<8} {'render (s)':>11} {'size (KB)':>10} "
+          f"{'gzip (KB)':>10} {'parse (s)':>10}")
+    for size in [int(n) for n in args.sizes.split(',')]:
+        frames = adapt(coerce_columns(module.normalize_data(make(size))), module.SCHEMA).with_coords()
+        for mode, render in (('markers', module.create_map), ('bulk', module.create_bulk_map)):
+            start = time.perf_counter()
+            document = render(frames)
+            seconds = time.perf_counter() - start
+            raw = document.encode('utf-8')
+            parse = f"{parse_seconds(document, node, baseline):>10.2f}" if node else f"{'-':>10}"
+            print(f"{'':<{len(args.dataset) + 1}} {len(frames):>7} {mode:<8} {seconds:>11.2f} "
+                  f"{len(raw) / 1024:>10.0f} {len(gzip.compress(raw)) / 1024:>10.0f} {parse}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# /api/<dataset>/export on a synthetic irrigation1 table: the chunked
+# streams in projects/export.py vs building the whole body first
+# (to_dict(orient='records') + json, to_csv of the full frame). Reports time
+# to the first byte and total time; --memory adds a second, traced pass for
+# peak memory (slow, tracemalloc sees every small allocation).
+#
+#   python -m benchmarks.bench_export [--rows 100000] [--memory]
+import argparse
+import json
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_irr1
+from projects.snapshots import coerce_columns
+from projects.adapters import adapt
+from projects.export import csv_stream, ndjson_stream, xlsx_stream
+from projects import app_original as irr1
+
+
+# --- Whole-body reference ---
+def csv_body(df):
+    yield df.to_csv(index=False)
+
+
+def ndjson_body(df):
+    yield '\n'.join(json.dumps(row, default=str) for row in df.to_dict(orient='records')) + '\n'
+
+
+def timed(stream, df):
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for piece in stream(df):
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(piece)
+    return first, time.perf_counter() - start, size
+
+
+def peak_memory(stream, df):
+    tracemalloc.start()
+    for _ in stream(df):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--memory', action='store_true')
+    args = parser.parse_args()
+
+    df = adapt(coerce_columns(irr1.normalize_data(make_irr1(args.rows))), irr1.SCHEMA).table
+    print(f"{len(df)} rows x {len(df.columns)} columns")
+    print(f"{'export':<18} {'first byte (ms)':>16} {'total (s)':>10} {'size (MB)':>10}"
+          + (f" {'peak (MB)':>10}" if args.memory else ''))
+    for name, stream in [('csv whole', csv_body), ('csv streamed', csv_stream),
+                         ('ndjson whole', ndjson_body), ('ndjson streamed', ndjson_stream),
+                         ('xlsx write-only', xlsx_stream)]:
+        first, total, size = timed(stream, df)
+        line = f"{name:<18} {first * 1000:>16.1f} {total:>10.2f} {size / 2**20:>10.1f}"
+        if args.memory:
+            line += f" {peak_memory(stream, df) / 2**20:>10.1f}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Query-string filters on synthetic irrigation3 frames: the bitmap / sorted
+# array engine in projects/filters.py vs the per-request column scans it
+# replaced (str.lower().str.contains() and range masks over every row).
+#
+#   python -m benchmarks.bench_filters [--rows 200000] [--repeat 20]
+import argparse
+import time
+
+import numpy as np
+from werkzeug.datastructures import MultiDict
+
+from benchmarks.synthetic import make_irr3
+from projects.snapshots import coerce_columns
+from projects.adapters import adapt
+from projects.filters import parse_filters
+from projects.irrigation_projects3 import routes as irr3
+
+QUERIES = [
+    ('dam type', {'dam_type': 'earth'}),
+    ('type + bucket', {'dam_type': 'gravity', 'dam_length': '1000-2000'}),
+    ('status OR district', {'or': 'status:completed|district:mysuru,mandya'}),
+    ('amount range', {'amount__min': '20', 'amount__max': '60'}),
+    ('all of them', {'dam_type': 'masonry', 'status': 'ongoing,planned',
+                     'amount__min': '10', 'dam_length__max': '3000'}),
+]
+
+
+# --- Column scans (reference) ---
+def scan_mask(fields, args):
+    mask = np.ones(len(fields), dtype=bool)
+    for name, value in args.items():
+        if name == 'dam_type':
+            mask &= fields['type'].str.lower().str.contains(value, regex=False).to_numpy()
+        elif name == 'dam_length':
+            mask &= (fields['length_bucket'] == value).to_numpy()
+        elif name == 'or':
+            either = np.zeros(len(fields), dtype=bool)
+            for clause in value.split('|'):
+                field, _, values = clause.partition(':')
+                either |= fields[field].str.strip().str.lower().isin(values.split(',')).to_numpy()
+            mask &= either
+        elif name.endswith('__min'):
+            mask &= (fields[name[:-5]] >= float(value)).to_numpy()
+        elif name.endswith('__max'):
+            mask &= (fields[name[:-5]] <= float(value)).to_numpy()
+        else:
+            mask &= fields[name].str.strip().str.lower().isin(value.split(',')).to_numpy()
+    return mask
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    frames = adapt(coerce_columns(irr3.normalize_data(make_irr3(args.rows))), irr3.SCHEMA)
+    print(f"{args.rows} rows, loaded + indexed in {time.perf_counter() - start:.2f}s")
+
+    index = frames.filter_index
+    print(f"{'query':<20} {'scan (ms)':>10} {'bitmap (ms)':>12} {'speedup':>8} {'rows':>8}")
+    for name, params in QUERIES:
+        scan_time, expected = timed(lambda: scan_mask(frames.fields, params), args.repeat)
+        query_args = MultiDict(params)
+        bitmap_time, got = timed(
+            lambda: index.mask(parse_filters(query_args, index, irr3.FILTER_ALIASES)), args.repeat)
+        assert (expected == got).all(), name
+        print(f"{name:<20} {scan_time * 1000:>10.2f} {bitmap_time * 1000:>12.2f} "
+              f"{scan_time / bitmap_time:>7.0f}x {int(got.sum()):>8}")
+
+
+if __name__ == '__main__':
+    main()
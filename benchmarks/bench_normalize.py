@@ -0,0 +1,61 @@
+# Status / number normalization on large columns with few distinct values:
+# per-row .apply (the old way) vs the factorize + lookup engine in
+# projects/normalize.py, whose cost follows the number of distinct values.
+#
+#   python -m benchmarks.bench_normalize [--rows 1000000] [--distinct 50]
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from projects.irrigation_projects2.routes import STATUS
+from projects.normalize import digits_series, numbers_sum_series, sum_of_numbers, digits_number
+
+STATUSES = ['Completed', 'Nearly completed', 'Under progress', 'Ongoing work', 'Approved',
+            'Planned', 'Under construction', 'Work in progress', '-']
+
+
+def make_columns(rows, distinct, seed=5):
+    rng = random.Random(seed)
+    statuses = [f'{rng.choice(STATUSES)} {i % 7 or ""}'.strip() for i in range(distinct)]
+    amounts = [f'{rng.randint(100, 900)}-{rng.randint(1000, 2000)} ha' for _ in range(distinct)]
+    lengths = [f'{rng.randint(100, 5000):,} m' for _ in range(distinct)]
+    pick = [rng.randrange(distinct) for _ in range(rows)]
+    return (pd.Series([statuses[i] for i in pick], dtype='str'),
+            pd.Series([amounts[i] for i in pick], dtype='str'),
+            pd.Series([lengths[i] for i in pick], dtype='str'))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--distinct', type=int, default=50)
+    args = parser.parse_args()
+
+    status, amount, length = make_columns(args.rows, args.distinct)
+    cases = [
+        ('status -> color', lambda: status.apply(lambda s: STATUS._color(STATUS._canonical(s))),
+         lambda: STATUS.color_series(STATUS.canonical_series(status))),
+        ('sum of numbers', lambda: amount.apply(sum_of_numbers.__wrapped__),
+         lambda: numbers_sum_series(amount)),
+        ('digits number', lambda: length.apply(digits_number.__wrapped__),
+         lambda: digits_series(length)),
+    ]
+
+    print(f"{args.rows} rows, {args.distinct} distinct values")
+    print(f"{'column':<16} {'per row (ms)':>13} {'engine (ms)':>12} {'speedup':>8}")
+    for name, per_row, engine in cases:
+        before = timed(per_row) * 1000
+        after = timed(engine) * 1000
+        print(f"{name:<16} {before:>13.1f} {after:>12.1f} {before / after:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
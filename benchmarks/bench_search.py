@@ -0,0 +1,66 @@
+# Cross-dataset search on synthetic frames: the inverted index behind
+# /api/search vs a substring scan of every searched column per query.
+#
+#   python -m benchmarks.bench_search [--rows 100000] [--repeat 20]
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_irr1, make_irr2, make_irr3
+from projects.snapshots import coerce_columns
+from projects.adapters import adapt
+from projects.search_index import DatasetTerms, SEARCH_FIELDS, tokenize
+from projects import app_original as irr1
+from projects.irrigation_projects2 import routes as irr2
+from projects.irrigation_projects3 import routes as irr3
+
+QUERIES = ['mandya', 'synthetic project 4711', 'mysu lift', 'belagvi earthen', 'drinking water hassan']
+
+
+# --- Column scan (reference; exact substrings only, no typos) ---
+def scan(fields, q):
+    alive = np.ones(len(fields), dtype=bool)
+    for token in tokenize(q):
+        hit = np.zeros(len(fields), dtype=bool)
+        for field in SEARCH_FIELDS:
+            if field in fields.columns:
+                hit |= fields[field].str.lower().str.contains(token, regex=False).to_numpy()
+        alive &= hit
+    return np.flatnonzero(alive)
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    frames = [
+        adapt(coerce_columns(irr1.normalize_data(make_irr1(args.rows))), irr1.SCHEMA),
+        adapt(coerce_columns(irr2.normalize_data(make_irr2(args.rows))), irr2.SCHEMA),
+        adapt(coerce_columns(irr3.normalize_data(make_irr3(args.rows))), irr3.SCHEMA),
+    ]
+    start = time.perf_counter()
+    indexes = [DatasetTerms(f.fields) for f in frames]
+    print(f"3 x {args.rows} rows, indexed in {time.perf_counter() - start:.2f}s "
+          f"({sum(len(i.terms) for i in indexes)} terms)")
+
+    print(f"{'query':<24} {'scan (ms)':>10} {'index (ms)':>11} {'speedup':>8} {'hits':>8}")
+    for q in QUERIES:
+        tokens = tokenize(q)
+        scan_time, _ = timed(lambda: [scan(f.fields, q) for f in frames], args.repeat)
+        index_time, found = timed(lambda: [i.search(tokens)[0] for i in indexes], args.repeat)
+        print(f"{q:<24} {scan_time * 1000:>10.1f} {index_time * 1000:>11.2f} "
+              f"{scan_time / index_time:>7.0f}x {sum(len(rows) for rows in found):>8}")
+
+
+if __name__ == '__main__':
+    main()
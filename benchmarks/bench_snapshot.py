@@ -0,0 +1,55 @@
+# Cold-start comparison: parsing the Excel workbook vs memory-mapping the
+# columnar snapshot, for each dataset at a few synthetic sizes.
+#
+#   python -m benchmarks.bench_snapshot [--sizes 1000,10000,50000] [--repeat 3]
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import GENERATORS, write_workbook
+from projects.snapshots import build_snapshot, load_frame, snapshot_path
+from projects.app_original import normalize_data as normalize_irr1
+from projects.irrigation_projects2.routes import normalize_data as normalize_irr2
+from projects.irrigation_projects3.routes import normalize_data as normalize_irr3
+
+NORMALIZERS = {
+    'irrigation1': normalize_irr1,
+    'irrigation2': normalize_irr2,
+    'irrigation3': normalize_irr3,
+}
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,50000')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    print(f"{'dataset':<12} {'rows':>8} {'excel (s)':>10} {'snapshot (s)':>13} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, generate in GENERATORS.items():
+            normalize = NORMALIZERS[name]
+            for n in sizes:
+                source = write_workbook(generate(n), os.path.join(tmp, f'{name}_{n}.xlsx'))
+
+                excel = best_of(lambda: load_frame(source, normalize), args.repeat)
+                build_snapshot(source, normalize)
+                snap = best_of(lambda: load_frame(source, normalize), args.repeat)
+                os.remove(snapshot_path(source))
+
+                print(f"{name:<12} {n:>8} {excel:>10.3f} {snap:>13.4f} {excel / snap:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
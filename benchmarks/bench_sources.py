@@ -0,0 +1,56 @@
+# Multi-workbook datasets (projects/sources.py): irrigation2 split into
+# per-district workbooks, read one after the other vs on the process pool,
+# and a reload after one workbook changed (only that file is parsed again).
+#
+#   python -m benchmarks.bench_sources [--rows 60000] [--files 12] [--processes 4]
+import argparse
+import os
+import tempfile
+import time
+from functools import partial
+
+import pandas as pd
+
+from benchmarks.synthetic import make_irr2, write_workbook
+from projects.adapters import normalize_frame, read_options, schema_headers
+from projects.sources import SourceFrames, parse_source, source_files
+from projects.irrigation_projects2.routes import SCHEMA
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=60_000)
+    parser.add_argument('--files', type=int, default=12)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    # A partial (not a lambda) so it can be pickled to the pool processes
+    normalize = partial(normalize_frame, schema=SCHEMA)
+    options = read_options(SCHEMA)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = make_irr2(args.rows)
+        per_file = -(-len(df) // args.files)
+        for i in range(args.files):
+            write_workbook(df.iloc[i * per_file:(i + 1) * per_file], os.path.join(tmp, f'part_{i:03}.xlsx'))
+        files = source_files(tmp)
+        print(f"{len(df)} rows in {len(files)} workbooks, {args.processes} processes")
+
+        start = time.perf_counter()
+        sequential = pd.concat([parse_source(name, normalize, options) for name in files], ignore_index=True)
+        print(f"{'sequential':<22} {time.perf_counter() - start:>8.2f}s")
+
+        frames = SourceFrames(processes=args.processes)
+        start = time.perf_counter()
+        pooled = frames.load(tmp, normalize, options, schema_headers(SCHEMA))
+        print(f"{'process pool':<22} {time.perf_counter() - start:>8.2f}s")
+
+        os.utime(files[0])
+        start = time.perf_counter()
+        frames.load(tmp, normalize, options, schema_headers(SCHEMA))
+        print(f"{'reload, 1 file changed':<22} {time.perf_counter() - start:>8.2f}s")
+        print(f"rows: {len(sequential)} sequential, {len(pooled)} pooled")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Spatial queries on synthetic Karnataka-wide points: the grid index behind
+# /api/<dataset>/within|nearby|nearest vs a brute-force scan of every point.
+#
+#   python -m benchmarks.bench_spatial [--points 1000000] [--queries 200]
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from projects.spatial_index import GridIndex, haversine_km
+
+
+def make_points(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'lat': rng.uniform(11.6, 18.4, n),
+        'lon': rng.uniform(74.1, 78.5, n),
+        'name': 'Synthetic Project',
+        'status': 'Ongoing',
+        'color': '#f59e0b',
+    })
+
+
+# --- Brute force (reference) ---
+def scan_within(points, lat, lon, bbox):
+    west, south, east, north = bbox
+    return points[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)]
+
+
+def scan_radius(points, lat, lon, center, km):
+    distance = haversine_km(center[0], center[1], lat, lon)
+    inside = np.flatnonzero(distance <= km)
+    return points.iloc[inside[np.argsort(distance[inside], kind='stable')]]
+
+
+def scan_nearest(points, lat, lon, center, k):
+    distance = haversine_km(center[0], center[1], lat, lon)
+    closest = np.argpartition(distance, k)[:k]
+    return points.iloc[closest[np.argsort(distance[closest])]]
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--radius-km', type=float, default=10.0)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    points = make_points(args.points)
+    lat, lon = points['lat'].to_numpy(), points['lon'].to_numpy()
+
+    start = time.perf_counter()
+    index = GridIndex(points)
+    print(f"{args.points} points, grid {index.nrows}x{index.ncols}, built in {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(11)
+    centers = list(zip(rng.uniform(12, 18, args.queries), rng.uniform(74.5, 78, args.queries)))
+    boxes = [(c[1] - 0.15, c[0] - 0.1, c[1] + 0.15, c[0] + 0.1) for c in centers]
+
+    cases = [
+        ('bbox', boxes,
+         lambda b: scan_within(points, lat, lon, b),
+         lambda b: index.within(b)),
+        (f'radius {args.radius_km:g} km', centers,
+         lambda c: scan_radius(points, lat, lon, c, args.radius_km),
+         lambda c: index.radius(c[0], c[1], args.radius_km)),
+        (f'nearest k={args.k}', centers,
+         lambda c: scan_nearest(points, lat, lon, c, args.k),
+         lambda c: index.nearest(c[0], c[1], args.k)),
+    ]
+
+    print(f"{'query':<16} {'scan (ms)':>10} {'index (ms)':>11} {'speedup':>8} {'avg hits':>9}")
+    for name, queries, scan, indexed in cases:
+        scan_time, expected = timed(scan, queries)
+        index_time, got = timed(indexed, queries)
+        for a, b in zip(expected, got):
+            assert sorted(a['id'].tolist()) == sorted(b['id'].tolist()), name
+        hits = sum(len(r) for r in got) / len(got)
+        print(f"{name:<16} {scan_time * 1000:>10.2f} {index_time * 1000:>11.3f} "
+              f"{scan_time / index_time:>7.0f}x {hits:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
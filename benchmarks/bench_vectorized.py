@@ -0,0 +1,130 @@
+# Per-request cost of the dashboard data prep (project list, stats, dam
+# length parsing) on synthetic frames, vectorized helpers vs the old
+# iterrows()/per-value loops they replaced.
+#
+#   python -m benchmarks.bench_vectorized [--sizes 100,10000,100000]
+import argparse
+import re
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_irr1, make_irr2, make_irr3
+from projects.snapshots import coerce_columns
+from projects.adapters import adapt
+from projects import app_original as irr1
+from projects.irrigation_projects2 import routes as irr2
+from projects.irrigation_projects3 import routes as irr3
+
+
+# --- Previous row-at-a-time implementations (reference only) ---
+def legacy_projects_irr1(df):
+    return [{'id': idx, 'name': row.get('project_name', 'N/A'), 'status': str(row.get('current_status', 'N/A')),
+             'amount': row.get('dpr_approval_amount', 0), 'hectares': row.get('hectares_irrigated', 0),
+             'region': row.get('region', 'N/A'), 'type': row.get('project_type', 'N/A'),
+             'lat': row.get('latitude'), 'lng': row.get('longitude'),
+             'districts': row.get('districts_benefitted', 'N/A'), 'purpose': row.get('primary_purpose', 'N/A'),
+             'dpr_date': str(row.get('dpr_approval_date', 'N/A'))} for idx, row in df.iterrows()]
+
+
+def legacy_sum_numeric(series):
+    total = 0.0
+    for v in series.fillna(''):
+        for n in re.findall(r'\d+(?:\.\d+)?', str(v).replace(',', '')):
+            total += float(n)
+    return total
+
+
+def legacy_request_irr2(df_full, lat_col, lon_col):
+    legacy_sum_numeric(df_full['Approval Amount'])
+    legacy_sum_numeric(df_full['Hectares of land irrigated'])
+    (df_full['Project Status'].astype(str).apply(irr2.normalize_status) == 'completed').sum()
+    projects = []
+    for _, row in df_full.iterrows():
+        lat, lng = row.get(lat_col), row.get(lon_col)
+        try:
+            lat = float(lat) if pd.notna(lat) else None
+        except Exception:
+            lat = None
+        try:
+            lng = float(lng) if pd.notna(lng) else None
+        except Exception:
+            lng = None
+        projects.append({'name': str(row.get('Project Name', 'N/A')),
+                         'status': irr2.normalize_status(row.get('Project Status', '')),
+                         'amount': str(row.get('Approval Amount', '0')),
+                         'hectares': str(row.get('Hectares of land irrigated', '0')),
+                         'region': str(row.get('District', 'N/A')), 'lat': lat, 'lng': lng})
+    return projects
+
+
+def legacy_request_irr3(df):
+    df = df.copy()
+    df['Dam_Length_Total_Mtr'] = df['Dam_Length_Total_Mtr'].apply(
+        lambda x: float(re.sub(r'[^0-9.]', '', str(x))) if re.search(r'\d', str(x)) else 0.0)
+
+    def safe_float(value):
+        try:
+            return 0.0 if str(value).strip() in ['-', '', 'nan', 'NaN', 'None'] else float(value)
+        except Exception:
+            return 0.0
+    projects = [{'name': row.get('Project Name', '-'), 'amount': safe_float(row.get('Storage_Gross_Capacity_TMC', 0)),
+                 'hectares': safe_float(row.get('Submergence_Area_Total_Ha', 0)),
+                 'dam_length': safe_float(row.get('Dam_Length_Total_Mtr', 0))} for _, row in df.iterrows()]
+    for col in ('Irrigation_Gross_Command_Area_Ha', 'Storage_Gross_Capacity_TMC', 'Submergence_Area_Total_Ha'):
+        total = 0.0
+        for v in df[col]:
+            try:
+                total += float(str(v).replace(',', '').strip())
+            except Exception:
+                continue
+    return projects
+
+
+# --- Current paths (canonical fields are parsed once per load) ---
+def request_irr1(frames):
+    irr1.get_statistics(frames)
+    return irr1.get_projects_list(frames)
+
+
+def request_irr2(frames):
+    irr2.get_statistics(frames)
+    return irr2.get_projects_list(frames)
+
+
+def request_irr3(frames):
+    fields = frames.fields
+    for field in ('irrigation', 'amount', 'hectares'):
+        fields[field].sum()
+    return irr3.get_projects_list(frames)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='100,10000,100000')
+    args = parser.parse_args()
+
+    print(f"{'dataset':<12} {'rows':>8} {'iterrows (ms)':>14} {'vectorized (ms)':>16} {'speedup':>8}")
+    for n in [int(s) for s in args.sizes.split(',')]:
+        frames1 = adapt(coerce_columns(irr1.normalize_data(make_irr1(n))), irr1.SCHEMA)
+        frames2 = adapt(coerce_columns(irr2.normalize_data(make_irr2(n))), irr2.SCHEMA)
+        frames3 = adapt(coerce_columns(irr3.normalize_data(make_irr3(n))), irr3.SCHEMA)
+        cases = [
+            ('irrigation1', legacy_projects_irr1, request_irr1, (frames1.table,), frames1),
+            ('irrigation2', legacy_request_irr2, request_irr2, (frames2.table, 'Latitude', 'Longitude'), frames2),
+            ('irrigation3', legacy_request_irr3, request_irr3, (frames3.table,), frames3),
+        ]
+        for name, old, new, old_args, frames in cases:
+            before = timed(old, *old_args) * 1000
+            after = timed(new, frames) * 1000
+            print(f"{name:<12} {n:>8} {before:>14.1f} {after:>16.1f} {before / after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
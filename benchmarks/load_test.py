@@ -0,0 +1,182 @@
+# Load test for the dashboards: writes synthetic Karnataka-shaped workbooks
+# (benchmarks/synthetic.py) into a temporary tree, points the app at it and
+# drives the Flask test client from several threads against each route in
+# turn -- the three dashboards, their filter variants and the JSON APIs.
+# Reports throughput, p50/p99 latency and, per route, the resident set before
+# it ran, its peak while it ran and the growth between the two (routes run
+# in turn, so an earlier heavy route does not show up in later ones);
+# --json writes the same numbers for comparing runs.
+#
+#   python -m benchmarks.load_test [--rows 20000] [--concurrency 8] [--requests 200]
+#                                  [--uncached] [--routes irrigation3] [--json out.json]
+#
+# --uncached turns off the page and map caches so every request renders,
+# which is what a cold worker or a stream of distinct filters costs.
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import write_tree
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUTES = [
+    '/',
+    '/irrigation1',
+    '/irrigation1/map',
+    '/irrigation1?status=completed',
+    '/irrigation1?district=mandya&hectares__min=20000',
+    '/irrigation2',
+    '/irrigation2/map',
+    '/irrigation2?status=completed,ongoing',
+    '/irrigation2?amount__min=100&amount__max=2000',
+    '/irrigation3',
+    '/irrigation3?dam_type=earthen',
+    '/irrigation3/map?dam_type=earthen',
+    '/irrigation3?dam_type=earthen&dam_length=0-1000',
+    '/api/irrigation1/rows?size=100&sort=-dpr_approval_amount',
+    '/api/irrigation3/projects?dam_type=earthen',
+    '/api/irrigation2/geojson?bbox=74,12,77,16&zoom=8&cluster=1',
+    '/api/irrigation3/stats?status=completed',
+    '/api/search?q=dam',
+]
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+# --- Resident memory ---
+# Current resident set (Linux); elsewhere the process-wide peak, so the
+# per-route growth is only exact on Linux
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Resident set when a route starts and the highest one sampled while it runs
+class RssSampler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    @property
+    def growth(self):
+        return self.peak - self.start
+
+    def __enter__(self):
+        self.start = self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+# --- Driver ---
+def run_route(app, url, concurrency, requests):
+    local = threading.local()
+
+    def hit(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        start = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        return time.perf_counter() - start, response.status_code
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(hit, range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array([seconds for seconds, _ in results]) * 1000
+    errors = sum(1 for _, status in results if status >= 400)
+    return {
+        'route': url,
+        'requests': requests,
+        'errors': errors,
+        'rps': round(requests / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+        'rss_before_mb': round(rss.start / 2**20, 1),
+        'peak_rss_mb': round(rss.peak / 2**20, 1),
+        'rss_growth_mb': round(rss.growth / 2**20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--uncached', action='store_true')
+    parser.add_argument('--routes', default='', help='only routes containing this text')
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args()
+    routes = [url for url in ROUTES if args.routes in url]
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_tree(tmp, args.rows)
+        print(f"wrote 3 x {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        # The dashboards read their workbooks relative to the working directory
+        sys.path.insert(0, ROOT)
+        os.chdir(tmp)
+        from app import app
+        from projects.http_cache import page_cache
+        from projects.render_cache import map_cache
+        if args.uncached:
+            page_cache.max_bytes = map_cache.max_bytes = 0
+
+        # First request per route loads the workbook and builds the indexes;
+        # that cost belongs to startup, not to the steady state measured here
+        client = app.test_client()
+        start = time.perf_counter()
+        for url in routes:
+            client.get(url)
+        print(f"warm-up {time.perf_counter() - start:.1f}s, rss {current_rss() / 2**20:.0f} MB\n")
+
+        print(f"{'route':<58} {'req':>5} {'err':>4} {'req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+              f"{'rss (MB)':>9} {'+rss (MB)':>10}")
+        report = []
+        for url in routes:
+            result = run_route(app, url, args.concurrency, args.requests)
+            report.append(result)
+            print(f"{url:<58} {result['requests']:>5} {result['errors']:>4} {result['rps']:>8.1f} "
+                  f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['peak_rss_mb']:>9.1f} "
+                  f"{result['rss_growth_mb']:>10.1f}")
+        os.chdir(cwd)
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'rows': args.rows, 'concurrency': args.concurrency, 'uncached': args.uncached,
+                       'routes': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import os
+import random
+import pandas as pd
+
+
+# --- Synthetic Karnataka-shaped datasets ---
+# Column names match the three source workbooks so the real loaders can be
+# pointed at the generated files.
+DISTRICTS = ['Mandya', 'Mysuru', 'Belagavi', 'Vijayapura', 'Raichur', 'Ballari',
+             'Kalaburagi', 'Shivamogga', 'Hassan', 'Tumakuru', 'Chitradurga', 'Bagalkot']
+STATUSES_1 = ['Completed', 'Ongoing', 'Planned', 'Under Construction', 'Approved', None]
+STATUSES_2 = ['Completed', 'Nearly completed', 'Under progress', 'Ongoing work', 'Approved', None]
+STATUSES_3 = ['Completed', 'Ongoing', 'Under construction', 'Planned']
+DAM_TYPES = ['Earthen', 'Masonry', 'Composite', 'Concrete Gravity', None]
+
+
+def _lat(rng):
+    return round(rng.uniform(11.6, 18.4), 5)
+
+
+def _lon(rng):
+    return round(rng.uniform(74.1, 78.5), 5)
+
+
+def make_irr1(n, seed=1):
+    rng = random.Random(seed)
+    return pd.DataFrame([{
+        'project_name': f'Synthetic Project {i}',
+        'current_status': rng.choice(STATUSES_1),
+        'dpr_approval_date': f'20{rng.randint(10, 24)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}',
+        'dpr_approval_amount': rng.choice([round(rng.uniform(1, 900), 2), None]),
+        'region': rng.choice(['North Karnataka', 'South Karnataka', 'Coastal']),
+        'project_type': rng.choice(['Major', 'Medium', 'Minor', 'Lift']),
+        'hectares_irrigated': round(rng.uniform(100, 90000), 1),
+        'districts_benefitted': ', '.join(rng.sample(DISTRICTS, rng.randint(1, 3))),
+        'primary_purpose': rng.choice(['Irrigation', 'Drinking water', 'Irrigation & drinking water']),
+        'Latitude': rng.choice([_lat(rng)] * 9 + [None]),
+        'Logitude': _lon(rng),
+    } for i in range(n)])
+
+
+def make_irr2(n, seed=2):
+    rng = random.Random(seed)
+    return pd.DataFrame([{
+        'Sl No': i + 1,
+        'Project Name': f'Synthetic KNNL Project {i}',
+        'Project Type': rng.choice(['Lift Irrigation', 'Tank Filling', 'Canal Modernisation']),
+        'Project Status': rng.choice(STATUSES_2),
+        'DRP Approval Date': str(rng.randint(2008, 2021)),
+        'Approval Amount': rng.choice([f'{rng.uniform(10, 5000):,.2f}', f'{rng.randint(5, 900)} Cr',
+                                       round(rng.uniform(1, 900), 2), None]),
+        'Hectares of land irrigated': rng.choice([str(rng.randint(100, 60000)),
+                                                  f'{rng.randint(100, 900)}-{rng.randint(1000, 2000)} ha', None]),
+        'District': rng.choice(DISTRICTS),
+        'Canals under this project': rng.choice(['LBC', 'RBC', 'LBC & RBC', None]),
+        'Latitude': rng.choice([_lat(rng)] * 9 + [None]),
+        'Longitude': _lon(rng),
+    } for i in range(n)])
+
+
+def make_irr3(n, seed=3):
+    rng = random.Random(seed)
+    return pd.DataFrame([{
+        'Project Name': f'Synthetic Dam {i}',
+        'Status': rng.choice(STATUSES_3),
+        'Project Duration Years': rng.randint(2, 15),
+        'Storage_Gross_Capacity_TMC': round(rng.uniform(0.1, 40), 3),
+        'Storage_Live_Capacity_TMC': round(rng.uniform(0.1, 30), 3),
+        'Dam_Type': rng.choice(DAM_TYPES),
+        'Dam_Length_Total_Mtr': rng.choice([f'{rng.randint(100, 999)} m', f'{rng.randint(1000, 1999):,}',
+                                            rng.randint(2000, 6000), None]),
+        'Location_District': rng.choice(DISTRICTS),
+        'Submergence_Area_Total_Ha': round(rng.uniform(10, 5000), 1),
+        'Spillway_Type': rng.choice(['Ogee', 'Chute', 'Side channel']),
+        'Irrigation_Gross_Command_Area_Ha': round(rng.uniform(100, 90000), 1),
+        'Latitude': _lat(rng),
+        'Longitude': _lon(rng),
+    } for i in range(n)])
+
+
+GENERATORS = {
+    'irrigation1': make_irr1,
+    'irrigation2': make_irr2,
+    'irrigation3': make_irr3,
+}
+
+
+def write_workbook(df, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    df.to_excel(path, index=False, engine='openpyxl')
+    return path
+
+
+# --- Workbook tree ---
+# Writes all three workbooks under root at the paths the dashboards read
+# (relative to the working directory), so the app can be run from root:
+#
+#   python -m benchmarks.synthetic --rows 50000 --out /tmp/irrigation-50k
+WORKBOOKS = {
+    'irrigation1': os.path.join('projects', 'irrigation_projects1', 'data', 'karnataka_irr1.xlsx'),
+    'irrigation2': os.path.join('projects', 'irrigation_projects2', 'data', 'karnataka_irr2.xlsx'),
+    'irrigation3': os.path.join('projects', 'irrigation_projects3', 'data', 'karnataka_irr3.xlsx'),
+}
+
+
+def write_tree(root, rows):
+    return {name: write_workbook(GENERATORS[name](rows), os.path.join(root, path))
+            for name, path in WORKBOOKS.items()}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+    for name, path in write_tree(args.out, args.rows).items():
+        print(f'{name}: {path}')
@@ -0,0 +1,36 @@
+# gunicorn -c gunicorn.conf.py app:app
+#
+# The app is imported once in the master and warmed up there (datasets,
+# indexes, default maps) before any worker is forked, so workers start ready
+# and share the loaded data copy-on-write instead of each parsing the
+# workbooks on its first request. GET /api/ready reports per-worker memory.
+# Each worker then watches the data folders and swaps in changed datasets
+# itself (projects/watcher.py); its refreshes go to the gunicorn error log.
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+timeout = 120
+
+
+# Runs in the master after the app is loaded and before workers fork
+def when_ready(server):
+    from app import app
+    from projects.warmup import warm_up
+
+    stats = warm_up(app)
+    server.log.info("warmup finished in %ss: %s", stats['seconds'],
+                    {name: info.get('rows', info.get('error')) for name, info in stats['datasets'].items()})
+
+
+# Runs in each worker right after the fork (threads do not survive it)
+def post_fork(server, worker):
+    import logging
+    from projects.watcher import data_watcher
+
+    watcher_log = logging.getLogger('projects.watcher')
+    watcher_log.handlers = server.log.error_log.handlers
+    watcher_log.setLevel(logging.INFO)
+    data_watcher.start()
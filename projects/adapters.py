@@ -0,0 +1,216 @@
+from functools import partial
+
+import pandas as pd
+
+from projects.aggregates import AggregateStore
+from projects.filters import FilterIndex
+from projects.frame_utils import to_float
+from projects.snapshots import load_frame
+from projects.sources import is_multi_source, source_frames
+
+
+# --- Declarative dataset adapters ---
+# Each dataset describes its sheet with a schema instead of its own cleaning
+# code:
+#   'lowercase'  lowercase the headers (they are always stripped)
+#   'rename'     {header: new header}, applied after stripping
+#   'text'       headers read as text (no number guessing while parsing);
+#                matched after stripping / lowercasing / renaming, like
+#                every other header here
+#   'numeric'    headers coerced to numbers, unparseable cells -> NaN
+#   'usecols'    headers to read; None reads all of them (the tables show
+#                every column of the sheet)
+#   'required'   headers that must be present
+#   'dropna'     rows missing any of these are dropped
+#   'fill'       'by_dtype' -> '-' in text columns, 0 in numeric ones
+#   'fields'     {field: (header, parser)} -> columns of the canonical frame
+#   'display'    {header: field} table columns shown as the parsed field
+#   'dimensions' fields the stats can be grouped / filtered by
+#   'measures'   numeric fields the stats add up
+#   'filters'    fields the filter engine indexes (projects/filters.py);
+#                defaults to the dimensions and measures
+#   'key'        headers identifying a project when a dataset is read from
+#                several workbooks (duplicates are dropped); default: every
+#                column
+#
+# Loading yields two frames sharing one index: `table`, the cleaned sheet
+# (NaN shown as '-') behind the data table and popups, and `fields`, the
+# compact canonical frame that the map and project list read, plus the
+# pre-grouped `aggregates` behind the stats cards and /api/<dataset>/stats
+# and the `filter_index` that resolves query-string filters.
+CANONICAL_FIELDS = ('name', 'lat', 'lon', 'status', 'amount', 'hectares', 'district')
+
+
+# --- Field parsers ---
+def text(series):
+    return series.astype(str).where(series.notna(), '-')
+
+
+def coordinate(series):
+    return pd.to_numeric(series, errors='coerce').astype(float)
+
+
+def number(series):
+    return to_float(series).astype(float)
+
+
+PARSERS = {
+    'name': text,
+    'lat': coordinate,
+    'lon': coordinate,
+    'status': text,
+    'amount': number,
+    'hectares': number,
+    'district': text,
+}
+
+
+# --- Reading and cleaning the sheet ---
+# Header as written in the file -> header after normalize_frame (renames
+# are checked per frame there, this is only for matching at read time)
+def clean_header(header, schema):
+    header = str(header).strip()
+    if schema.get('lowercase'):
+        header = header.lower()
+    return schema.get('rename', {}).get(header, header)
+
+
+def text_dtype(header, schema):
+    return str if clean_header(header, schema) in schema['text'] else None
+
+
+def read_column(header, schema):
+    return clean_header(header, schema) in schema['usecols']
+
+
+# The schema names cleaned headers; the reader sees them as written, so
+# dtype and usecols are functions of the raw header
+def read_options(schema):
+    return {
+        'usecols': partial(read_column, schema=schema) if schema.get('usecols') else None,
+        'dtype': partial(text_dtype, schema=schema) if schema.get('text') else None,
+    }
+
+
+def normalize_frame(df, schema):
+    headers = df.columns.astype(str).str.strip()
+    if schema.get('lowercase'):
+        headers = headers.str.lower()
+    df.columns = headers
+
+    rename = {old: new for old, new in schema.get('rename', {}).items()
+              if old in df.columns and new not in df.columns}
+    if rename:
+        df.rename(columns=rename, inplace=True)
+
+    missing = [h for h in schema.get('required', ()) if h not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns {missing}. Found: {list(df.columns)}")
+
+    for header in schema.get('numeric', ()):
+        if header in df.columns:
+            df[header] = pd.to_numeric(df[header], errors='coerce')
+
+    dropna = [h for h in schema.get('dropna', ()) if h in df.columns]
+    if dropna:
+        df = df[df[dropna].notna().all(axis=1)]
+
+    if schema.get('fill') == 'by_dtype':
+        for col in df.columns:
+            if df[col].dtype == 'object':
+                df[col] = df[col].fillna('-')
+            else:
+                df[col] = df[col].fillna(0)
+    return df
+
+
+# --- Canonical frame ---
+def canonical_frame(df, schema):
+    fields = {}
+    for field, spec in schema['fields'].items():
+        header, parser = spec if isinstance(spec, tuple) else (spec, PARSERS.get(field, text))
+        if header in df.columns:
+            values = df[header]
+        else:
+            values = pd.Series(float('nan'), index=df.index, dtype=object)
+        fields[field] = parser(values)
+    for field in CANONICAL_FIELDS:
+        if field not in fields:
+            fields[field] = PARSERS[field](pd.Series(float('nan'), index=df.index, dtype=object))
+    return pd.DataFrame(fields, index=df.index)
+
+
+# Frames are built once per file version and never modified afterwards
+class DatasetFrames:
+    def __init__(self, table, fields, aggregates=None, filter_index=None):
+        self.table = table
+        self.fields = fields
+        self.aggregates = aggregates
+        self.filter_index = filter_index
+        self._located = None
+
+    def __len__(self):
+        return len(self.fields)
+
+    # Subset of the rows (aggregates are filtered with aggregates.where)
+    def where(self, mask):
+        mask = pd.Series(mask, index=self.fields.index).to_numpy(dtype=bool)
+        return DatasetFrames(self.table[mask], self.fields[mask])
+
+    # Rows and aggregates matching a FilterQuery. Aggregates come from the
+    # pre-grouped partials when the query only touches dimensions, and are
+    # regrouped from the selected rows otherwise.
+    def select(self, query):
+        if not query:
+            return self
+        mask = self.filter_index.mask(query)
+        if mask.all():
+            return self
+        subset = self.where(mask)
+        if self.aggregates is not None:
+            subset.aggregates = self.aggregates.select(query)
+            if subset.aggregates is None:
+                subset.aggregates = AggregateStore.build(subset.fields, self.aggregates.dimensions,
+                                                         self.aggregates.measures)
+        return subset
+
+    # Rows that can go on the map (computed once)
+    def with_coords(self):
+        if self._located is None:
+            self._located = self.where(self.fields['lat'].notna() & self.fields['lon'].notna())
+        return self._located
+
+
+def adapt(df, schema):
+    fields = canonical_frame(df, schema)
+    table = df.fillna('-') if df.isna().any().any() else df
+    for header, field in schema.get('display', {}).items():
+        if header in table.columns:
+            if table is df:
+                table = df.copy()
+            table[header] = fields[field]
+    dimensions, measures = schema.get('dimensions', []), schema.get('measures', [])
+    aggregates = AggregateStore.build(fields, dimensions, measures)
+    filter_index = FilterIndex(fields, schema.get('filters', list(dimensions) + list(measures)))
+    return DatasetFrames(table, fields, aggregates, filter_index)
+
+
+# Headers the schema reads, checked across the files of a multi-file dataset
+def schema_headers(schema):
+    headers = list(schema.get('required', ()))
+    for spec in schema['fields'].values():
+        header = spec[0] if isinstance(spec, tuple) else spec
+        if header not in headers:
+            headers.append(header)
+    return headers
+
+
+# One read of the sheet (or its snapshot) -> table + canonical frames; a
+# folder or glob of workbooks is read file by file (see projects/sources.py)
+def load_dataset(path, schema):
+    normalize = partial(normalize_frame, schema=schema)
+    if is_multi_source(path):
+        df = source_frames.load(path, normalize, read_options(schema), schema_headers(schema), schema.get('key'))
+    else:
+        df = load_frame(path, normalize, read_options(schema))
+    return adapt(df, schema)
@@ -0,0 +1,69 @@
+import pandas as pd
+
+from projects.filters import FilterIndex
+
+
+# --- Pre-grouped aggregates ---
+# Built once per dataset version from the canonical fields: one row per
+# distinct combination of the dimension fields (status, district, type, ...)
+# holding its project count and the sum of every measure. Totals and
+# group-bys for any filter on those dimensions are sums over these rows, so
+# requests never rescan the projects themselves.
+class AggregateStore:
+    def __init__(self, partials, dimensions, measures):
+        self.partials = partials
+        self.dimensions = dimensions
+        self.measures = measures
+        self._filter_index = None
+
+    @classmethod
+    def build(cls, fields, dimensions=(), measures=()):
+        dimensions = [d for d in dimensions if d in fields.columns]
+        measures = [m for m in measures if m in fields.columns]
+        if dimensions:
+            grouped = fields.groupby(dimensions, sort=False, dropna=False)
+            partials = grouped[measures].sum()
+            partials.insert(0, 'count', grouped.size())
+            partials = partials.reset_index()
+        else:
+            partials = pd.DataFrame([{'count': len(fields), **{m: fields[m].sum() for m in measures}}])
+        return cls(partials, dimensions, measures)
+
+    # Store restricted to the partial rows where mask is True
+    def where(self, mask):
+        return AggregateStore(self.partials[mask], self.dimensions, self.measures)
+
+    # Store for a filter query, or None when the query touches fields that
+    # are not dimensions (numeric ranges need the projects themselves)
+    def select(self, query):
+        if not query.fields() <= set(self.dimensions):
+            return None
+        if self._filter_index is None:
+            self._filter_index = FilterIndex(self.partials, self.dimensions)
+        return self.where(self._filter_index.mask(query))
+
+    def count(self, mask=None):
+        counts = self.partials['count'] if mask is None else self.partials.loc[mask, 'count']
+        return int(counts.sum())
+
+    def totals(self):
+        totals = {'count': self.count()}
+        for measure in self.measures:
+            totals[measure] = float(self.partials[measure].sum())
+        return totals
+
+    # {value: count} for one dimension, largest first
+    def counts(self, dimension):
+        grouped = self.partials.groupby(dimension, sort=False)['count'].sum()
+        return {key: int(n) for key, n in grouped.sort_values(ascending=False, kind='stable').items()}
+
+    # One dict per distinct combination of `by`, largest count first
+    def group(self, by):
+        grouped = self.partials.groupby(list(by), sort=False)[['count'] + self.measures].sum()
+        grouped = grouped.sort_values('count', ascending=False, kind='stable').reset_index()
+        names = list(grouped.columns)
+        columns = [grouped[name].tolist() for name in names]
+        rows = [dict(zip(names, values)) for values in zip(*columns)]
+        for row in rows:
+            row['count'] = int(row['count'])
+        return rows
@@ -0,0 +1,408 @@
+from flask import Blueprint, jsonify, request, url_for
+import logging
+import math
+import numpy as np
+import pandas as pd
+
+from projects.dataset_cache import DatasetUnavailable
+from projects.datasets import get_dataset
+from projects.filters import FilterError, filter_frames
+from projects.frame_utils import to_records, to_rows
+from projects.export import EXPORTS, export_response
+from projects.metrics import stage, record_rows
+from projects.geo import feature_collection, parse_bbox, tile_bbox, point_features
+from projects.spatial_index import spatial_indexes
+from projects.search_index import search_index, DEFAULT_LIMIT, MAX_LIMIT
+from projects.reports import report_index, links_html
+from projects.compare import comparisons, DEFAULT_BEFORE, DEFAULT_AFTER
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+log = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 25
+# The sidebar loads its project list this many at a time while scrolling
+DEFAULT_PROJECTS_PAGE = 100
+MAX_PAGE_SIZE = 500
+DEFAULT_NEAREST = 10
+MAX_NEAREST = 500
+
+
+# --- Helpers ---
+def int_arg(name, default):
+    try:
+        return int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def float_arg(name):
+    try:
+        return float(request.args[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def dataset_or_404(name):
+    try:
+        return get_dataset(name), None
+    except KeyError:
+        return None, (jsonify({'error': f"Unknown dataset '{name}'"}), 404)
+
+
+# Case-insensitive substring match on any column (what the old client-side
+# search did with row.textContent)
+def search_frame(df, q):
+    q = q.strip().lower()
+    if not q or df.empty:
+        return df
+    mask = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        mask |= df[col].astype(str).str.lower().str.contains(q, regex=False).to_numpy()
+    return df[mask]
+
+
+# sort=<column> ascending, sort=-<column> descending. Columns with numbers
+# sort numerically (text last), everything else case-insensitively.
+def sort_frame(df, sort):
+    descending = sort.startswith('-')
+    col = sort.lstrip('-')
+    if col not in df.columns or df.empty:
+        return df
+    values = df[col].reset_index(drop=True)
+    numeric = pd.to_numeric(values, errors='coerce')
+    key = numeric if numeric.notna().any() else values.astype(str).str.lower()
+    order = key.sort_values(ascending=not descending, na_position='last', kind='stable').index
+    return df.iloc[order]
+
+
+@api_bp.errorhandler(FilterError)
+def bad_filter(error):
+    return jsonify({'error': str(error)}), 400
+
+
+# Workbook missing, mid-write or failing its checks: 503 (not cached), as
+# the dashboards answer; the cause stays in the log
+@api_bp.errorhandler(DatasetUnavailable)
+def dataset_unavailable(error):
+    log.warning("dataset unavailable: %s", error)
+    return jsonify({'error': 'Dataset is temporarily unavailable'}), 503
+
+
+# --- Search ---
+# GET /api/search?q=mandya lift&dataset=irrigation1,irrigation3&limit=20
+# Ranked hits across every dataset's project names, districts, regions,
+# types and purposes; terms match exactly, by prefix or with one typo.
+@api_bp.route('/search')
+def search():
+    q = request.args.get('q', '')
+    names = [name.strip() for name in request.args.get('dataset', '').split(',') if name.strip()]
+    limit = min(max(int_arg('limit', DEFAULT_LIMIT), 1), MAX_LIMIT)
+    return jsonify({'q': q, 'hits': search_index.search(q, names, limit)})
+
+
+# --- Annual report pages ---
+# Deep link into the PDF viewer at the page
+def with_url(link):
+    return {**link, 'url': url_for('static', filename=f"reports/{link['file']}") + f"#page={link['page']}"}
+
+
+# GET /api/reports/search?q=hemavathi canal&limit=20
+# Report pages holding every term (exact or prefix), best first, with a
+# snippet; read from the text extracted by flask --app app extract-reports
+@api_bp.route('/reports/search')
+def reports_search():
+    q = request.args.get('q', '')
+    limit = min(max(int_arg('limit', DEFAULT_LIMIT), 1), MAX_LIMIT)
+    return jsonify({'q': q, 'hits': [with_url(hit) for hit in report_index.search(q, limit)]})
+
+
+# GET /api/<dataset>/reports/<id> -> report pages naming one project
+@api_bp.route('/<dataset>/reports/<int:feature_id>')
+def dataset_reports(dataset, feature_id):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+    return jsonify({'id': feature_id, 'pages': [with_url(link) for link in report_index.links(info, feature_id)]})
+
+
+# --- Dataset comparison ---
+# GET /api/compare?before=irrigation2&after=irrigation1&changed=status|amount|hectares|any
+#     &min_confidence=0.7&q=text&sort=-amount_change&page=1&size=25
+# Projects matched across two datasets with their status transition,
+# amount / hectare changes and match confidence, paged from the join
+# materialized once per pair of dataset versions (projects/compare.py).
+@api_bp.route('/compare')
+def compare():
+    before = request.args.get('before', DEFAULT_BEFORE)
+    after = request.args.get('after', DEFAULT_AFTER)
+    for name in (before, after):
+        _, error = dataset_or_404(name)
+        if error:
+            return error
+    if before == after:
+        return jsonify({'error': "before and after must be different datasets"}), 400
+
+    comparison = comparisons.get(before, after)
+    with stage('search'):
+        df = comparison.select(request.args.get('changed', ''), float_arg('min_confidence'))
+        df = table_view(df, request.args)
+    record_rows(len(df))
+
+    size = min(max(int_arg('size', DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    filtered = len(df)
+    pages = max(math.ceil(filtered / size), 1)
+    page = min(max(int_arg('page', 1), 1), pages)
+    start = (page - 1) * size
+
+    return jsonify({
+        **comparison.summary,
+        'page': page,
+        'size': size,
+        'pages': pages,
+        'filtered': filtered,
+        'columns': list(df.columns),
+        'rows': to_rows(df.iloc[start:start + size]),
+    })
+
+
+# The table as the data table shows it: dataset filters, then q and sort
+def table_view(df, args):
+    df = search_frame(df, args.get('q', ''))
+    sort = args.get('sort', '')
+    if sort:
+        df = sort_frame(df, sort)
+    return df
+
+
+# --- Paged table rows ---
+# GET /api/<dataset>/rows?page=1&size=25&sort=-column&q=text
+# Filter params (status=..., amount__min=..., or=..., irrigation3's
+# dam_type/dam_length; see projects/filters.py) are passed through to the
+# dataset's table function, here and on every route below.
+@api_bp.route('/<dataset>/rows')
+def dataset_rows(dataset):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+
+    with stage('filter'):
+        df = info['table'](request.args)
+    total = len(df)
+    with stage('search'):
+        df = table_view(df, request.args)
+    record_rows(len(df))
+
+    size = min(max(int_arg('size', DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    filtered = len(df)
+    pages = max(math.ceil(filtered / size), 1)
+    page = min(max(int_arg('page', 1), 1), pages)
+    start = (page - 1) * size
+
+    return jsonify({
+        'dataset': dataset,
+        'columns': [str(c) for c in df.columns],
+        'page': page,
+        'size': size,
+        'pages': pages,
+        'total': total,
+        'filtered': filtered,
+        'rows': to_rows(df.iloc[start:start + size]),
+    })
+
+
+# --- Sidebar project list ---
+# GET /api/<dataset>/projects?page=1&size=100&q=text&status=completed
+# The dashboards' project directory, loaded a page at a time as it is
+# scrolled (plus the dataset's filter params, e.g. irrigation3's dam_type /
+# dam_length); q matches project names and regions
+@api_bp.route('/<dataset>/projects')
+def dataset_projects(dataset):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+
+    with stage('filter'):
+        df = info['projects'](request.args)
+    total = len(df)
+    with stage('search'):
+        columns = [col for col in ('name', 'region') if col in df.columns]
+        df = df.loc[search_frame(df[columns], request.args.get('q', '')).index]
+    record_rows(len(df))
+
+    size = min(max(int_arg('size', DEFAULT_PROJECTS_PAGE), 1), MAX_PAGE_SIZE)
+    filtered = len(df)
+    pages = max(math.ceil(filtered / size), 1)
+    page = min(max(int_arg('page', 1), 1), pages)
+    start = (page - 1) * size
+
+    return jsonify({
+        'dataset': dataset,
+        'page': page,
+        'size': size,
+        'pages': pages,
+        'total': total,
+        'filtered': filtered,
+        'projects': to_records(df.iloc[start:start + size]),
+    })
+
+
+# --- Export ---
+# GET /api/<dataset>/export?format=csv|ndjson|xlsx plus the table's filters,
+# q and sort -> the whole filtered table as a download, streamed in chunks
+@api_bp.route('/<dataset>/export')
+def dataset_export(dataset):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORTS:
+        return jsonify({'error': f"Unknown format '{fmt}'", 'formats': list(EXPORTS)}), 400
+    with stage('filter'):
+        df = table_view(info['table'](request.args), request.args)
+    record_rows(len(df))
+    return export_response(df, fmt, dataset)
+
+
+# Spatial index over the dataset's points, plus a mask of the points the
+# request's filters keep; None when no filter is set
+def indexed_points(info, args):
+    index = spatial_indexes.get(info)
+    frames = info['frames']()
+    selected = filter_frames(frames, args, info['filters'])
+    if selected is frames:
+        return index, None
+    return index, index.points.index.isin(selected.fields.index)
+
+
+def distance_features(points):
+    features = point_features(points)
+    for feature, km in zip(features, points['distance_km'].round(3).tolist()):
+        feature['properties']['distance_km'] = km
+    return features
+
+
+# --- Map points ---
+# GET /api/<dataset>/geojson?bbox=west,south,east,north&zoom=7&cluster=1
+# Only the points inside bbox are returned; with cluster=1 and a low zoom
+# they are grouped server-side into grid clusters.
+@api_bp.route('/<dataset>/geojson')
+def dataset_geojson(dataset):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+
+    index, keep = indexed_points(info, request.args)
+    bbox = parse_bbox(request.args.get('bbox'))
+    if bbox:
+        points = index.within(bbox, keep)
+    else:
+        points = index.points if keep is None else index.points[keep]
+    zoom = int_arg('zoom', None)
+    cluster = request.args.get('cluster', '').lower() in ('1', 'true', 'yes')
+    return jsonify(feature_collection(points, None, zoom, cluster))
+
+
+# GET /api/<dataset>/tiles/<z>/<x>/<y>.geojson -> pre-clustered slippy-map tile
+@api_bp.route('/<dataset>/tiles/<int:z>/<int:x>/<int:y>.geojson')
+def dataset_tile(dataset, z, x, y):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+
+    index, keep = indexed_points(info, request.args)
+    points = index.within(tile_bbox(z, x, y), keep)
+    return jsonify(feature_collection(points, None, z, cluster=True))
+
+
+# --- Spatial queries ---
+# GET /api/<dataset>/within?bbox=west,south,east,north -> every point in the box
+@api_bp.route('/<dataset>/within')
+def dataset_within(dataset):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+
+    bbox = parse_bbox(request.args.get('bbox'))
+    if bbox is None:
+        return jsonify({'error': 'bbox=west,south,east,north is required'}), 400
+    index, keep = indexed_points(info, request.args)
+    return jsonify(feature_collection(index.within(bbox, keep)))
+
+
+# GET /api/<dataset>/nearby?lat=..&lon=..&radius_km=25 -> points within the
+# radius, nearest first, each with properties.distance_km
+@api_bp.route('/<dataset>/nearby')
+def dataset_nearby(dataset):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+
+    lat, lon, km = float_arg('lat'), float_arg('lon'), float_arg('radius_km')
+    if lat is None or lon is None or km is None or km < 0:
+        return jsonify({'error': 'lat, lon and radius_km are required'}), 400
+    index, keep = indexed_points(info, request.args)
+    points = index.radius(lat, lon, km, keep)
+    return jsonify({'type': 'FeatureCollection', 'features': distance_features(points)})
+
+
+# GET /api/<dataset>/nearest?lat=..&lon=..&k=10 -> the k closest points
+@api_bp.route('/<dataset>/nearest')
+def dataset_nearest(dataset):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+
+    lat, lon = float_arg('lat'), float_arg('lon')
+    if lat is None or lon is None:
+        return jsonify({'error': 'lat and lon are required'}), 400
+    k = min(max(int_arg('k', DEFAULT_NEAREST), 1), MAX_NEAREST)
+    index, keep = indexed_points(info, request.args)
+    points = index.nearest(lat, lon, k, keep)
+    return jsonify({'type': 'FeatureCollection', 'features': distance_features(points)})
+
+
+# --- Aggregates ---
+# GET /api/<dataset>/stats?by=status,district -> totals plus one row per
+# group; answered from partials pre-grouped at load time (regrouped from the
+# filtered projects when a filter touches a measure, e.g. amount__min).
+@api_bp.route('/<dataset>/stats')
+def dataset_stats(dataset):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+
+    aggregates = info['stats'](request.args)
+    by = [name.strip() for name in request.args.get('by', '').split(',') if name.strip()]
+    unknown = [name for name in by if name not in aggregates.dimensions]
+    if unknown:
+        return jsonify({'error': f"Cannot group by {', '.join(unknown)}",
+                        'dimensions': aggregates.dimensions}), 400
+
+    return jsonify({
+        'dataset': dataset,
+        'dimensions': aggregates.dimensions,
+        'measures': aggregates.measures,
+        'totals': aggregates.totals(),
+        'by': by,
+        'groups': aggregates.group(by) if by else [],
+    })
+
+
+# GET /api/<dataset>/popup/<id> -> popup HTML for one feature, built on demand
+@api_bp.route('/<dataset>/popup/<int:feature_id>')
+def dataset_popup(dataset, feature_id):
+    info, error = dataset_or_404(dataset)
+    if error:
+        return error
+
+    html = info['popup'](feature_id)
+    if html is None:
+        return jsonify({'error': f"Unknown feature {feature_id}"}), 404
+    try:
+        links = report_index.links(info, feature_id)
+    except Exception:
+        links = []  # the popup itself never depends on the report index
+    if links:
+        html += links_html([with_url(link) for link in links])
+    return html, 200, {'Content-Type': 'text/html; charset=utf-8'}
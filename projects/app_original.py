@@ -1,78 +1,92 @@
 from flask import Flask, render_template, request, jsonify
+from markupsafe import escape
 import pandas as pd
 import folium
 from folium.plugins import MarkerCluster, MiniMap
 import os
 
+from projects.dataset_cache import dataset_cache
+from projects.adapters import load_dataset, normalize_frame
+from projects.render_cache import map_cache, make_key
+from projects.frame_utils import to_optional_float, to_records
+from projects.normalize import StatusScheme
+from projects.filters import FilterError, filter_frames, parse_filters
+from projects.geo import lazy_points, bulk_points
+from projects.http_cache import map_url
+from projects.metrics import stage, record_rows
+
 app = Flask(__name__)
 DATA_DIR = ''
 DEFAULT_FILE = 'karnataka_irr1.xlsx'
 
+# 'geojson': static map shell that fetches visible points from the API
+# 'markers': every project baked into the folium document
+# 'bulk':    every project in the document as one data array drawn on a
+#            canvas (python -m benchmarks.bench_bulk_map)
+MAP_MODE = 'geojson'
 
-# ✅ Same helper functions (no change)
-def load_data(filepath):
-    df = pd.read_excel(filepath, engine='openpyxl')
-    df.columns = df.columns.str.strip().str.lower()
-
-    # Fix longitude typo if exists
-    if 'logitude' in df.columns and 'longitude' not in df.columns:
-        df.rename(columns={'logitude': 'longitude'}, inplace=True)
+# Sheet layout (see projects/adapters.py): lowercase headers, the
+# 'Logitude' typo fixed, rows without coordinates dropped and NaN filled
+# with '-' (text) or 0 (numbers)
+SCHEMA = {
+    'lowercase': True,
+    'rename': {'logitude': 'longitude'},
+    'text': ['project_name', 'current_status', 'region', 'project_type',
+             'districts_benefitted', 'primary_purpose'],
+    'required': ['latitude', 'longitude'],
+    'numeric': ['latitude', 'longitude', 'dpr_approval_amount', 'hectares_irrigated'],
+    'dropna': ['latitude', 'longitude'],
+    'fill': 'by_dtype',
+    'fields': {
+        'name': 'project_name',
+        'lat': 'latitude',
+        'lon': 'longitude',
+        'status': 'current_status',
+        'amount': 'dpr_approval_amount',
+        'hectares': 'hectares_irrigated',
+        'district': 'districts_benefitted',
+        'region': 'region',
+        'type': 'project_type',
+        'purpose': 'primary_purpose',
+        'dpr_date': 'dpr_approval_date',
+    },
+    'dimensions': ['status', 'district', 'region', 'type'],
+    'measures': ['amount', 'hectares'],
+}
 
-    # Ensure latitude/longitude exist
-    if not {'latitude', 'longitude'}.issubset(df.columns):
-        raise ValueError(f"Missing coordinate columns. Found: {list(df.columns)}")
 
-    # Drop rows with missing coordinates
-    df = df[df['latitude'].notna() & df['longitude'].notna()]
+def normalize_data(df):
+    return normalize_frame(df, SCHEMA)
 
-    # ✅ Replace NaN only in **non-numeric columns**
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            df[col] = df[col].fillna('-')
-        else:
-            # For numeric columns, fill NaN with 0 (keeps math valid)
-            df[col] = df[col].fillna(0)
 
-    return df
+def load_data(filepath):
+    # Reads the columnar snapshot when it is fresh, else the Excel file
+    return load_dataset(filepath, SCHEMA)
 
 
 
 
 
-def get_marker_color(status):
-    status_colors = {
-        'completed': '#10b981',
-        'ongoing': '#f59e0b',
-        'planned': '#6366f1',
-        'under construction': '#f97316',
-        'approved': '#8b5cf6'
-    }
-    return status_colors.get(str(status).lower(), '#6b7280')
+# Statuses are matched as written (lowercased)
+STATUS = StatusScheme({
+    'completed': '#10b981',
+    'ongoing': '#f59e0b',
+    'planned': '#6366f1',
+    'under construction': '#f97316',
+    'approved': '#8b5cf6'
+})
+get_marker_color = STATUS.color
 
 
-def create_map(df):
+def base_map():
     m = folium.Map(location=[15.3173, 75.7139], zoom_start=7, tiles='CartoDB dark_matter')
     folium.TileLayer('OpenStreetMap', name='Street View').add_to(m)
     folium.TileLayer('CartoDB positron', name='Light Mode').add_to(m)
+    return m
 
-    marker_cluster = MarkerCluster(name='Projects', overlay=True, control=True,
-                                   icon_create_function="""
-        function(cluster) {
-            var count = cluster.getChildCount();
-            return L.divIcon({
-                html: '<div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; font-weight: bold; box-shadow: 0 4px 12px rgba(0,0,0,0.3);">' + count + '</div>',
-                className: 'custom-cluster-icon',
-                iconSize: L.point(40, 40)
-            });
-        }
-        """).add_to(m)
 
-    for _, row in df.iterrows():
-        try:
-            lat, lon = float(row['latitude']), float(row['longitude'])
-            status = str(row.get('current_status', 'N/A'))
-            color = get_marker_color(status)
-            popup_html = f"""
+def popup_html(row, status, color):
+    return f"""
 <div style="font-family: 'Segoe UI'; min-width: 300px;">
     <div style="background: {color}; color: white; padding: 10px; border-radius: 6px 6px 0 0;">
         <h4 style="margin: 0;">{row.get('project_name', 'N/A')}</h4>
@@ -90,84 +104,198 @@ def create_map(df):
 </div>
 """
 
+
+def marker_cluster():
+    return MarkerCluster(name='Projects', overlay=True, control=True,
+                         icon_create_function="""
+        function(cluster) {
+            var count = cluster.getChildCount();
+            return L.divIcon({
+                html: '<div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; font-weight: bold; box-shadow: 0 4px 12px rgba(0,0,0,0.3);">' + count + '</div>',
+                className: 'custom-cluster-icon',
+                iconSize: L.point(40, 40)
+            });
+        }
+        """)
+
+
+def create_map(frames):
+    m = base_map()
+    cluster = marker_cluster().add_to(m)
+
+    # One conversion to plain dicts instead of boxing every row into a Series
+    fields = frames.fields
+    for row, lat, lon, status in zip(to_records(frames.table), fields['lat'].tolist(),
+                                     fields['lon'].tolist(), fields['status'].tolist()):
+        try:
+            color = get_marker_color(status)
+
             folium.CircleMarker(
                 location=[lat, lon],
                 radius=8,
-                popup=folium.Popup(popup_html, max_width=350),
+                popup=folium.Popup(popup_html(row, status, color), max_width=350),
                 tooltip=f"<b>{row.get('project_name', 'N/A')}</b><br><i>{status}</i>",
                 color=color,
                 fill=True,
                 fillColor=color,
                 fillOpacity=0.8,
                 weight=2
-            ).add_to(marker_cluster)
+            ).add_to(cluster)
         except Exception:
             continue
 
     MiniMap(toggle_display=True).add_to(m)
     folium.LayerControl().add_to(m)
-    return m._repr_html_()
+    return m.get_root().render()
+
+
+# Same markers, clusters and popups as create_map, packed into one data array
+def create_bulk_map(frames, dataset='irrigation1'):
+    m = base_map()
+    cluster = marker_cluster().add_to(m)
+    bulk_points(dataset, frames.fields, get_marker_color, cluster, tooltip=True,
+                radius=8, weight=2, max_width=350).add_to(m)
+    MiniMap(toggle_display=True).add_to(m)
+    folium.LayerControl().add_to(m)
+    return m.get_root().render()
+
+
+# Map without markers: points (for the current filters) are fetched per
+# viewport from the GeoJSON API
+def create_map_shell(dataset, query=None):
+    m = base_map()
+    lazy_points(dataset, query, radius=8, max_width=350).add_to(m)
+    MiniMap(toggle_display=True).add_to(m)
+    folium.LayerControl().add_to(m)
+    return m.get_root().render()
+
+
+# --- GeoJSON / lazy popup sources ---
+def get_points(frames):
+    fields = frames.fields
+    return pd.DataFrame({
+        'id': fields.index,
+        'lat': fields['lat'],
+        'lon': fields['lon'],
+        'name': fields['name'],
+        'status': fields['status'],
+        'color': STATUS.color_series(fields['status']),
+    }, index=fields.index)
 
 
-def get_statistics(df):
+def get_popup(frames, feature_id):
+    if feature_id not in frames.table.index:
+        return None
+    row = to_records(frames.table.loc[[feature_id]])[0]
+    status = frames.fields.at[feature_id, 'status']
+    return popup_html(row, status, get_marker_color(status))
+
+
+# Read from the aggregates built when the sheet was loaded
+def get_statistics(frames):
+    totals = frames.aggregates.totals()
     return {
-        'total_projects': len(df),
-        'total_amount': df.get('dpr_approval_amount', pd.Series(dtype=float)).sum(skipna=True),
-        'total_hectares': df.get('hectares_irrigated', pd.Series(dtype=float)).sum(skipna=True),
-        'status_breakdown': df.get('current_status', pd.Series(dtype=str)).value_counts().to_dict()
+        'total_projects': totals['count'],
+        'total_amount': totals['amount'],
+        'total_hectares': totals['hectares'],
+        'status_breakdown': frames.aggregates.counts('status')
     }
 
 
-def get_projects_list(df):
-    return [
-        {
-            'id': idx,
-            'name': row.get('project_name', 'N/A'),
-            'status': str(row.get('current_status', 'N/A')),
-            'amount': row.get('dpr_approval_amount', 0),
-            'hectares': row.get('hectares_irrigated', 0),
-            'region': row.get('region', 'N/A'),
-            'type': row.get('project_type', 'N/A'),
-            'lat': row.get('latitude'),
-            'lng': row.get('longitude'),
-            'districts': row.get('districts_benefitted', 'N/A'),
-            'purpose': row.get('primary_purpose', 'N/A'),
-            'dpr_date': str(row.get('dpr_approval_date', 'N/A'))
-        }
-        for idx, row in df.iterrows()
-    ]
+# Sidebar project list (served page by page from /api/<dataset>/projects)
+def get_projects_frame(frames):
+    fields = frames.fields
+    projects = pd.DataFrame({
+        'id': fields.index,
+        'name': fields['name'],
+        'status': fields['status'],
+        'amount': fields['amount'],
+        'hectares': fields['hectares'],
+        'region': fields['region'],
+        'type': fields['type'],
+        'lat': to_optional_float(fields['lat']),
+        'lng': to_optional_float(fields['lon']),
+        'districts': fields['district'],
+        'purpose': fields['purpose'],
+        'dpr_date': fields['dpr_date']
+    }, index=fields.index)
+    return projects
+
+
+# Cleaned sheet + canonical fields, parsed once per file version
+def get_frames(file_path):
+    return dataset_cache.get(os.path.join(DATA_DIR, file_path), load_data)
+
+
+# Frames selected by the query-string filters (status=..., amount__min=...)
+def get_filtered_frames(file_path, args):
+    return filter_frames(get_frames(file_path), args)
+
+
+# Frame behind the data table (served page by page from /api/<dataset>/rows)
+def get_table_frame(file_path, args):
+    return get_filtered_frames(file_path, args).table
 
 
 # ✅ NEW FUNCTION — Used by the new multi-tab system
-def show_dashboard(file_path):
+def show_dashboard(file_path, dataset='irrigation1'):
     filepath = os.path.join(DATA_DIR, file_path)
     try:
-        # Load Excel file
-        df = load_data(filepath)
-        map_html = create_map(df)
-        stats = get_statistics(df)
-        projects = get_projects_list(df)
+        # Load Excel file (parsed once per file version)
+        with stage('load'):
+            frames_all = dataset_cache.get(filepath, load_data)
+    except Exception:
+        # Empty page with a 503, so the HTTP cache does not keep it (e.g. a
+        # workbook read while it was being written)
+        stats = {'total_projects': 0, 'total_amount': 0, 'total_hectares': 0, 'status_breakdown': {}}
+        return render_template('index.html', map_url=map_url(), stats=stats, columns=[], dataset=dataset), 503
+
+    # Query-string filters; a malformed one is the request's fault (400, as on /api)
+    try:
+        with stage('filter'):
+            query = parse_filters(request.args, frames_all.filter_index)
+            frames = frames_all.select(query)
+    except FilterError as e:
+        return f"<p style='color:red;'>{escape(str(e))}</p>", 400
+    record_rows(len(frames))
+    with stage('stats'):
+        stats = get_statistics(frames)
+
+    # ✅ Table rows and the project list are fetched page by page from the API
+    columns = frames.table.columns.tolist()
+
+    # Pass everything to the HTML; the map loads from <dashboard>/map
+    with stage('render'):
+        return render_template(
+            'index.html',
+            map_url=map_url(),
+            stats=stats,
+            columns=columns,
+            dataset=dataset
+        )
 
-        # ✅ New part: get all columns + full data
-        columns = df.columns.tolist()
-        table_data = df.to_dict(orient='records')
 
+# Map document behind the dashboard's iframe, for the same filters
+def show_map(file_path, dataset='irrigation1'):
+    filepath = os.path.join(DATA_DIR, file_path)
+    try:
+        with stage('load'):
+            frames_all = dataset_cache.get(filepath, load_data)
+        with stage('filter'):
+            query = parse_filters(request.args, frames_all.filter_index)
+        with stage('map'):
+            if MAP_MODE == 'geojson':
+                # The shell carries no data, so one render serves every data version
+                map_key = make_key(dataset, 'shell', filters=query.key())
+                return map_cache.get_or_render(map_key, lambda: create_map_shell(dataset, query.params))
+            map_key = make_key(filepath, dataset_cache.version(filepath), filters=query.key())
+            if MAP_MODE == 'bulk':
+                return map_cache.get_or_render(map_key, lambda: create_bulk_map(frames_all.select(query), dataset))
+            return map_cache.get_or_render(map_key, lambda: create_map(frames_all.select(query)))
+    except FilterError as e:
+        return f"<p style='color:red;'>{escape(str(e))}</p>", 400
     except Exception as e:
-        map_html = f"<p style='color:red;'>Error loading map: {str(e)}</p>"
-        stats = {'total_projects': 0, 'total_amount': 0, 'total_hectares': 0, 'status_breakdown': {}}
-        projects = []
-        columns = []
-        table_data = []
-
-    # Pass everything to the HTML
-    return render_template(
-        'index.html',
-        map_html=map_html,
-        stats=stats,
-        projects=projects,
-        columns=columns,
-        table_data=table_data
-    )
+        return f"<p style='color:red;'>Error loading map: {str(e)}</p>", 500
 
 # 🟢 Keep this for testing alone (optional)
 if __name__ == '__main__':
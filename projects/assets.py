@@ -0,0 +1,163 @@
+import gzip
+import hashlib
+import os
+import re
+import threading
+
+from flask import Response, abort, request, url_for
+
+try:
+    import brotli
+except ImportError:  # gzip only without the brotli package
+    brotli = None
+
+try:
+    import rcssmin
+    import rjsmin
+except ImportError:  # the built-in minifiers below are used instead
+    rcssmin = rjsmin = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = os.path.join(ROOT, 'assets')
+# Where flask --app app build-assets writes the bundles for a front proxy
+BUILD_DIR = os.path.join(ROOT, 'static', 'assets')
+# bundle -> source files (in assets/), concatenated in order
+BUNDLES = {
+    'dashboard.css': ['dashboard.css'],
+    'dashboard.js': ['dashboard.js'],
+}
+MIMETYPES = {'.css': 'text/css', '.js': 'text/javascript'}
+# A bundle's URL changes with its content, so clients keep it for a year
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+# --- Minification ---
+# Conservative: comments and layout whitespace only, nothing is renamed
+def minify_css(text):
+    if rcssmin:
+        return rcssmin.cssmin(text)
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+# Line-based: indentation, blank lines and whole-line // comments go (a
+# trailing comment could be part of a string, so it stays)
+def minify_js(text):
+    if rjsmin:
+        return rjsmin.jsmin(text)
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+# --- Bundles ---
+# Built once per process (like http_cache.BUILD): sources concatenated,
+# minified, named by a hash of the result (dashboard.3fa9c1d2e4b7.css) and
+# compressed once per encoding at the highest level.
+class Bundle:
+    def __init__(self, name, sources):
+        stem, ext = os.path.splitext(name)
+        parts = []
+        for source in sources:
+            with open(os.path.join(ASSETS_DIR, source), encoding='utf-8') as f:
+                parts.append(f.read())
+        raw = '\n'.join(parts)
+        body = MINIFIERS[ext](raw).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+
+        self.name = name
+        self.filename = f'{stem}.{digest[:12]}{ext}'
+        self.etag = digest[:20]
+        self.mimetype = MIMETYPES[ext]
+        self.source_bytes = len(raw.encode('utf-8'))
+        self.bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli:
+            self.bodies['br'] = brotli.compress(body, quality=11)
+
+
+class AssetPipeline:
+    def __init__(self, bundles=BUNDLES):
+        self.bundles = bundles
+        self._built = None
+        self._lock = threading.Lock()
+        self.served = 0
+
+    def build(self):
+        if self._built is None:
+            with self._lock:
+                if self._built is None:
+                    self._built = {name: Bundle(name, sources) for name, sources in self.bundles.items()}
+        return self._built
+
+    # Template helper: {{ asset_url('dashboard.js') }} -> /assets/dashboard.<hash>.js
+    def url(self, name):
+        return url_for('asset', filename=self.build()[name].filename)
+
+    def lookup(self, filename):
+        for bundle in self.build().values():
+            if bundle.filename == filename:
+                with self._lock:
+                    self.served += 1
+                return bundle
+        return None
+
+    # Bundles plus .gz / .br siblings, for a proxy serving them directly
+    def write(self, out_dir=BUILD_DIR):
+        os.makedirs(out_dir, exist_ok=True)
+        written = []
+        suffixes = {'identity': '', 'gzip': '.gz', 'br': '.br'}
+        for bundle in self.build().values():
+            for encoding, body in bundle.bodies.items():
+                path = os.path.join(out_dir, bundle.filename + suffixes[encoding])
+                with open(path, 'wb') as f:
+                    f.write(body)
+                written.append((path, len(body)))
+        return written
+
+    def stats(self):
+        return {
+            'bundles': {name: {'url': bundle.filename, 'source_bytes': bundle.source_bytes,
+                               **{f'{encoding}_bytes': len(body) for encoding, body in bundle.bodies.items()}}
+                        for name, bundle in self.build().items()},
+            'served': self.served,
+        }
+
+
+assets = AssetPipeline()
+
+
+def negotiate(bundle):
+    for encoding in ('br', 'gzip'):
+        if encoding in bundle.bodies and encoding in request.accept_encodings:
+            return encoding
+    return 'identity'
+
+
+# GET /assets/<name>.<hash>.<ext>: the precompressed body for the client's
+# encoding, immutable (a changed bundle gets a new URL); unknown or
+# superseded hashes are 404
+def serve_asset(filename):
+    bundle = assets.lookup(filename)
+    if bundle is None:
+        abort(404)
+    if request.if_none_match.contains_weak(bundle.etag):
+        response = Response(status=304)
+    else:
+        encoding = negotiate(bundle)
+        response = Response(bundle.bodies[encoding], mimetype=bundle.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(bundle.etag)
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def init_assets(app):
+    app.add_url_rule('/assets/<path:filename>', 'asset', serve_asset)
+    app.jinja_env.globals['asset_url'] = assets.url
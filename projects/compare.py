@@ -0,0 +1,205 @@
+import math
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from projects.dataset_cache import DatasetCache
+from projects.datasets import get_dataset
+from projects.search_index import tokenize
+
+# Datasets compared by default: the FY 2020-21 KNNL list (before) against
+# the 2024 annual report (after)
+DEFAULT_BEFORE = 'irrigation2'
+DEFAULT_AFTER = 'irrigation1'
+# Words every project name carries; they neither block nor score
+GENERIC_WORDS = {'project', 'projects', 'scheme', 'schemes', 'work', 'works', 'the', 'of', 'and',
+                 'to', 'from', 'for', 'in', 'at', 'near', 'under'}
+# Tokens shared by more names than this are too common to block on
+MAX_BLOCK = 50
+# Pairs scoring below this are not matched
+MIN_CONFIDENCE = 0.5
+# Confidence kept when both districts are known and share no word
+DISTRICT_MISMATCH = 0.8
+
+
+# --- Name normalization ---
+def name_key(name):
+    return frozenset(token for token in tokenize(name) if token not in GENERIC_WORDS)
+
+
+def district_words(value):
+    return frozenset(tokenize(value))
+
+
+# --- Blocked matching ---
+# Candidate pairs are names sharing at least one informative token (a token
+# held by at most MAX_BLOCK names on the other side), scored by the
+# idf-weighted overlap of their tokens; each project is matched at most
+# once, best pairs first. Work grows with the block sizes, not with
+# len(before) * len(after).
+def match_names(before_names, after_names):
+    before_keys = [name_key(name) for name in before_names]
+    after_keys = [name_key(name) for name in after_names]
+    frequency = Counter(token for key in before_keys + after_keys for token in key)
+    total = max(len(before_keys) + len(after_keys), 1)
+    idf = {token: math.log(1 + total / count) for token, count in frequency.items()}
+
+    blocks = defaultdict(list)
+    for j, key in enumerate(after_keys):
+        for token in key:
+            blocks[token].append(j)
+
+    pairs = []
+    for i, key in enumerate(before_keys):
+        candidates = set()
+        for token in key:
+            block = blocks.get(token, ())
+            if len(block) <= MAX_BLOCK:
+                candidates.update(block)
+        for j in candidates:
+            other = after_keys[j]
+            union = sum(idf[t] for t in key | other)
+            if union:
+                pairs.append((sum(idf[t] for t in key & other) / union, i, j))
+    return pairs
+
+
+def assign(pairs, min_confidence):
+    used_before, used_after, matches = set(), set(), []
+    for score, i, j in sorted(pairs, key=lambda pair: (-pair[0], pair[1], pair[2])):
+        if score < min_confidence:
+            break
+        if i in used_before or j in used_after:
+            continue
+        used_before.add(i)
+        used_after.add(j)
+        matches.append((i, j, score))
+    return matches
+
+
+# --- Materialized join ---
+# One row per matched project: both names, the status transition and the
+# amount / hectare changes (after - before, in each sheet's own units) with
+# the match confidence; plus a summary computed once with it
+class Comparison:
+    def __init__(self, before, after):
+        self.before = before['name']
+        self.after = after['name']
+        old, new = before['frames']().fields, after['frames']().fields
+
+        pairs = match_names(old['name'].tolist(), new['name'].tolist())
+        old_districts = [district_words(v) for v in old['district'].tolist()]
+        new_districts = [district_words(v) for v in new['district'].tolist()]
+        scored = []
+        for score, i, j in pairs:
+            if old_districts[i] and new_districts[j] and not old_districts[i] & new_districts[j]:
+                score *= DISTRICT_MISMATCH
+            scored.append((score, i, j))
+        matches = assign(scored, MIN_CONFIDENCE)
+
+        i = np.array([m[0] for m in matches], dtype=int)
+        j = np.array([m[1] for m in matches], dtype=int)
+        a, b = old.iloc[i], new.iloc[j]
+        status_before = a['status'].astype(str).str.strip().str.lower().to_numpy()
+        status_after = b['status'].astype(str).str.strip().str.lower().to_numpy()
+        self.table = pd.DataFrame({
+            'before_id': a.index.to_numpy(),
+            'after_id': b.index.to_numpy(),
+            'before_name': a['name'].to_numpy(),
+            'after_name': b['name'].to_numpy(),
+            'district': b['district'].to_numpy(),
+            'before_status': status_before,
+            'after_status': status_after,
+            'status_changed': status_before != status_after,
+            'before_amount': a['amount'].to_numpy(dtype=float),
+            'after_amount': b['amount'].to_numpy(dtype=float),
+            'amount_change': b['amount'].to_numpy(dtype=float) - a['amount'].to_numpy(dtype=float),
+            'before_hectares': a['hectares'].to_numpy(dtype=float),
+            'after_hectares': b['hectares'].to_numpy(dtype=float),
+            'hectares_change': b['hectares'].to_numpy(dtype=float) - a['hectares'].to_numpy(dtype=float),
+            'confidence': np.round([m[2] for m in matches], 3) if matches else np.zeros(0),
+        })
+        self.table.insert(8, 'transition', np.where(self.table['status_changed'],
+                                                    self.table['before_status'] + ' → ' + self.table['after_status'],
+                                                    'unchanged'))
+
+        changed = self.table[self.table['status_changed']]
+        transitions = changed.groupby('transition', sort=False).size().sort_values(ascending=False, kind='stable')
+        self.summary = {
+            'before': {'dataset': self.before, 'title': before['title'], 'projects': len(old)},
+            'after': {'dataset': self.after, 'title': after['title'], 'projects': len(new)},
+            'matched': len(self.table),
+            'candidate_pairs': len(pairs),
+            'status_changed': len(changed),
+            'transitions': [{'transition': t, 'count': int(n)} for t, n in transitions.items()],
+            'amount_change': float(self.table['amount_change'].sum()),
+            'hectares_change': float(self.table['hectares_change'].sum()),
+            'mean_confidence': round(float(self.table['confidence'].mean()), 3) if len(self.table) else None,
+        }
+
+    # Rows for changed=status|amount|hectares|any and min_confidence (the
+    # API then searches, sorts and pages them like any table)
+    def select(self, changed='', min_confidence=None):
+        df = self.table
+        if changed == 'status':
+            df = df[df['status_changed']]
+        elif changed in ('amount', 'hectares'):
+            df = df[df[f'{changed}_change'] != 0]
+        elif changed == 'any':
+            df = df[df['status_changed'] | (df['amount_change'] != 0) | (df['hectares_change'] != 0)]
+        if min_confidence:
+            df = df[df['confidence'] >= min_confidence]
+        return df
+
+
+# --- One join per pair of dataset versions ---
+# Rebuilt only when either workbook changes; requests filter, sort and page
+# the materialized table.
+class ComparisonCache:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, before=DEFAULT_BEFORE, after=DEFAULT_AFTER):
+        before, after = get_dataset(before), get_dataset(after)
+        version = (DatasetCache.fingerprint(before['path']), DatasetCache.fingerprint(after['path']))
+        key = (before['name'], after['name'])
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        comparison = Comparison(before, after)
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = (version, comparison)
+        return comparison
+
+    # Rebuilds the cached comparisons involving a dataset (called by the data
+    # watcher once the new version is published)
+    def refresh(self, name):
+        for before, after in [key for key in self._entries if name in key]:
+            self.get(before, after)
+
+    def clear(self):
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'builds': self.builds,
+                'matched': {f'{a}->{b}': len(entry[1].table) for (a, b), entry in self._entries.items()},
+            }
+
+
+comparisons = ComparisonCache()
@@ -0,0 +1,122 @@
+import os
+import threading
+
+from projects.sources import source_fingerprint
+
+
+# Versions pushed by the file watcher (projects/watcher.py): while a source
+# is watched, its fingerprint is read from here instead of stat-ing the
+# workbook(s) on every call, and only changes when its rows did
+_published = {}
+
+
+# A source that could not be read or parsed (missing, mid-write, failing the
+# schema's column checks); /api answers 503 for it, like the dashboards
+class DatasetUnavailable(Exception):
+    pass
+
+
+# --- Parsed dataset cache ---
+# Keeps the cleaned result of a loader per source file and only calls the
+# loader again when the file's mtime or size changes, so dashboards stop
+# re-parsing the workbooks on every request.
+class DatasetCache:
+    def __init__(self):
+        self._entries = {}
+        self._loaders = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    @staticmethod
+    def fingerprint(path):
+        published = _published.get(os.path.abspath(path))
+        return published if published is not None else source_fingerprint(path)
+
+    @staticmethod
+    def publish(path, fingerprint):
+        if fingerprint is None:
+            _published.pop(os.path.abspath(path), None)
+        else:
+            _published[os.path.abspath(path)] = fingerprint
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, path, loader):
+        key = os.path.abspath(path)
+        try:
+            fingerprint = self.fingerprint(path)
+        except OSError as e:
+            raise DatasetUnavailable(f"{path}: {e}") from e
+        self._loaders[key] = loader
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        # One loader call per file at a time; threads that queued up behind
+        # it pick up the fresh entry instead of parsing the workbook again.
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                with self._lock:
+                    self.hits += 1
+                return entry[1]
+
+            try:
+                value = loader(path)
+            except Exception as e:
+                raise DatasetUnavailable(f"{path}: {e}") from e
+            with self._lock:
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.reloads += 1
+                self._entries[key] = (fingerprint, value)
+            return value
+
+    # (fingerprint, value) currently held for a path and the loader that
+    # produced it, or None; replace() swaps in a value loaded elsewhere (the
+    # watcher loads the new version before requests see it)
+    def peek(self, path):
+        key = os.path.abspath(path)
+        entry = self._entries.get(key)
+        return (entry[0], entry[1], self._loaders[key]) if entry is not None else None
+
+    def replace(self, path, fingerprint, value):
+        with self._lock:
+            self.reloads += 1
+            self._entries[os.path.abspath(path)] = (fingerprint, value)
+
+    def version(self, path):
+        entry = self._entries.get(os.path.abspath(path))
+        return entry[0] if entry else None
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                dropped = 1 if self._entries.pop(os.path.abspath(path), None) else 0
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'files': sorted(self._entries),
+            }
+
+
+# Shared by every blueprint in the process
+dataset_cache = DatasetCache()
@@ -0,0 +1,50 @@
+# --- Dataset registry ---
+# Each blueprint registers its source file, the function that turns the raw
+# sheet into its cleaned frame, and callables for the APIs:
+#   table(args)   -> frame the data table shows for the given query args
+#   projects(args) -> sidebar project list (id, name, status, region,
+#                    lat, lng, ...) for the given query args
+#   points(args)  -> id/lat/lon/name/status/color frame for the map
+#   popup(id)     -> popup HTML for one map feature (None if unknown)
+#   stats(args)   -> pre-grouped AggregateStore for the given query args
+#   frames()      -> current DatasetFrames (table, fields, aggregates, filters)
+#   dashboard     -> URL of the dataset's dashboard page (default /<name>)
+#   filters       -> dataset-specific filter params on top of the generic
+#                    ones, {param: fn(value) -> filter clause} (see
+#                    projects/filters.py; e.g. irrigation3's dam_type)
+#   schema        -> declarative sheet layout (see projects/adapters.py)
+#   precompute    -> {'dimensions': fn(frames) -> {param: [values]},
+#                    'build': fn(args) -> dashboard artifacts}; every
+#                    combination is built in the background (see
+#                    projects/precompute.py)
+# Shared tooling (snapshot builder, APIs) walks this instead of reaching
+# into blueprint internals.
+DATASETS = {}
+
+
+def register_dataset(name, path, normalize, title=None, table=None, projects=None, points=None,
+                     popup=None, stats=None, frames=None, filters=None, schema=None, dashboard=None,
+                     precompute=None):
+    DATASETS[name] = {
+        'name': name,
+        'title': title or name,
+        'path': path,
+        'normalize': normalize,
+        'table': table,
+        'projects': projects,
+        'points': points,
+        'popup': popup,
+        'stats': stats,
+        'frames': frames,
+        'filters': filters or {},
+        'schema': schema,
+        'dashboard': dashboard or f'/{name}',
+        'precompute': precompute,
+    }
+    return DATASETS[name]
+
+
+def get_dataset(name):
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset: {name}")
+    return DATASETS[name]
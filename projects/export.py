@@ -0,0 +1,71 @@
+import os
+import tempfile
+
+from flask import Response
+from openpyxl import Workbook
+
+from projects.frame_utils import to_rows
+
+# Rows formatted per chunk: each chunk is converted, sent and dropped, so
+# memory stays flat however large the export is
+CHUNK_ROWS = 2000
+# Read size when streaming a finished xlsx file
+FILE_CHUNK_BYTES = 256 * 1024
+
+
+def chunks(df):
+    for start in range(0, len(df), CHUNK_ROWS):
+        yield df.iloc[start:start + CHUNK_ROWS]
+
+
+# --- Formats ---
+# Each yields the body piece by piece; CSV and NDJSON start with the first
+# chunk, xlsx once openpyxl's write-only workbook (rows go straight to a
+# temporary file) has been saved.
+def csv_stream(df):
+    yield df.iloc[:0].to_csv(index=False)
+    for chunk in chunks(df):
+        yield chunk.to_csv(index=False, header=False)
+
+
+def ndjson_stream(df):
+    for chunk in chunks(df):
+        text = chunk.to_json(orient='records', lines=True, date_format='iso', force_ascii=False)
+        yield text if text.endswith('\n') else text + '\n'
+
+
+def xlsx_stream(df):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Projects')
+    sheet.append([str(col) for col in df.columns])
+    for chunk in chunks(df):
+        for row in to_rows(chunk):
+            sheet.append(row)
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook.save(path)
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(FILE_CHUNK_BYTES)
+                if not data:
+                    break
+                yield data
+    finally:
+        os.remove(path)
+
+
+EXPORTS = {
+    'csv': (csv_stream, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (ndjson_stream, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+    'xlsx': (xlsx_stream, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
+def export_response(df, fmt, name):
+    stream, mimetype, extension = EXPORTS[fmt]
+    return Response(stream(df), content_type=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{name}.{extension}"',
+        'X-Total-Rows': str(len(df)),
+    })
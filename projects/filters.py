@@ -0,0 +1,206 @@
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+
+
+# --- Filter engine ---
+# Built once per dataset version from the canonical fields:
+#   categorical fields (status, district, type, ...) keep one packed bitmap
+#     of rows per distinct value, so equality and substring filters OR the
+#     bitmaps of the matching values (a scan over the distinct values only)
+#   numeric fields (amount, hectares, dam length, ...) keep their values
+#     sorted, so a range is two binary searches
+# A query ANDs its clauses and each clause ORs its values, so any AND/OR
+# combination resolves by bitmap intersection instead of column scans.
+#
+# Query string (the same on every dashboard and /api/<dataset>/ route):
+#   status=completed,ongoing        any of the values (case-insensitive)
+#   type__contains=gravity          substring of the value
+#   amount__min=10&amount__max=50   inclusive range on a numeric field
+#   or=status:completed|type__contains:earth   any of several clauses
+# Params that name no filterable field (page, sort, bbox, ...) are left to
+# the routes.
+OPERATORS = ('eq', 'contains', 'min', 'max')
+
+# Numeric ranges matching at most 1/SPARSE_FRACTION of the rows are built
+# from the sorted positions, wider ones by comparing the column
+SPARSE_FRACTION = 16
+
+
+class FilterError(ValueError):
+    pass
+
+
+class FilterQuery:
+    def __init__(self):
+        self.groups = []  # clauses (field, op, values) ORed per group, groups ANDed
+        self.params = []  # the (name, value) query params the groups came from
+
+    def __bool__(self):
+        return bool(self.groups)
+
+    def add(self, clauses, name, value):
+        self.groups.append(clauses)
+        self.params.append((name, value))
+
+    def fields(self):
+        return {field for group in self.groups for field, _, _ in group}
+
+    # Stable text form, for cache keys
+    def key(self):
+        return urlencode(sorted(self.params))
+
+
+class FilterIndex:
+    def __init__(self, fields, names):
+        self.size = len(fields)
+        self.values = {}   # categorical field -> distinct values (stripped, lowercased)
+        self.bitmaps = {}  # categorical field -> packed row bitmap per distinct value
+        self.sorted = {}   # numeric field -> (values, sorted values, their row positions, non-NaN count)
+        for name in names:
+            if name not in fields.columns:
+                continue
+            if pd.api.types.is_numeric_dtype(fields[name]):
+                self._add_numeric(name, fields[name])
+            else:
+                self._add_categorical(name, fields[name])
+
+    def _add_numeric(self, name, column):
+        values = column.to_numpy(dtype=float)
+        order = np.argsort(values, kind='stable')
+        self.sorted[name] = (values, values[order], order, int(np.count_nonzero(~np.isnan(values))))
+
+    def _add_categorical(self, name, column):
+        codes, uniques = pd.factorize(column.astype(str).str.strip().str.lower())
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self.values[name] = list(uniques)
+        self.bitmaps[name] = [self._bitmap(order[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def _bitmap(self, positions):
+        bits = np.zeros(self.size, dtype=bool)
+        bits[positions] = True
+        return np.packbits(bits)
+
+    def _union(self, bitmaps):
+        result = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for bitmap in bitmaps:
+            np.bitwise_or(result, bitmap, out=result)
+        return result
+
+    def fields(self):
+        return set(self.bitmaps) | set(self.sorted)
+
+    def clause(self, field, op, values):
+        if field in self.bitmaps:
+            return self._categorical(field, op, values)
+        if field in self.sorted:
+            return self._numeric(field, op, values)
+        raise FilterError(f"Cannot filter by '{field}'")
+
+    def _categorical(self, field, op, values):
+        uniques = self.values[field]
+        if op == 'eq':
+            wanted = {value.strip().lower() for value in values}
+            hits = [i for i, unique in enumerate(uniques) if unique in wanted]
+        elif op == 'contains':
+            needles = [value.lower() for value in values]
+            hits = [i for i, unique in enumerate(uniques) if any(n in unique for n in needles)]
+        else:
+            raise FilterError(f"'{field}' is not numeric; use {field}= or {field}__contains=")
+        return self._union(self.bitmaps[field][i] for i in hits)
+
+    def _numeric(self, field, op, values):
+        if op == 'contains':
+            raise FilterError(f"'{field}' is numeric; use {field}=, {field}__min= or {field}__max=")
+        try:
+            numbers = [float(value.replace(',', '')) for value in values]
+        except ValueError:
+            raise FilterError(f"'{field}' needs numbers, got {', '.join(values)}")
+
+        values, ordered, order, valid = self.sorted[field]
+        ordered = ordered[:valid]
+        if op == 'eq':
+            positions = np.concatenate([order[np.searchsorted(ordered, n, 'left'):np.searchsorted(ordered, n, 'right')]
+                                        for n in numbers])
+            return self._bitmap(positions)
+        if op == 'min':
+            start, end = np.searchsorted(ordered, min(numbers), 'left'), valid
+        else:
+            start, end = 0, np.searchsorted(ordered, max(numbers), 'right')
+        # Selective ranges set their few rows; wide ones are cheaper as one
+        # sequential comparison than as scattered writes
+        if end - start <= self.size // SPARSE_FRACTION:
+            return self._bitmap(order[start:end])
+        if op == 'min':
+            return np.packbits(values >= min(numbers))
+        return np.packbits(values <= max(numbers))
+
+    # Boolean row mask for the query (every row when it is empty)
+    def mask(self, query):
+        result = None
+        for group in query.groups:
+            bits = self._union(self.clause(*clause) for clause in group)
+            result = bits if result is None else np.bitwise_and(result, bits, out=result)
+        if result is None:
+            return np.ones(self.size, dtype=bool)
+        return np.unpackbits(result, count=self.size).astype(bool)
+
+
+# --- Query string -> FilterQuery ---
+def split_values(value):
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+# 'amount__min' -> ('amount', 'min'); None when it names no filterable field
+def split_name(name, fields):
+    field, _, op = name.partition('__')
+    op = op or 'eq'
+    if field not in fields or op not in OPERATORS:
+        return None
+    return field, op
+
+
+# 'status:completed,ongoing' / 'type__contains:earth' inside or=
+def parse_clause(text, fields):
+    name, _, value = text.partition(':')
+    target = split_name(name.strip(), fields)
+    if target is None:
+        raise FilterError(f"Cannot filter by '{name.strip()}'")
+    values = split_values(value)
+    if not values:
+        raise FilterError(f"No value for '{name.strip()}'")
+    return target + (values,)
+
+
+# aliases: {param: fn(value) -> (field, op, values) or None} for dataset
+# specific params such as irrigation3's dam_type / dam_length
+def parse_filters(args, index, aliases=None):
+    aliases = aliases or {}
+    fields = index.fields()
+    pairs = args.items(multi=True) if hasattr(args, 'getlist') else args.items()
+    query = FilterQuery()
+    for name, value in pairs:
+        value = (value or '').strip()
+        if not value:
+            continue
+        if name in aliases:
+            clause = aliases[name](value)
+            if clause:
+                query.add([clause], name, value)
+        elif name == 'or':
+            clauses = [parse_clause(part, fields) for part in value.split('|') if part.strip()]
+            if clauses:
+                query.add(clauses, name, value)
+        else:
+            target = split_name(name, fields)
+            values = split_values(value)
+            if target and values:
+                query.add([target + (values,)], name, value)
+    return query
+
+
+# Frames (rows + aggregates) selected by a request's filter params
+def filter_frames(frames, args, aliases=None):
+    return frames.select(parse_filters(args, frames.filter_index, aliases))
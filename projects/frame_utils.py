@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+
+# --- Column-wise helpers shared by the dashboards ---
+# These replace per-row iterrows()/per-value loops with one vectorized pass.
+
+# Column if present, else a constant column aligned with df
+def column(df, name, default=None):
+    if name in df.columns:
+        return df[name]
+    return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+
+# Float per cell; blanks, '-', 'nan' and other text become `default`.
+# Values that are already numbers skip the string round-trip entirely.
+def to_float(series, default=0.0):
+    values = pd.to_numeric(series, errors='coerce')
+    retry = values.isna() & series.notna()
+    if retry.any():
+        text = series[retry].astype(str).str.replace(',', '', regex=False).str.strip()
+        values = values.astype(float)
+        values[retry] = pd.to_numeric(text, errors='coerce')
+    return values.fillna(default)
+
+
+# Float per cell, None where the value is missing or not a number
+def to_optional_float(series):
+    values = pd.to_numeric(series, errors='coerce')
+    return values.astype(object).where(values.notna(), None)
+
+
+# Apply fn once per distinct value instead of once per row: the column is
+# factorized into category codes, fn runs over the (text of the) uniques and
+# the results are gathered back by code. Missing cells are passed as 'nan'.
+def map_unique(series, fn):
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    lookup = np.empty(len(uniques) + 1, dtype=object)
+    lookup[:-1] = [fn(str(value)) for value in uniques]
+    lookup[-1] = fn('nan')
+    return pd.Series(lookup[codes], index=series.index)
+
+
+# Rows as plain dicts, built from one tolist() per column (much cheaper than
+# iterrows() or to_dict(orient='records') on string/Arrow-backed columns)
+def to_records(df):
+    names = list(df.columns)
+    values = [df.iloc[:, i].tolist() for i in range(len(names))]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+# Rows as lists of JSON-safe values (None for missing, dates as text), in
+# column order
+def to_rows(df):
+    rows = df.astype(object).where(df.notna(), None)
+    for col in df.select_dtypes(include=['datetime', 'datetimetz']).columns:
+        rows[col] = df[col].astype(str)
+    return rows.values.tolist()
@@ -0,0 +1,278 @@
+import json
+import math
+from html import escape
+import numpy as np
+import pandas as pd
+from folium import MacroElement
+from jinja2 import Template
+
+
+# --- Point frames -> GeoJSON ---
+# A dataset's `points(args)` returns one row per mappable project with the
+# columns id, lat, lon, name, status, color. Everything below works on that.
+POINT_COLUMNS = ['id', 'lat', 'lon', 'name', 'status', 'color']
+
+# Below this zoom, clustered requests get grid clusters instead of points
+CLUSTER_MAX_ZOOM = 11
+# Cluster cell edge at zoom 0, in degrees; halves with every zoom level
+CLUSTER_CELL_DEGREES = 80.0
+COORD_DECIMALS = 5
+
+
+def parse_bbox(value):
+    # "west,south,east,north" -> tuple of floats, or None
+    if not value:
+        return None
+    try:
+        west, south, east, north = (float(v) for v in value.split(','))
+    except ValueError:
+        return None
+    return west, south, east, north
+
+
+def tile_bbox(z, x, y):
+    # Slippy-map tile (z/x/y) -> (west, south, east, north) in degrees
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def in_bbox(points, bbox):
+    if bbox is None or points.empty:
+        return points
+    west, south, east, north = bbox
+    lat = points['lat'].to_numpy()
+    lon = points['lon'].to_numpy()
+    return points[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)]
+
+
+def point_features(points):
+    lat = points['lat'].round(COORD_DECIMALS).tolist()
+    lon = points['lon'].round(COORD_DECIMALS).tolist()
+    return [
+        {
+            'type': 'Feature',
+            'id': pid,
+            'geometry': {'type': 'Point', 'coordinates': [x, y]},
+            'properties': {'name': name, 'status': status, 'color': color},
+        }
+        for pid, y, x, name, status, color in zip(
+            points['id'].tolist(), lat, lon,
+            points['name'].tolist(), points['status'].tolist(), points['color'].tolist())
+    ]
+
+
+# Grid clustering: points are bucketed into cells sized for the zoom level;
+# cells holding a single point are returned as that point.
+def cluster_features(points, zoom):
+    if points.empty:
+        return []
+    cell = CLUSTER_CELL_DEGREES / (2 ** max(zoom, 0))
+    keys = [np.floor(points['lat'] / cell).rename('row'), np.floor(points['lon'] / cell).rename('col')]
+    sizes = points.groupby(keys)['lat'].transform('size').to_numpy()
+
+    features = point_features(points[sizes == 1])
+    crowded = sizes > 1
+    if crowded.any():
+        summary = points[crowded].groupby([key[crowded] for key in keys]).agg(
+            lat=('lat', 'mean'), lon=('lon', 'mean'), count=('lat', 'size'))
+        for lat, lon, count in zip(summary['lat'], summary['lon'], summary['count']):
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [round(lon, COORD_DECIMALS),
+                                                              round(lat, COORD_DECIMALS)]},
+                'properties': {'cluster': True, 'count': int(count)},
+            })
+    return features
+
+
+def feature_collection(points, bbox=None, zoom=None, cluster=False):
+    points = in_bbox(points, bbox)
+    if cluster and zoom is not None and zoom < CLUSTER_MAX_ZOOM:
+        features = cluster_features(points, zoom)
+    else:
+        features = point_features(points)
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+# --- Folium element for the lazy map shell ---
+# Adds no markers itself; on every pan/zoom it fetches the visible points
+# (clustered server-side) and loads a project's popup only when clicked.
+class LazyPoints(MacroElement):
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var layer = L.layerGroup().addTo(map);
+            var pointsUrl = {{ this.points_url|tojson }};
+            var popupUrl = {{ this.popup_url|tojson }};
+            var query = {{ this.query|tojson }};
+            var pending = null;
+
+            function clusterIcon(count) {
+                return L.divIcon({
+                    html: '<div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; font-weight: bold; box-shadow: 0 4px 12px rgba(0,0,0,0.3);">' + count + '</div>',
+                    className: 'custom-cluster-icon',
+                    iconSize: L.point(40, 40)
+                });
+            }
+
+            // Names and statuses come straight from the workbooks: text nodes, not markup
+            function tooltip(p) {
+                var box = document.createElement('div');
+                var name = document.createElement('b');
+                var status = document.createElement('i');
+                name.textContent = p.name;
+                status.textContent = p.status;
+                box.append(name, document.createElement('br'), status);
+                return box;
+            }
+
+            function addFeature(feature) {
+                var c = feature.geometry.coordinates;
+                var p = feature.properties;
+                if (p.cluster) {
+                    L.marker([c[1], c[0]], {icon: clusterIcon(p.count)})
+                        .on('click', function() { map.setView([c[1], c[0]], map.getZoom() + 2); })
+                        .addTo(layer);
+                    return;
+                }
+                var marker = L.circleMarker([c[1], c[0]], {
+                    radius: {{ this.radius }}, color: p.color, fill: true,
+                    fillColor: p.color, fillOpacity: 0.8, weight: 2
+                }).bindTooltip(tooltip(p));
+                marker.on('click', function() {
+                    if (marker.getPopup()) return;
+                    fetch(popupUrl.replace('__id__', feature.id))
+                        .then(function(r) { return r.text(); })
+                        .then(function(html) {
+                            marker.bindPopup(html, {maxWidth: {{ this.max_width }}}).openPopup();
+                        });
+                });
+                marker.addTo(layer);
+            }
+
+            function refresh() {
+                var b = map.getBounds();
+                var params = new URLSearchParams(query);
+                params.set('bbox', [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()].join(','));
+                params.set('zoom', map.getZoom());
+                params.set('cluster', '1');
+                if (pending) pending.abort();
+                pending = new AbortController();
+                fetch(pointsUrl + '?' + params.toString(), {signal: pending.signal})
+                    .then(function(r) { return r.json(); })
+                    .then(function(data) {
+                        layer.clearLayers();
+                        data.features.forEach(addFeature);
+                    })
+                    .catch(function() {});
+            }
+
+            map.on('moveend', refresh);
+            refresh();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, points_url, popup_url, query=None, radius=8, max_width=350):
+        super().__init__()
+        self._name = 'LazyPoints'
+        self.points_url = points_url
+        self.popup_url = popup_url
+        # (name, value) pairs, so repeated filter params survive
+        pairs = query.items() if isinstance(query, dict) else (query or ())
+        self.query = [[name, value] for name, value in pairs if value]
+        self.radius = radius
+        self.max_width = max_width
+
+
+def lazy_points(dataset, query=None, **kwargs):
+    return LazyPoints(f'/api/{dataset}/geojson', f'/api/{dataset}/popup/__id__', query, **kwargs)
+
+
+# --- Folium element for bulk markers ---
+# Every project in the document, but as one compact data block (coordinate,
+# status code and row id arrays plus a status -> color table) drawn by one
+# loop on a shared canvas renderer into the map's MarkerCluster, instead of
+# a folium CircleMarker + Popup object (and JS block) per row. One shared
+# popup loads the project's details from the popup API when clicked; names
+# are only sent when the blueprint shows tooltips.
+class BulkPoints(MacroElement):
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var cluster = {{ this.cluster.get_name() }};
+            var data = {{ this.data }};
+            var popupUrl = {{ this.popup_url|tojson }};
+            var renderer = L.canvas({padding: 0.5});
+            var popup = L.popup({maxWidth: {{ this.max_width }}});
+            var markers = new Array(data.id.length);
+            for (var i = 0; i < markers.length; i++) {
+                var color = data.colors[data.status[i]];
+                markers[i] = L.circleMarker([data.lat[i], data.lon[i]], {
+                    renderer: renderer, radius: {{ this.radius }}, color: color, fill: true,
+                    fillColor: color, fillOpacity: 0.8, weight: {{ this.weight }}, row: i
+                });
+            }
+            cluster.addLayers(markers);
+
+            cluster.on('click', function(e) {
+                var i = e.layer.options.row;
+                popup.setLatLng(e.layer.getLatLng()).setContent('…').openOn(map);
+                fetch(popupUrl.replace('__id__', data.id[i]))
+                    .then(function(r) { return r.text(); })
+                    .then(function(html) {
+                        if (popup.isOpen() && popup.getLatLng().equals(e.layer.getLatLng())) popup.setContent(html);
+                    });
+            });
+            if (data.names) {
+                cluster.on('mouseover', function(e) {
+                    var i = e.layer.options.row;
+                    if (!e.layer.getTooltip()) {
+                        e.layer.bindTooltip('<b>' + data.names[i] + '</b><br><i>' + data.labels[data.status[i]] + '</i>').openTooltip();
+                    }
+                });
+            }
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, cluster, data, popup_url, radius=8, weight=2, max_width=350):
+        super().__init__()
+        self._name = 'BulkPoints'
+        self.cluster = cluster
+        self.data = compact_json(data)
+        self.popup_url = popup_url
+        self.radius = radius
+        self.weight = weight
+        self.max_width = max_width
+
+
+# JSON without spaces, safe inside <script> (like |tojson)
+def compact_json(value):
+    text = json.dumps(value, separators=(',', ':'))
+    return text.replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026').replace("'", '\\u0027')
+
+
+# fields: canonical frame (lat, lon, status, name) of the projects to draw;
+# color: the blueprint's status -> marker color function
+def bulk_points(dataset, fields, color, cluster, tooltip=False, **kwargs):
+    located = fields[fields['lat'].notna() & fields['lon'].notna()]
+    codes, labels = pd.factorize(located['status'], use_na_sentinel=False)
+    labels = [str(label) for label in labels]
+    data = {
+        'lat': located['lat'].round(COORD_DECIMALS).tolist(),
+        'lon': located['lon'].round(COORD_DECIMALS).tolist(),
+        'id': located.index.tolist(),
+        'status': codes.tolist(),
+        'colors': [color(label) for label in labels],
+    }
+    if tooltip:
+        data['labels'] = [escape(label) for label in labels]
+        data['names'] = [escape(str(name)) for name in located['name'].tolist()]
+    return BulkPoints(cluster, data, f'/api/{dataset}/popup/__id__', **kwargs)
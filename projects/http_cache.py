@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import os
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, make_response, request
+
+try:
+    import brotli
+except ImportError:  # gzip only without the brotli package
+    brotli = None
+
+from projects.dataset_cache import DatasetCache
+from projects.datasets import DATASETS
+from projects.render_cache import RenderCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Seconds browsers / proxies may reuse a lazy map shell without revalidating
+MAP_MAX_AGE = 3600
+
+# Rendered pages, one entry per (ETag, content encoding)
+page_cache = RenderCache(max_entries=256, max_bytes=128 * 1024 * 1024)
+
+
+# --- Validators ---
+# Pages depend on the templates, code and asset bundles (BUILD, fixed when
+# the process starts), the dataset workbooks (mtime/size) and the query
+# string, so the ETag is a hash of those and is the same in every worker.
+def code_version():
+    latest = 0
+    for folder in ('templates', 'projects', 'assets'):
+        for base, _, files in os.walk(os.path.join(ROOT, folder)):
+            for name in files:
+                if name.endswith(('.html', '.py', '.css', '.js')):
+                    latest = max(latest, os.stat(os.path.join(base, name)).st_mtime_ns)
+    return latest
+
+
+BUILD = code_version()
+
+
+def page_validators(datasets):
+    fingerprints = [DatasetCache.fingerprint(DATASETS[name]['path']) for name in datasets]
+    query = urlencode(sorted(request.args.items(multi=True)))
+    digest = hashlib.sha1(repr((BUILD, request.path, fingerprints, query)).encode()).hexdigest()
+    modified = max([BUILD] + [mtime for mtime, _ in fingerprints]) // 1_000_000_000
+    return digest[:20], modified
+
+
+def not_modified(etag, modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return since is not None and modified <= since.timestamp()
+
+
+# --- Compression ---
+def negotiate():
+    for encoding in ENCODINGS:
+        if encoding in request.accept_encodings:
+            return encoding
+    return 'identity'
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+# --- Conditional, compressed pages ---
+# Wraps a page view that depends on the given datasets: 304 when the client's
+# ETag / Last-Modified is current, otherwise the body for the client's
+# encoding straight from page_cache. A page is rendered once per version and
+# compressed once per encoding. Pages that cannot be versioned (missing
+# workbook) or are not 200 (the dashboards answer 503 when their data could
+# not be read) are rendered as usual and never cached. With
+# max_age, clients may reuse the page that long before revalidating.
+def conditional_page(*datasets, max_age=0):
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                etag, modified = page_validators(datasets)
+            except OSError:
+                return view(*args, **kwargs)
+
+            if not_modified(etag, modified):
+                response = Response(status=304)
+            else:
+                encoding = negotiate()
+                body = page_cache.get((etag, encoding))
+                if body is None:
+                    rendered = make_response(view(*args, **kwargs))
+                    if rendered.status_code != 200:
+                        return rendered
+                    raw = rendered.get_data()
+                    page_cache.put((etag, 'identity'), raw)
+                    for name in ENCODINGS:
+                        compressed = page_cache.put((etag, name), compress(raw, name))
+                        if name == encoding:
+                            body = compressed
+                    body = body if body is not None else raw
+                response = Response(body, mimetype='text/html')
+                if encoding != 'identity':
+                    response.headers['Content-Encoding'] = encoding
+
+            response.set_etag(etag, weak=True)
+            response.last_modified = modified
+            response.headers['Cache-Control'] = f'public, max-age={max_age}' if max_age else 'no-cache'
+            response.headers['Vary'] = 'Accept-Encoding'
+            return response
+        return wrapper
+    return decorate
+
+
+# --- Map documents ---
+# Dashboards load their map from <dashboard>/map (same query string) in an
+# iframe, so the page renders without waiting for the map and each is cached
+# on its own. A lazy GeoJSON shell carries no data: it is versioned by code
+# and query string only and may be reused for MAP_MAX_AGE; a map with inline
+# markers changes with its dataset and is revalidated on every use.
+def map_page(dataset, lazy):
+    if lazy:
+        return conditional_page(max_age=MAP_MAX_AGE)
+    return conditional_page(dataset)
+
+
+def map_url():
+    query = request.query_string.decode()
+    return request.path.rstrip('/') + '/map' + (f'?{query}' if query else '')
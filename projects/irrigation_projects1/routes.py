@@ -1,10 +1,50 @@
 from flask import Blueprint
-from projects.app_original import show_dashboard
+from projects.app_original import (show_dashboard, show_map, normalize_data, get_frames, get_filtered_frames,
+                                   get_table_frame, get_points, get_popup, get_projects_frame, SCHEMA, MAP_MODE)
+from projects.datasets import register_dataset
+from projects.http_cache import conditional_page, map_page
+from projects.sources import source_path
 
 irrigation1_bp = Blueprint('irrigation1', __name__)
 
+# One workbook, a folder or a glob of them (IRRIGATION1_SOURCE overrides it)
+DATA_FILE = source_path('irrigation1', 'projects/irrigation_projects1/data/karnataka_irr1.xlsx')
+
+
+def frames():
+    return get_frames(DATA_FILE)
+
+
+def table_frame(args):
+    return get_table_frame(DATA_FILE, args)
+
+
+def projects_frame(args):
+    return get_projects_frame(get_filtered_frames(DATA_FILE, args))
+
+
+def points_frame(args):
+    return get_points(get_filtered_frames(DATA_FILE, args))
+
+
+def popup(feature_id):
+    return get_popup(get_frames(DATA_FILE), feature_id)
+
+
+def stats(args):
+    return get_filtered_frames(DATA_FILE, args).aggregates
+
+
+register_dataset('irrigation1', DATA_FILE, normalize_data, title='Annual Report - 2024',
+                 table=table_frame, projects=projects_frame, points=points_frame, popup=popup,
+                 stats=stats, frames=frames, schema=SCHEMA)
+
 @irrigation1_bp.route('/irrigation1')
+@conditional_page('irrigation1')
 def irrigation1():
-    return show_dashboard('projects/irrigation_projects1/data/karnataka_irr1.xlsx')
-
+    return show_dashboard(DATA_FILE, 'irrigation1')
 
+@irrigation1_bp.route('/irrigation1/map')
+@map_page('irrigation1', lazy=MAP_MODE == 'geojson')
+def irrigation1_map():
+    return show_map(DATA_FILE, 'irrigation1')
@@ -1,36 +1,39 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request
+from markupsafe import escape
 import pandas as pd
 import folium
 from folium.plugins import MarkerCluster, MiniMap
 import os
-import re
+
+from projects.dataset_cache import dataset_cache
+from projects.sources import source_path
+from projects.datasets import register_dataset
+from projects.http_cache import conditional_page, map_page, map_url
+from projects.filters import FilterError, filter_frames, parse_filters
+from projects.adapters import load_dataset, normalize_frame, text
+from projects.render_cache import map_cache, make_key
+from projects.frame_utils import to_optional_float, to_records
+from projects.normalize import StatusScheme, numbers_sum_series
+from projects.geo import lazy_points, bulk_points
+from projects.metrics import stage, record_rows
 
 # --- Blueprint setup ---
 irrigation2_bp = Blueprint('irrigation2', __name__)
 
 DATA_DIR = os.path.join('projects', 'irrigation_projects2', 'data')
 DATA_FILE = 'karnataka_irr2.xlsx'
+# One workbook, a folder or a glob of them (IRRIGATION2_SOURCE overrides it)
+DATA_PATH = source_path('irrigation2', os.path.join(DATA_DIR, DATA_FILE))
 
-
-# --- Load data ---
-def load_data(filepath):
-    df = pd.read_excel(filepath, engine='openpyxl')
-    df.columns = df.columns.str.strip()
-
-    lat_col = next((c for c in df.columns if 'lat' in c.lower()), None)
-    lon_col = next((c for c in df.columns if 'lon' in c.lower() or 'long' in c.lower()), None)
-
-    if not lat_col or not lon_col:
-        return df, pd.DataFrame(), None, None
-
-    df_full = df.copy()
-    df_with_coords = df[df[lat_col].notna() & df[lon_col].notna()].copy()
-    return df_full, df_with_coords, lat_col, lon_col
+# 'geojson' (lazy map shell + /api/irrigation2/geojson), 'markers' (folium)
+# or 'bulk' (every marker in one data array drawn on a canvas)
+MAP_MODE = 'geojson'
 
 
-# --- Marker color helper ---
-def get_marker_color(status):
-    mapping = {
+# --- Project status: normalized names and marker colors ---
+# First matching rule wins; anything else keeps its (lowercased) text
+STATUS = StatusScheme(
+    colors={
         'completed': '#10b981',
         'ongoing': '#f59e0b',
         'under progress': '#f97316',
@@ -39,57 +42,76 @@ def get_marker_color(status):
         'approved': '#8b5cf6',
         'nearly complete': '#f59e0b',
         'nearly completed': '#f59e0b'
-    }
-    if not status:
-        return '#6b7280'
-    return mapping.get(status.strip().lower(), '#6b7280')
-
-
-# --- Normalize project status ---
-def normalize_status(raw):
-    if raw is None:
-        return 'unknown'
-    s = str(raw).strip().lower()
-
-    if 'nearly' in s and 'complete' in s:
-        return 'nearly completed'
-    if 'complete' in s:
-        return 'completed'
-    if 'under construction' in s:
-        return 'under construction'
-    if 'under progress' in s or 'progress' in s:
-        return 'under progress'
-    if 'ongoing' in s:
-        return 'ongoing'
-    if 'planned' in s:
-        return 'planned'
-    if 'approved' in s:
-        return 'approved'
-    return s
+    },
+    rules=[
+        (r'nearly.*complete|complete.*nearly', 'nearly completed'),
+        (r'complete', 'completed'),
+        (r'under construction', 'under construction'),
+        (r'progress', 'under progress'),
+        (r'ongoing', 'ongoing'),
+        (r'planned', 'planned'),
+        (r'approved', 'approved'),
+    ],
+)
+normalize_status = STATUS.canonical
+get_marker_color = STATUS.color
+
+
+# Status is stored normalized ('completed', 'under progress', ...)
+def status_field(series):
+    return STATUS.canonical_series(text(series))
+
+
+# --- Sheet layout (see projects/adapters.py) ---
+# Amount and hectare cells are free text ("88 Cr", "300-400 ha"): the stats
+# add up every number in them, the project list shows the text as is
+SCHEMA = {
+    'rename': {'Lat': 'Latitude', 'Long': 'Longitude', 'Lon': 'Longitude'},
+    'text': ['Project Name', 'Project Status', 'District'],
+    'numeric': ['Latitude', 'Longitude'],
+    'fields': {
+        'name': 'Project Name',
+        'lat': 'Latitude',
+        'lon': 'Longitude',
+        'status': ('Project Status', status_field),
+        'amount': ('Approval Amount', numbers_sum_series),
+        'hectares': ('Hectares of land irrigated', numbers_sum_series),
+        'district': 'District',
+        'amount_text': ('Approval Amount', text),
+        'hectares_text': ('Hectares of land irrigated', text),
+        'type': ('Project Type', text),
+    },
+    'dimensions': ['status', 'district', 'type'],
+    'measures': ['amount', 'hectares'],
+}
+
+
+def normalize_data(df):
+    return normalize_frame(df, SCHEMA)
 
 
-# --- Create Folium map ---
-def create_map(df_with_coords, lat_col, lon_col):
-    m = folium.Map(location=[15.3173, 75.7139], zoom_start=7, tiles='CartoDB positron')
-    marker_cluster = MarkerCluster().add_to(m)
+# --- Load data ---
+# Table frame has NaN replaced with '-' for clean display
+def load_data(filepath):
+    return load_dataset(filepath, SCHEMA)
 
-    if df_with_coords.empty or lat_col is None or lon_col is None:
-        MiniMap(toggle_display=True).add_to(m)
-        folium.LayerControl().add_to(m)
-        return m._repr_html_()
 
-    for _, row in df_with_coords.iterrows():
-        try:
-            lat = float(row[lat_col])
-            lon = float(row[lon_col])
-        except Exception:
-            continue
+def get_frames():
+    return dataset_cache.get(DATA_PATH, load_data)
 
-        status = normalize_status(row.get('Project Status', ''))
-        color = get_marker_color(status)
 
-        
-        popup_html = f"""
+# Frame behind the data table (served page by page from /api/<dataset>/rows)
+def table_frame(args):
+    return filter_frames(get_frames(), args).table
+
+
+# --- Create Folium map ---
+def base_map():
+    return folium.Map(location=[15.3173, 75.7139], zoom_start=7, tiles='CartoDB positron')
+
+
+def popup_html(row, status, color):
+    return f"""
 <div style='font-family:Segoe UI; min-width:300px;'>
     <div style="background:{color};color:white;padding:8px;border-radius:6px 6px 0 0;">
         <h4 style="margin:0;">{row.get('Project Name', 'N/A')}</h4>
@@ -107,10 +129,25 @@ def create_map(df_with_coords, lat_col, lon_col):
 """
 
 
+def create_map(located):
+    m = base_map()
+    marker_cluster = MarkerCluster().add_to(m)
+
+    if not len(located):
+        MiniMap(toggle_display=True).add_to(m)
+        folium.LayerControl().add_to(m)
+        return m.get_root().render()
+
+    # Status was normalized at load time, rows are plain dicts
+    fields = located.fields
+    for row, lat, lon, status in zip(to_records(located.table), fields['lat'].tolist(),
+                                     fields['lon'].tolist(), fields['status'].tolist()):
+        color = get_marker_color(status)
+
         folium.CircleMarker(
             location=[lat, lon],
             radius=6,
-            popup=folium.Popup(popup_html, max_width=400),
+            popup=folium.Popup(popup_html(row, status, color), max_width=400),
             color=color,
             fill=True,
             fillOpacity=0.8
@@ -118,104 +155,158 @@ def create_map(df_with_coords, lat_col, lon_col):
 
     MiniMap(toggle_display=True).add_to(m)
     folium.LayerControl().add_to(m)
-    return m._repr_html_()
+    return m.get_root().render()
 
 
-# --- Safe numeric sum ---
-def safe_sum_numeric(series):
-    total = 0.0
-    for v in series.fillna(''):
-        nums = re.findall(r'\d+(?:\.\d+)?', str(v).replace(',', ''))
-        for n in nums:
-            try:
-                total += float(n)
-            except Exception:
-                pass
-    return total
+# Same markers as create_map, packed into one data array (popups load on click)
+def create_bulk_map(located):
+    m = base_map()
+    marker_cluster = MarkerCluster().add_to(m)
+    bulk_points('irrigation2', located.fields, get_marker_color, marker_cluster,
+                radius=6, weight=3, max_width=400).add_to(m)
+    MiniMap(toggle_display=True).add_to(m)
+    folium.LayerControl().add_to(m)
+    return m.get_root().render()
 
 
-# --- Compute summary statistics ---
-def get_statistics(df_full):
-    total_projects = len(df_full)
+# Map without markers: points (for the current filters) are fetched per
+# viewport from the GeoJSON API
+def create_map_shell(query=None):
+    m = base_map()
+    lazy_points('irrigation2', query, radius=6, max_width=400).add_to(m)
+    MiniMap(toggle_display=True).add_to(m)
+    folium.LayerControl().add_to(m)
+    return m.get_root().render()
+
+
+# --- GeoJSON / lazy popup sources ---
+def points_frame(args):
+    fields = filter_frames(get_frames(), args).with_coords().fields
+    return pd.DataFrame({
+        'id': fields.index,
+        'lat': fields['lat'],
+        'lon': fields['lon'],
+        'name': fields['name'],
+        'status': fields['status'],
+        'color': STATUS.color_series(fields['status']),
+    }, index=fields.index)
+
+
+def popup(feature_id):
+    located = get_frames().with_coords()
+    if feature_id not in located.table.index:
+        return None
+    row = to_records(located.table.loc[[feature_id]])[0]
+    status = located.fields.at[feature_id, 'status']
+    return popup_html(row, status, get_marker_color(status))
+
 
-    amount_col = next((c for c in df_full.columns if 'approval amount' in c.lower() or 'amount' == c.lower()), None)
-    hectare_col = next((c for c in df_full.columns if 'hectare' in c.lower()), None)
-    status_col = next((c for c in df_full.columns if 'status' in c.lower()), None)
+def stats(args):
+    return filter_frames(get_frames(), args).aggregates
 
-    total_amount = safe_sum_numeric(df_full[amount_col]) if amount_col else 0
-    total_hectares = safe_sum_numeric(df_full[hectare_col]) if hectare_col else 0
 
-    completed_projects = 0
-    if status_col:
-    # Normalize statuses to avoid fuzzy matching
-      normalized = df_full[status_col].astype(str).apply(normalize_status)
-    completed_projects = (normalized == 'completed').sum()
+# --- Sidebar project list (served page by page from /api/<dataset>/projects) ---
+def get_projects_frame(frames):
+    fields = frames.fields
+    projects = pd.DataFrame({
+        'id': fields.index,
+        'name': fields['name'],
+        'status': fields['status'],
+        'amount': fields['amount_text'],
+        'hectares': fields['hectares_text'],
+        'region': fields['district'],
+        'lat': to_optional_float(fields['lat']),
+        'lng': to_optional_float(fields['lon'])
+    }, index=fields.index)
+    return projects
+
+
+def projects_frame(args):
+    return get_projects_frame(filter_frames(get_frames(), args))
+
+
+register_dataset('irrigation2', DATA_PATH, normalize_data,
+                 title='KNNL FY 2020-21', table=table_frame, projects=projects_frame, points=points_frame,
+                 popup=popup, stats=stats, frames=get_frames, schema=SCHEMA)
+
+
+# --- Compute summary statistics ---
+# Read from the aggregates built at load time; amount / hectare fields hold
+# the sum of the numbers in each cell
+def get_statistics(frames):
+    aggregates = frames.aggregates
+    totals = aggregates.totals()
 
     return {
-        'total_projects': int(total_projects),
-        'total_amount': round(total_amount, 2),
-        'total_hectares': round(total_hectares, 2),
-        'completed_projects': int(completed_projects)
+        'total_projects': totals['count'],
+        'total_amount': round(totals['amount'], 2),
+        'total_hectares': round(totals['hectares'], 2),
+        'completed_projects': aggregates.count(aggregates.partials['status'] == 'completed')
     }
 
 
 # --- Flask route for irrigation dashboard ---
 @irrigation2_bp.route('/irrigation2')
+@conditional_page('irrigation2')
 def irrigation2_dashboard():
-    filepath = os.path.join(DATA_DIR, DATA_FILE)
+    filepath = DATA_PATH
+
+    try:
+        with stage('load'):
+            frames_all = dataset_cache.get(filepath, load_data)
+    except Exception:
+        # 503: an empty page must not be cached as this version's dashboard
+        stats = {'total_projects': 0, 'total_amount': 0, 'total_hectares': 0, 'completed_projects': 0}
+        return render_template('index2.html', map_url=map_url(), stats=stats, columns=[],
+                               dataset='irrigation2'), 503
 
+    # A malformed filter is the request's fault (400, as on /api)
     try:
-        df_full, df_with_coords, lat_col, lon_col = load_data(filepath)
-            # Replace NaN or None values with hyphen for clean table display
-        df_full = df_full.fillna('-')
-
-
-        if df_with_coords is not None and not df_with_coords.empty:
-            map_html = create_map(df_with_coords, lat_col, lon_col)
-        else:
-            map_html = "<p style='color:red;'>No valid coordinates found in data.</p>"
-
-        stats = get_statistics(df_full if df_full is not None else pd.DataFrame())
-        table_data = df_full.to_dict(orient='records') if df_full is not None else []
-
-        projects = []
-        if df_full is not None and not df_full.empty:
-            for _, row in df_full.iterrows():
-                raw_status = row.get('Project Status', '')
-                status = normalize_status(raw_status)
-
-                lat = row.get(lat_col) if lat_col in row.index else None
-                lng = row.get(lon_col) if lon_col in row.index else None
-
-                try:
-                    lat = float(lat) if pd.notna(lat) else None
-                except Exception:
-                    lat = None
-                try:
-                    lng = float(lng) if pd.notna(lng) else None
-                except Exception:
-                    lng = None
-
-                projects.append({
-                    'name': str(row.get('Project Name', 'N/A')),
-                    'status': status,
-                    'amount': str(row.get('Approval Amount', '0')),
-                    'hectares': str(row.get('Hectares of land irrigated', '0')),
-                    'region': str(row.get('District', 'N/A')),
-                    'lat': lat,
-                    'lng': lng
-                })
+        with stage('filter'):
+            query = parse_filters(request.args, frames_all.filter_index)
+            frames = frames_all.select(query)
+    except FilterError as e:
+        return f"<p style='color:red;'>{escape(str(e))}</p>", 400
+    record_rows(len(frames))
+
+    with stage('stats'):
+        stats = get_statistics(frames)
+    columns = frames.table.columns.tolist()
+
+    # The map loads from /irrigation2/map with the same filters
+    with stage('render'):
+        return render_template(
+            'index2.html',
+            map_url=map_url(),
+            stats=stats,
+            columns=columns,
+            dataset='irrigation2'
+        )
+
+
+# --- Map document behind the dashboard's iframe ---
+@irrigation2_bp.route('/irrigation2/map')
+@map_page('irrigation2', lazy=MAP_MODE == 'geojson')
+def irrigation2_map():
+    filepath = DATA_PATH
 
+    try:
+        with stage('load'):
+            frames_all = dataset_cache.get(filepath, load_data)
+        with stage('filter'):
+            query = parse_filters(request.args, frames_all.filter_index)
+
+        with stage('map'):
+            if not len(frames_all.with_coords()):
+                return "<p style='color:red;'>No valid coordinates found in data.</p>"
+            if MAP_MODE == 'geojson':
+                map_key = make_key('irrigation2', 'shell', filters=query.key())
+                return map_cache.get_or_render(map_key, lambda: create_map_shell(query.params))
+            map_key = make_key(filepath, dataset_cache.version(filepath), filters=query.key())
+            render = create_bulk_map if MAP_MODE == 'bulk' else create_map
+            return map_cache.get_or_render(map_key, lambda: render(frames_all.select(query).with_coords()))
+
+    except FilterError as e:
+        return f"<p style='color:red;'>{escape(str(e))}</p>", 400
     except Exception as e:
-        map_html = f"<p style='color:red;'>Error: {str(e)}</p>"
-        stats = {'total_projects': 0, 'total_amount': 0, 'total_hectares': 0, 'completed_projects': 0}
-        table_data = []
-        projects = []
-
-    return render_template(
-        'index2.html',
-        map_html=map_html,
-        stats=stats,
-        table_data=table_data,
-        projects=projects
-    )
+        return f"<p style='color:red;'>Error: {str(e)}</p>", 500
@@ -1,56 +1,110 @@
 from flask import Blueprint, render_template, request
+from markupsafe import escape
+import numpy as np
 import pandas as pd
 import folium
 from folium.plugins import MarkerCluster, MiniMap
 import os
-import re
+
+from projects.dataset_cache import dataset_cache
+from projects.sources import source_path
+from projects.datasets import register_dataset
+from projects.http_cache import conditional_page, map_page, map_url
+from projects.adapters import load_dataset, normalize_frame, number, text
+from projects.render_cache import map_cache, make_key
+from projects.frame_utils import to_optional_float, to_records
+from projects.normalize import StatusScheme, digits_series
+from projects.geo import lazy_points, bulk_points
+from projects.metrics import stage, record_rows
+from projects.filters import FilterError, filter_frames, parse_filters
+from projects.precompute import precomputed
 
 irrigation3_bp = Blueprint('irrigation3', __name__)
 
 DATA_DIR = os.path.join('projects', 'irrigation_projects3', 'data')
 DATA_FILE = 'karnataka_irr3.xlsx'
+# One workbook, a folder or a glob of them (IRRIGATION3_SOURCE overrides it)
+DATA_PATH = source_path('irrigation3', os.path.join(DATA_DIR, DATA_FILE))
+
+# 'geojson' (lazy map shell + /api/irrigation3/geojson), 'markers' (folium)
+# or 'bulk' (every marker in one data array drawn on a canvas)
+MAP_MODE = 'geojson'
+
+# Coordinate columns, coerced to numbers once when the sheet is loaded
+LAT_COL = 'Latitude'
+LON_COL = 'Longitude'
+
+
+# Dam length text ("1,450 m") -> float; cells without a digit -> 0
+def parse_length(series):
+    return digits_series(series)
+
+
+# Dam length text -> the bucket the length filter offers
+def length_buckets(series):
+    length = parse_length(series).to_numpy()
+    buckets = np.where(length <= 1000, '0-1000', np.where(length <= 2000, '1000-2000', '2000+'))
+    return pd.Series(buckets, index=series.index, dtype=str)
+
+
+# --- Sheet layout (see projects/adapters.py) ---
+# The table shows dam lengths in metres as parsed for the length filter
+SCHEMA = {
+    'text': ['Project Name', 'Status', 'Dam_Type', 'Location_District', 'Spillway_Type'],
+    'numeric': [LAT_COL, LON_COL],
+    'fields': {
+        'name': 'Project Name',
+        'lat': LAT_COL,
+        'lon': LON_COL,
+        'status': 'Status',
+        'amount': 'Storage_Gross_Capacity_TMC',
+        'hectares': 'Submergence_Area_Total_Ha',
+        'district': 'Location_District',
+        'irrigation': ('Irrigation_Gross_Command_Area_Ha', number),
+        'type': ('Dam_Type', text),
+        'purpose': ('Spillway_Type', text),
+        'duration': ('Project Duration Years', text),
+        'dam_length': ('Dam_Length_Total_Mtr', parse_length),
+        'length_bucket': ('Dam_Length_Total_Mtr', length_buckets),
+    },
+    'display': {'Dam_Length_Total_Mtr': 'dam_length'},
+    'dimensions': ['status', 'district', 'type', 'length_bucket'],
+    'measures': ['amount', 'hectares', 'irrigation'],
+    'filters': ['status', 'district', 'type', 'length_bucket', 'amount', 'hectares', 'irrigation', 'dam_length'],
+}
+
+
+def normalize_data(df):
+    return normalize_frame(df, SCHEMA)
 
 
 def load_data(filepath):
-    # Read data safely
-    df = pd.read_csv(filepath, encoding='latin1', on_bad_lines='skip')
-    df.columns = df.columns.str.strip()
-    return df
-
-
-def get_marker_color(status):
-    if not isinstance(status, str):
-        return '#6b7280'
-    status = status.lower()
-    if 'complete' in status:
-        return '#10b981'
-    if 'ongoing' in status or 'progress' in status or 'construction' in status:
-        return '#f59e0b'
-    if 'planned' in status or 'approved' in status:
-        return '#6366f1'
-    return '#6b7280'
-
-
-def create_map(df):
-    m = folium.Map(location=[15.3173, 75.7139], zoom_start=7, tiles='CartoDB positron')
-    marker_cluster = MarkerCluster().add_to(m)
+    # Read data safely (snapshot if fresh, else the source workbook)
+    return load_dataset(filepath, SCHEMA)
 
-    lat_col = next((c for c in df.columns if 'lat' in c.lower()), None)
-    lon_col = next((c for c in df.columns if 'lon' in c.lower() or 'long' in c.lower()), None)
 
-    if not lat_col or not lon_col:
-        MiniMap(toggle_display=True).add_to(m)
-        folium.LayerControl().add_to(m)
-        return m._repr_html_()
+def get_frames():
+    return dataset_cache.get(DATA_PATH, load_data)
+
+
+# Marker colors by status keyword
+STATUS = StatusScheme(
+    colors={'completed': '#10b981', 'ongoing': '#f59e0b', 'planned': '#6366f1'},
+    rules=[
+        (r'complete', 'completed'),
+        (r'ongoing|progress|construction', 'ongoing'),
+        (r'planned|approved', 'planned'),
+    ],
+)
+get_marker_color = STATUS.color
 
-    for _, row in df.iterrows():
-        try:
-            lat = float(row[lat_col])
-            lon = float(row[lon_col])
-        except Exception:
-            continue
 
-        popup_html = f"""
+def base_map():
+    return folium.Map(location=[15.3173, 75.7139], zoom_start=7, tiles='CartoDB positron')
+
+
+def popup_html(row):
+    return f"""
         <div style='font-family:Segoe UI; min-width:320px; border-radius:8px; overflow:hidden; box-shadow:0 2px 10px rgba(0,0,0,0.15);'>
             <div style="background:#16a34a;color:white;padding:10px 12px;border-radius:8px 8px 0 0;">
                 <h4 style="margin:0;font-size:16px;">{row.get('Project Name', 'N/A')}</h4>
@@ -69,142 +123,256 @@ def create_map(df):
         </div>
         """
 
+
+def create_map(frames):
+    m = base_map()
+    marker_cluster = MarkerCluster().add_to(m)
+
+    located = frames.with_coords()
+    fields = located.fields
+    for row, lat, lon, status in zip(to_records(located.table), fields['lat'].tolist(),
+                                     fields['lon'].tolist(), fields['status'].tolist()):
         folium.CircleMarker(
             location=[lat, lon],
             radius=6,
-            popup=folium.Popup(popup_html, max_width=400),
-            color=get_marker_color(row.get('Status', '')),
+            popup=folium.Popup(popup_html(row), max_width=400),
+            color=get_marker_color(status),
             fill=True,
             fillOpacity=0.8
         ).add_to(marker_cluster)
 
     MiniMap(toggle_display=True).add_to(m)
     folium.LayerControl().add_to(m)
-    return m._repr_html_()
+    return m.get_root().render()
+
+
+# Same markers as create_map, packed into one data array (popups load on click)
+def create_bulk_map(frames):
+    m = base_map()
+    marker_cluster = MarkerCluster().add_to(m)
+    bulk_points('irrigation3', frames.with_coords().fields, get_marker_color, marker_cluster,
+                radius=6, weight=3, max_width=400).add_to(m)
+    MiniMap(toggle_display=True).add_to(m)
+    folium.LayerControl().add_to(m)
+    return m.get_root().render()
+
+
+# Map without markers: the visible points (for the current filters) are
+# fetched per viewport from the GeoJSON API
+def create_map_shell(query=None):
+    m = base_map()
+    lazy_points('irrigation3', query, radius=6, max_width=400).add_to(m)
+    MiniMap(toggle_display=True).add_to(m)
+    folium.LayerControl().add_to(m)
+    return m.get_root().render()
+
+
+# Sidebar project list (served page by page from /api/<dataset>/projects)
+def get_projects_frame(frames):
+    fields = frames.fields
+    projects = pd.DataFrame({
+        'id': fields.index,
+        'name': fields['name'],
+        'status': fields['status'],
+        'region': fields['district'],
+        'type': fields['type'],
+        'amount': fields['amount'],
+        'hectares': fields['hectares'],
+        'districts': fields['district'],
+        'purpose': fields['purpose'],
+        'dpr_date': fields['duration'],
+        'lat': to_optional_float(fields['lat']),
+        'lng': to_optional_float(fields['lon']),
+        'dam_length': fields['dam_length']
+    }, index=fields.index)
+    return projects
+
+
+# Buckets the dam_length filter offers
+LENGTH_BUCKETS = ('0-1000', '1000-2000', '2000+')
+
+
+# Canonical name of a dam_length query value (None = no length filter)
+def length_bucket(value):
+    if value in ('0-1000', '1000-2000'):
+        return value
+    if value in ('2000+', '2000_plus', '2000plus'):
+        return '2000+'
+    return None
+
+
+# irrigation3's own filter params on top of the generic ones (see
+# projects/filters.py): dam type substring, dam length bucket (lengths are
+# parsed to metres when the sheet is loaded; dam_length__min / __max filter
+# on the metres themselves)
+FILTER_ALIASES = {
+    'dam_type': lambda value: ('type', 'contains', [value]) if value.lower() != 'all' else None,
+    'dam_length': lambda value: ('length_bucket', 'eq', [length_bucket(value)]) if length_bucket(value) else None,
+}
+
+
+def filtered(args):
+    return filter_frames(get_frames(), args, FILTER_ALIASES)
+
+
+# Frame behind the data table (served page by page from /api/<dataset>/rows)
+def table_frame(args):
+    return filtered(args).table
+
+
+def projects_frame(args):
+    return get_projects_frame(filtered(args))
+
+
+# --- GeoJSON / lazy popup sources ---
+def points_frame(args):
+    fields = filtered(args).with_coords().fields
+    return pd.DataFrame({
+        'id': fields.index,
+        'lat': fields['lat'],
+        'lon': fields['lon'],
+        'name': fields['name'],
+        'status': fields['status'],
+        'color': STATUS.color_series(fields['status']),
+    }, index=fields.index)
+
+
+def popup(feature_id):
+    table = get_frames().table
+    if feature_id not in table.index:
+        return None
+    return popup_html(to_records(table.loc[[feature_id]])[0])
+
+
+def stats(args):
+    return filtered(args).aggregates
+
+
+# Dam types the dropdown offers (all of them, whatever is filtered)
+def dam_type_options(frames):
+    types = frames.fields['type']
+    return sorted(types[types != '-'].unique().tolist())
+
+
+# Map document for the selected frames (cached per data version + filters)
+def map_document(frames, query):
+    filepath = DATA_PATH
+    with stage('map'):
+        if MAP_MODE == 'geojson':
+            map_key = make_key('irrigation3', 'shell', filters=query.key())
+            return map_cache.get_or_render(map_key, lambda: create_map_shell(query.params))
+        map_key = make_key(filepath, dataset_cache.version(filepath), filters=query.key())
+        render = create_bulk_map if MAP_MODE == 'bulk' else create_map
+        return map_cache.get_or_render(map_key, lambda: render(frames))
+
+
+# Stats and table columns for the selected frames
+def dashboard_artifacts(frames, query):
+    # stats from the aggregates pre-grouped at load time
+    with stage('stats'):
+        aggregates = frames.aggregates
+        totals = aggregates.totals()
+        completed = aggregates.partials['status'].str.lower().str.contains('complete', regex=False)
+        stats = {
+            'total_projects': totals['count'],
+            'completed_projects': aggregates.count(completed),
+            'irrigation_total': totals['irrigation'],
+            'storage_total': totals['amount'],
+            'submergence_total': totals['hectares']
+        }
+
+    # table columns (rows and the project list are fetched page by page from the API)
+    return {'stats': stats,
+            'columns': frames.table.columns.tolist(), 'rows': len(frames)}
+
+
+# --- Background precompute (see projects/precompute.py) ---
+# The dashboard's own filters: every dam type x length bucket
+def filter_dimensions(frames):
+    return {'dam_type': dam_type_options(frames), 'dam_length': list(LENGTH_BUCKETS)}
+
+
+# Runs in a worker process, one filter combination per call (the dashboard
+# and its map)
+def precompute_artifacts(args):
+    frames_all = get_frames()
+    query = parse_filters(args, frames_all.filter_index, FILTER_ALIASES)
+    frames = frames_all.select(query)
+    return {**dashboard_artifacts(frames, query), 'map_html': map_document(frames, query)}
+
+
+register_dataset('irrigation3', DATA_PATH, normalize_data,
+                 title='Ongoing Projects', table=table_frame, projects=projects_frame, points=points_frame,
+                 popup=popup, stats=stats, frames=get_frames, filters=FILTER_ALIASES, schema=SCHEMA,
+                 precompute={'dimensions': filter_dimensions, 'build': precompute_artifacts})
 
 
 @irrigation3_bp.route('/irrigation3')
+@conditional_page('irrigation3')
 def irrigation3_dashboard():
     from flask import request
 
-    filepath = os.path.join(DATA_DIR, DATA_FILE)
+    filepath = DATA_PATH
 
     # read the original data first (to populate filters)
     try:
-        df_all = load_data(filepath)
-    except Exception as e:
-        # if loading fails, return an error page
-        return render_template('index3.html',
-                               map_html=f"<p style='color:red;'>Error loading file: {e}</p>",
-                               projects=[], stats={}, columns=[], table_data=[], dam_types=[])
+        with stage('load'):
+            frames_all = dataset_cache.get(filepath, load_data)
+    except Exception:
+        # if loading fails, return an error page (503, so it is not cached)
+        return render_template('index3.html', map_url=map_url(),
+                               stats={}, columns=[], dam_types=[], dataset='irrigation3'), 503
 
     # build full dam type list from original (so dropdown shows all types)
-    dam_types = sorted(df_all['Dam_Type'].dropna().unique().tolist()) if 'Dam_Type' in df_all.columns else []
-
-    # start with a working copy (we will filter `df` later)
-    df = df_all.copy()
+    dam_types = dam_type_options(frames_all)
 
     # server-side filters from querystring (optional)
     selected_dam_type = request.args.get('dam_type', None)
     selected_length_range = request.args.get('dam_length', None)
 
+    # every dam type / length combination is built in the background when the
+    # workbook changes (warmup / data watcher); other filters are rendered here
+    artifacts = precomputed.get('irrigation3', request.args)
+    if artifacts is None:
+        # A malformed filter is the request's fault (400, as on /api)
+        try:
+            with stage('filter'):
+                query = parse_filters(request.args, frames_all.filter_index, FILTER_ALIASES)
+                frames = frames_all.select(query)
+        except FilterError as e:
+            return f"<p style='color:red;'>{escape(str(e))}</p>", 400
+        artifacts = dashboard_artifacts(frames, query)
+    record_rows(artifacts['rows'])
+
+    # always return the template; the map loads from /irrigation3/map
+    with stage('render'):
+        return render_template(
+            'index3.html',
+            map_url=map_url(),
+            stats=artifacts['stats'],
+            columns=artifacts['columns'],
+            dataset='irrigation3',
+            selected_dam_type=selected_dam_type,
+            selected_length_range=selected_length_range,
+            dam_types=dam_types
+        )
+
+
+# Map document behind the dashboard's iframe: the precomputed one for a dam
+# type / length combination, else rendered for the request's filters
+@irrigation3_bp.route('/irrigation3/map')
+@map_page('irrigation3', lazy=MAP_MODE == 'geojson')
+def irrigation3_map():
     try:
-        # normalize missing values for display
-        df = df.fillna('-')
-
-        # Apply dam type filter (if provided via query params)
-        if selected_dam_type and selected_dam_type.lower() != 'all':
-            df = df[df['Dam_Type'].astype(str).str.lower().str.contains(selected_dam_type.lower(), na=False)]
-
-        # Normalize/clean Dam Length numeric column once (if present)
-        if 'Dam_Length_Total_Mtr' in df.columns:
-            # extract numbers and convert; invalid -> 0
-            df['Dam_Length_Total_Mtr'] = df['Dam_Length_Total_Mtr'].apply(
-                lambda x: float(re.sub(r'[^0-9.]', '', str(x))) if re.search(r'\d', str(x)) else 0.0
-            )
-
-        # Apply length range filter (if provided via query params)
-        if selected_length_range and selected_length_range.lower() != 'all':
-            if selected_length_range == '0-1000':
-                df = df[df['Dam_Length_Total_Mtr'] <= 1000]
-            elif selected_length_range == '1000-2000':
-                df = df[(df['Dam_Length_Total_Mtr'] > 1000) & (df['Dam_Length_Total_Mtr'] <= 2000)]
-            elif selected_length_range in ('2000+', '2000_plus', '2000plus'):
-                df = df[df['Dam_Length_Total_Mtr'] > 2000]
-
-        # Generate map HTML using filtered df
-        map_html = create_map(df)
-
-        # Build the left-side project list. include dam_length so template can place into data-length
-        projects = []
-        for _, row in df.iterrows():
-            def safe_float(value):
-                try:
-                    if str(value).strip() in ['-', '', 'nan', 'NaN', 'None']:
-                        return 0.0
-                    return float(value)
-                except Exception:
-                    return 0.0
-
-            projects.append({
-                'name': row.get('Project Name', '-'),
-                'status': row.get('Status', '-'),
-                'region': row.get('Location_District', '-'),
-                'type': row.get('Dam_Type', '-'),
-                'amount': safe_float(row.get('Storage_Gross_Capacity_TMC', 0)),
-                'hectares': safe_float(row.get('Submergence_Area_Total_Ha', 0)),
-                'districts': row.get('Location_District', '-'),
-                'purpose': row.get('Spillway_Type', '-'),
-                'dpr_date': row.get('Project Duration Years', '-'),
-                'lat': row.get('Latitude', None),
-                'lng': row.get('Longitude', None),
-                # include dam length numeric for client-side filters
-                'dam_length': safe_float(row.get('Dam_Length_Total_Mtr', 0))
-            })
-
-        # stats aggregation
-        def safe_sum(col_name):
-            if col_name not in df.columns:
-                return 0
-            total = 0.0
-            for v in df[col_name]:
-                try:
-                    if str(v).strip() in ['-', '', 'nan', 'NaN', 'None']:
-                        continue
-                    total += float(str(v).replace(',', '').strip())
-                except Exception:
-                    continue
-            return total
-
-        irrigation_total = safe_sum('Irrigation_Gross_Command_Area_Ha')
-        storage_total = safe_sum('Storage_Gross_Capacity_TMC')
-        submergence_total = safe_sum('Submergence_Area_Total_Ha')
-
-        stats = {
-            'total_projects': len(df),
-            'completed_projects': int(df['Status'].astype(str).str.lower().str.contains('complete').sum()) if 'Status' in df.columns else 0,
-            'irrigation_total': irrigation_total,
-            'storage_total': storage_total,
-            'submergence_total': submergence_total
-        }
-
-        # table data (full columns for DataTable view)
-        columns = df.columns.tolist()
-        table_data = df.to_dict(orient='records')
-
+        artifacts = precomputed.get('irrigation3', request.args)
+        if artifacts is not None:
+            return artifacts['map_html']
+        with stage('load'):
+            frames_all = dataset_cache.get(DATA_PATH, load_data)
+        with stage('filter'):
+            query = parse_filters(request.args, frames_all.filter_index, FILTER_ALIASES)
+        return map_document(frames_all.select(query), query)
+    except FilterError as e:
+        return f"<p style='color:red;'>{escape(str(e))}</p>", 400
     except Exception as e:
-        map_html = f"<p style='color:red;'>Error: {str(e)}</p>"
-        projects, stats, columns, table_data = [], {}, [], []
-
-    # always return the template
-    return render_template(
-        'index3.html',
-        map_html=map_html,
-        projects=projects,
-        stats=stats,
-        columns=columns,
-        table_data=table_data,
-        selected_dam_type=selected_dam_type,
-        selected_length_range=selected_length_range,
-        dam_types=dam_types
-    )
+        return f"<p style='color:red;'>Error: {str(e)}</p>", 500
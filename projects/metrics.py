@@ -0,0 +1,157 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+# Histogram buckets: seconds for stage latency, bytes for payloads, rows
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+# Functions listed in a ?profile=1 report
+PROFILE_LINES = 40
+
+
+# --- Histograms ---
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def exposition(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                labels = ','.join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound:g}"}} {n}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'{self.name}_sum{{{labels}}} {total:.6f}')
+                lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+STAGE_SECONDS = Histogram('irrigation_stage_seconds', 'Time spent per request stage',
+                          LATENCY_BUCKETS, ('route', 'stage'))
+RESPONSE_BYTES = Histogram('irrigation_response_bytes', 'Response body size as sent',
+                           SIZE_BUCKETS, ('route',))
+ROWS = Histogram('irrigation_rows', 'Rows a request worked on', ROW_BUCKETS, ('route',))
+HISTOGRAMS = (STAGE_SECONDS, RESPONSE_BYTES, ROWS)
+
+
+def route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+# --- Stages ---
+# with stage('load'): ... times a block of the current request; the timings
+# go into the Server-Timing header and the stage histogram. Outside a
+# request (CLI, benchmarks) the block simply runs.
+@contextmanager
+def stage(name):
+    if not has_request_context():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.setdefault('stages', []).append((name, time.perf_counter() - start))
+
+
+def record_rows(count):
+    if has_request_context():
+        ROWS.observe(count, route_label())
+
+
+# --- Flask hooks ---
+def init_metrics(app):
+    app.config.setdefault('PROFILING', os.environ.get('PROFILING') == '1')
+    app.config.setdefault('PROFILE_DIR', os.environ.get('PROFILE_DIR'))
+
+    @app.before_request
+    def start_request():
+        g.request_start = time.perf_counter()
+        if app.config['PROFILING'] and request.args.get('profile') == '1':
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def finish_request(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            return profile_response(app, profiler, response)
+
+        route = route_label()
+        stages = g.get('stages', [])
+        total = time.perf_counter() - g.get('request_start', time.perf_counter())
+        for name, seconds in stages:
+            STAGE_SECONDS.observe(seconds, route, name)
+        STAGE_SECONDS.observe(total, route, 'total')
+        if not response.is_streamed and not response.direct_passthrough:
+            RESPONSE_BYTES.observe(len(response.get_data()), route)
+
+        timings = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in stages]
+        timings.append(f'total;dur={total * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(timings)
+        return response
+
+
+# ?profile=1 (with PROFILING on): the request runs under cProfile and the
+# response is its report, top functions by cumulative time. The raw stats
+# are also written to PROFILE_DIR, when set, for snakeviz / pstats.
+def profile_response(app, profiler, response):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+    if app.config['PROFILE_DIR']:
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+        name = f"{route_label().strip('/').replace('/', '_') or 'home'}-{int(time.time() * 1000)}.prof"
+        stats.dump_stats(os.path.join(app.config['PROFILE_DIR'], name))
+    header = f"{request.method} {request.full_path} -> {response.status}\n\n"
+    return app.response_class(header + out.getvalue(), mimetype='text/plain')
+
+
+# --- Prometheus text exposition ---
+# caches: {name: stats dict with hits / misses (and builds)} read at scrape time
+def exposition(caches):
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.exposition()
+    for metric, key in (('hits', 'hits'), ('misses', 'misses'), ('builds', 'builds')):
+        present = [(name, stats[key]) for name, stats in caches.items() if key in stats]
+        if present:
+            lines.append(f'# HELP irrigation_cache_{metric}_total Cache {metric} since the worker started')
+            lines.append(f'# TYPE irrigation_cache_{metric}_total counter')
+            lines += [f'irrigation_cache_{metric}_total{{cache="{name}"}} {value}' for name, value in present]
+    lines.append('# HELP irrigation_cache_hit_ratio Hits / (hits + misses) per cache')
+    lines.append('# TYPE irrigation_cache_hit_ratio gauge')
+    for name, stats in caches.items():
+        if 'hits' in stats and 'misses' in stats:
+            lookups = stats['hits'] + stats['misses']
+            lines.append(f'irrigation_cache_hit_ratio{{cache="{name}"}} {stats["hits"] / lookups if lookups else 0:.4f}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,72 @@
+import re
+from functools import lru_cache
+
+from projects.frame_utils import map_unique
+
+# Distinct raw values seen per process; results are memoized across loads
+MEMO_SIZE = 65536
+DEFAULT_COLOR = '#6b7280'
+
+
+# --- Status -> canonical status -> marker color ---
+# rules: (regex, canonical status) tried in order on the stripped, lowercased
+# value; unmatched values stay as they are. colors: canonical status -> hex.
+class StatusScheme:
+    def __init__(self, colors, rules=(), default_color=DEFAULT_COLOR):
+        self.colors = colors
+        self.rules = [(re.compile(pattern), status) for pattern, status in rules]
+        self.default_color = default_color
+        self.canonical = lru_cache(maxsize=MEMO_SIZE)(self._canonical)
+        self.color = lru_cache(maxsize=MEMO_SIZE)(self._color)
+
+    def _canonical(self, raw):
+        if raw is None:
+            return 'unknown'
+        s = str(raw).strip().lower()
+        for pattern, status in self.rules:
+            if pattern.search(s):
+                return status
+        return s
+
+    def _color(self, status):
+        if not isinstance(status, str) or not status:
+            return self.default_color
+        return self.colors.get(self.canonical(status), self.default_color)
+
+    # Column-wise: each distinct value is looked up once
+    def canonical_series(self, series):
+        return map_unique(series, self.canonical)
+
+    def color_series(self, series):
+        return map_unique(series, self.color)
+
+
+# --- Messy numeric text ---
+NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+DIGIT_RE = re.compile(r'\d')
+NOT_NUMERIC_RE = re.compile(r'[^0-9.]')
+
+
+# "300-400 ha" -> 700.0, "1,234.5" -> 1234.5, no digits -> 0.0
+@lru_cache(maxsize=MEMO_SIZE)
+def sum_of_numbers(text):
+    return sum(float(n) for n in NUMBER_RE.findall(text.replace(',', '')))
+
+
+# "1,450 m" -> 1450.0: every non-digit dropped; no digits / unparseable -> 0.0
+@lru_cache(maxsize=MEMO_SIZE)
+def digits_number(text):
+    if not DIGIT_RE.search(text):
+        return 0.0
+    try:
+        return float(NOT_NUMERIC_RE.sub('', text))
+    except ValueError:
+        return 0.0
+
+
+def numbers_sum_series(series):
+    return map_unique(series, sum_of_numbers).astype(float)
+
+
+def digits_series(series):
+    return map_unique(series, digits_number).astype(float)
@@ -0,0 +1,265 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+try:
+    import fcntl
+except ImportError:  # no cross-process build lock (Windows): each process builds
+    fcntl = None
+
+from projects.dataset_cache import DatasetCache, dataset_cache
+from projects.datasets import DATASETS
+from projects.snapshots import code_digest
+
+log = logging.getLogger(__name__)
+
+# Processes building artifacts; kept below the CPU count so a refresh does
+# not starve the request workers
+MAX_PROCESSES = max(1, min(4, (os.cpu_count() or 2) - 1))
+# Built artifacts, one file per dataset version, shared by every worker
+PRECOMPUTE_DIR = os.environ.get('PRECOMPUTE_DIR', os.path.join('instance', 'precomputed'))
+# Pool processes start from a fresh interpreter: forking a worker that is
+# serving requests (its threads holding locks) can deadlock the child
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+# --- Filter combinations ---
+# dimensions: {param: [values]}; every value of every param, each param also
+# left unset ("all"), e.g. dam_type x dam_length for irrigation3
+def combinations(dimensions):
+    params = sorted(dimensions)
+    for values in product(*[[None] + list(dimensions[param]) for param in params]):
+        yield {param: value for param, value in zip(params, values) if value is not None}
+
+
+# Query args -> combination key, or None when the args hold anything beyond
+# the declared params (those requests are rendered on demand)
+def combination_key(args, params):
+    if any(name not in params for name in args):
+        return None
+    key = []
+    for param in params:
+        value = (args.get(param) or '').strip().lower()
+        key.append(None if value in ('', 'all') else value)
+    return tuple(key)
+
+
+# Runs in each pool process before its first task: the process moves to the
+# parent's working directory (source paths are relative) and the exact
+# version being built goes into its dataset cache, so builds never parse the
+# workbook again or see a newer one
+def install(folder, path, version, frames):
+    os.chdir(folder)
+    dataset_cache.replace(path, version, frames)
+    DatasetCache.publish(path, version)
+
+
+# Exclusive, non-blocking lock on lock_path: the open file while this
+# process holds it, None while another process does
+def claim(lock_path):
+    lock = open(lock_path, 'a')
+    if fcntl is None:
+        return lock
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+# Written to a temp file and renamed, so readers never load half a file;
+# the dataset's other versions in the folder are removed
+def save(path, name, results):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    folder, current = os.path.split(path)
+    for filename in os.listdir(folder):
+        if filename.startswith(f'{name}.') and not filename.startswith(current):
+            try:
+                os.remove(os.path.join(folder, filename))
+            except OSError:
+                pass
+
+
+# --- Precomputed dashboards ---
+# A dataset registered with precompute={'dimensions': fn(frames) -> {param:
+# [values]}, 'build': fn(args) -> artifacts} has the artifacts for every
+# combination of its dimension params built on a process pool whenever its
+# workbook changes (at warmup and by the data watcher, never on a request),
+# off the request threads and the GIL. build must be a module-level
+# function: it is pickled by name and runs in a fresh child process, which
+# is handed the frames of the version being built (see install).
+#
+# Each version is built once for all workers: into a file under
+# PRECOMPUTE_DIR named by dataset, version and code, by whichever process
+# takes its lock first (the gunicorn master at warmup, then the first worker
+# to see a change); the others load that file once it is there instead of
+# building the same combinations again. Results for an older version are
+# dropped once a newer build is pending.
+class Precomputer:
+    def __init__(self, processes=MAX_PROCESSES, folder=PRECOMPUTE_DIR):
+        self.processes = processes
+        self.folder = folder
+        self._results = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.loads = 0
+        self.failures = 0
+
+    def path(self, name, version):
+        digest = hashlib.sha1(repr((name, version, code_digest())).encode()).hexdigest()[:20]
+        return os.path.join(os.path.abspath(self.folder), f'{name}.{digest}.pickle')
+
+    # Results for a version built by any process, read from its file
+    def _load(self, name, version):
+        try:
+            with open(self.path(name, version), 'rb') as f:
+                saved = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning("precomputed %s unreadable: %s", name, e)
+            with self._lock:
+                self.failures += 1
+            return None
+        entry = (version, saved['params'], saved['built'])
+        with self._lock:
+            self._results[name] = entry
+            self.loads += 1
+        return entry
+
+    # Schedules a build when the dataset changed since the last one and no
+    # process has built (or is building) that version; cheap otherwise.
+    # wait=True blocks until it is done.
+    def refresh(self, name, wait=False):
+        dataset = DATASETS[name]
+        spec = dataset.get('precompute')
+        if not spec:
+            return 0
+        try:
+            frames = dataset['frames']()
+            version = dataset_cache.version(dataset['path'])
+        except Exception:
+            return 0
+        with self._lock:
+            current = self._results.get(name)
+            if (current is not None and current[0] == version) or self._pending.get(name) == version:
+                return 0
+        if self._load(name, version) is not None:
+            return 0
+
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.path(name, version)
+        lock = claim(path + '.lock')
+        if lock is None:
+            return 0  # another process is building it; get() picks the file up
+        if self._load(name, version) is not None:
+            lock.close()  # finished while we were waiting for the lock
+            return 0
+        with self._lock:
+            self._pending[name] = version
+
+        try:
+            dimensions = spec['dimensions'](frames)
+            params = sorted(dimensions)
+            # A pool per build: its processes start from this version's frames
+            pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context(START_METHOD),
+                                       initializer=install, initargs=(os.getcwd(), dataset['path'], version, frames))
+            futures = [(combination_key(args, params), pool.submit(spec['build'], args))
+                       for args in combinations(dimensions)]
+        except Exception:
+            lock.close()
+            with self._lock:
+                self._pending.pop(name, None)
+                self.failures += 1
+            return 0
+
+        collector = threading.Thread(target=self._collect, args=(name, version, params, pool, futures, lock, path),
+                                     daemon=True)
+        collector.start()
+        if wait:
+            collector.join()
+        return len(futures)
+
+    def _collect(self, name, version, params, pool, futures, lock, path):
+        built = {}
+        failures = 0
+        for key, future in futures:
+            try:
+                built[key] = future.result()
+            except Exception:
+                failures += 1
+        pool.shutdown()
+        try:
+            if built:
+                save(path, name, {'version': version, 'params': params, 'built': built})
+        except OSError as e:
+            # still served from this process; the others build it themselves
+            log.warning("saving precomputed %s failed: %s", name, e)
+        finally:
+            lock.close()
+
+        with self._lock:
+            self.failures += failures
+            if self._pending.get(name) != version:
+                return  # superseded by a newer version
+            del self._pending[name]
+            self._results[name] = (version, params, built)
+            self.builds += len(built)
+
+    # Artifacts for the request's args, or None (unseen params, stale or
+    # not built yet)
+    def get(self, name, args):
+        try:
+            current = DatasetCache.fingerprint(DATASETS[name]['path'])
+        except OSError:
+            current = None
+        entry = self._results.get(name)
+        if current is not None and (entry is None or entry[0] != current):
+            entry = self._load(name, current)
+
+        artifacts = None
+        if entry is not None and entry[0] == current:
+            key = combination_key(args, entry[1])
+            if key is not None:
+                artifacts = entry[2].get(key)
+        with self._lock:
+            if artifacts is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return artifacts
+
+    def clear(self):
+        with self._lock:
+            dropped = sum(len(built) for _, _, built in self._results.values())
+            self._results.clear()
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                'datasets': {name: len(built) for name, (_, _, built) in self._results.items()},
+                'pending': sorted(self._pending),
+                'processes': self.processes,
+                'folder': self.folder,
+                'hits': self.hits,
+                'misses': self.misses,
+                'builds': self.builds,
+                'loads': self.loads,
+                'failures': self.failures,
+            }
+
+
+precomputed = Precomputer()
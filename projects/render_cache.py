@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+
+
+# --- Rendered output cache ---
+# Bounded LRU for rendered HTML (folium maps today). Evicts least recently
+# used entries once either the entry count or the total size is exceeded.
+class RenderCache:
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(value):
+        return len(value.encode('utf-8')) if isinstance(value, str) else len(value)
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        size = self._size(value)
+        if size > self.max_bytes:
+            return value  # never cache something that would flush everything else
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def get_or_render(self, key, render):
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, render())
+        return value
+
+    def clear(self):
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# --- Cache keys ---
+# Dataset version (source mtime/size) plus the query parameters that change
+# the output, normalized so equivalent URLs share one entry.
+def make_key(source, version, **params):
+    normalized = tuple(sorted(
+        (name, str(value).strip().lower())
+        for name, value in params.items()
+        if value is not None and str(value).strip().lower() not in ('', 'all')
+    ))
+    return (source, version, normalized)
+
+
+map_cache = RenderCache()
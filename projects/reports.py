@@ -0,0 +1,305 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+
+import numpy as np
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # only the offline extraction needs pypdf
+    PdfReader = None
+
+from projects.dataset_cache import DatasetCache
+from projects.search_index import EXACT, PREFIX, MAX_PREFIX_TERMS, tokenize
+
+log = logging.getLogger(__name__)
+
+REPORTS_DIR = os.path.join('static', 'reports')
+# Extracted page text, one JSON file per PDF content hash, plus manifest.json
+# listing the current reports (not under static/: it is not served)
+REPORT_TEXT_DIR = os.environ.get('REPORT_TEXT_DIR', os.path.join('instance', 'reports'))
+MANIFEST = 'manifest.json'
+# Pages per extraction task, so one large PDF is spread over the pool too
+PAGES_PER_TASK = 16
+MAX_PROCESSES = max(1, min(8, os.cpu_count() or 1))
+# Project names shorter than this (normalized) are too generic to link
+MIN_NAME_LENGTH = 5
+SNIPPET_CHARS = 160
+# Report pages listed under a map popup
+POPUP_LINKS = 8
+
+
+# --- Offline extraction ---
+# flask --app app extract-reports: text of every page of every PDF in
+# static/reports, extracted on a process pool and cached by the file's
+# SHA-256, so unchanged (or renamed) PDFs are never parsed twice. Requests
+# only ever read the cached text.
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def page_count(path):
+    return len(PdfReader(path).pages)
+
+
+# Runs in a pool process: text of pages [start, stop) of one PDF
+def extract_pages(path, start, stop):
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or '' for i in range(start, stop)]
+
+
+def write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def extract_reports(reports_dir=REPORTS_DIR, text_dir=REPORT_TEXT_DIR, processes=MAX_PROCESSES):
+    if PdfReader is None:
+        raise RuntimeError("pypdf is required to extract report text (pip install pypdf)")
+    os.makedirs(text_dir, exist_ok=True)
+    files = sorted(name for name in os.listdir(reports_dir) if name.lower().endswith('.pdf'))
+
+    reports, results, tasks = [], {}, []
+    for name in files:
+        path = os.path.join(reports_dir, name)
+        report = {'file': name, 'title': os.path.splitext(name)[0], 'sha256': file_hash(path)}
+        if os.path.exists(os.path.join(text_dir, report['sha256'] + '.json')):
+            report['status'] = 'cached'
+        else:
+            try:
+                pages = page_count(path)
+            except Exception as e:
+                report['status'] = f'failed ({e})'
+                results[name] = report
+                continue
+            report['status'] = 'extracted'
+            tasks += [(name, path, start, min(start + PAGES_PER_TASK, pages))
+                      for start in range(0, pages, PAGES_PER_TASK)]
+        reports.append(report)
+        results[name] = report
+
+    start = time.perf_counter()
+    texts = {}
+    if tasks:
+        with ProcessPoolExecutor(max_workers=min(processes, len(tasks))) as pool:
+            chunks = pool.map(extract_pages, *zip(*[task[1:] for task in tasks]))
+            for (name, _, _, _), chunk in zip(tasks, chunks):
+                texts.setdefault(name, []).extend(chunk)
+    # A PDF without pages still gets its (empty) text file, like every
+    # report the manifest lists
+    for report in reports:
+        if report['status'] == 'extracted':
+            write_json(os.path.join(text_dir, report['sha256'] + '.json'), {'pages': texts.get(report['file'], [])})
+    seconds = round(time.perf_counter() - start, 3)
+
+    write_json(os.path.join(text_dir, MANIFEST),
+               {'reports': [{k: r[k] for k in ('file', 'title', 'sha256')} for r in reports]})
+    return list(results.values()), seconds
+
+
+# --- Page index ---
+# Built from the cached text: term -> pages holding it (with counts), page
+# text normalized to its tokens for phrase matching, and the raw text for
+# snippets. Pages are numbered from 1 as in a PDF viewer's #page=N.
+class ReportPages:
+    def __init__(self, reports, texts):
+        self.reports = reports
+        self.report_of = []
+        self.page_of = []
+        self.texts = []
+        self.phrases = []
+        postings = {}
+        for number, (report, pages) in enumerate(zip(reports, texts)):
+            for page, text in enumerate(pages, start=1):
+                tokens = tokenize(text)
+                position = len(self.texts)
+                for term, count in Counter(tokens).items():
+                    postings.setdefault(term, ([], []))
+                    postings[term][0].append(position)
+                    postings[term][1].append(count)
+                self.report_of.append(number)
+                self.page_of.append(page)
+                self.texts.append(' '.join(text.split()))
+                self.phrases.append(' ' + ' '.join(tokens) + ' ')
+        self.size = len(self.texts)
+        self.postings = {term: (np.asarray(pages), np.asarray(counts, dtype=float))
+                         for term, (pages, counts) in postings.items()}
+        self.terms = sorted(self.postings)
+
+    # {indexed term: match quality}: exact or prefix (page text is too noisy
+    # for typo matching)
+    def expand(self, token):
+        matches = {}
+        start = bisect_left(self.terms, token)
+        for term in self.terms[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            matches[term] = EXACT if term == token else PREFIX
+        return matches
+
+    # (pages, scores) holding every query term; tf-idf per term
+    def search(self, tokens):
+        total = np.zeros(self.size)
+        alive = np.ones(self.size, dtype=bool)
+        for token in tokens:
+            best = np.zeros(self.size)
+            for term, quality in self.expand(token).items():
+                pages, counts = self.postings[term]
+                idf = math.log(1 + self.size / len(pages))
+                np.maximum.at(best, pages, quality * idf * (1 + np.log(counts)))
+            alive &= best > 0
+            total += best
+        pages = np.flatnonzero(alive)
+        return pages, total[pages]
+
+    # Pages where the phrase's tokens appear in order (candidates are the
+    # pages of its rarest token)
+    def pages_with(self, phrase):
+        tokens = phrase.split()
+        if any(token not in self.postings for token in tokens):
+            return []
+        rarest = min(tokens, key=lambda token: len(self.postings[token][0]))
+        needle = ' ' + phrase + ' '
+        return [int(p) for p in self.postings[rarest][0] if needle in self.phrases[p]]
+
+    def snippet(self, position, tokens):
+        text = self.texts[position]
+        lower = text.lower()
+        at = min([i for i in (lower.find(t) for t in tokens) if i >= 0], default=0)
+        start = max(0, at - SNIPPET_CHARS // 3)
+        return ('…' if start else '') + text[start:start + SNIPPET_CHARS] + ('…' if start + SNIPPET_CHARS < len(text) else '')
+
+    def link(self, position):
+        report = self.reports[self.report_of[position]]
+        return {'report': report['title'], 'file': report['file'], 'page': self.page_of[position]}
+
+
+# --- Report index ---
+# Loaded from the cache written by extract-reports (reloaded when its
+# manifest changes); per dataset, the report pages mentioning each project
+# name are found once per dataset / report version. A report whose text file
+# is missing or unreadable is left out (and logged) rather than taking the
+# search, the popup links and warmup down with it.
+class ReportIndex:
+    def __init__(self, text_dir=REPORT_TEXT_DIR):
+        self.text_dir = text_dir
+        self._pages = None
+        self._mentions = {}
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.builds = 0
+
+    def pages(self):
+        manifest = os.path.join(self.text_dir, MANIFEST)
+        try:
+            version = os.stat(manifest).st_mtime_ns
+        except OSError:
+            return None
+        entry = self._pages
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        try:
+            with open(manifest, encoding='utf-8') as f:
+                listed = json.load(f)['reports']
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("report manifest %s unreadable: %s", manifest, e)
+            return None
+        reports, texts = [], []
+        for report in listed:
+            try:
+                with open(os.path.join(self.text_dir, report['sha256'] + '.json'), encoding='utf-8') as f:
+                    texts.append(json.load(f)['pages'])
+            except (OSError, ValueError, KeyError) as e:
+                log.warning("skipping report %s: %s", report.get('file'), e)
+                continue
+            reports.append(report)
+        pages = ReportPages(reports, texts)
+        with self._lock:
+            self.builds += 1
+            self._pages = (version, pages)
+            self._mentions.clear()
+        return pages
+
+    def search(self, q, limit):
+        with self._lock:
+            self.queries += 1
+        pages, tokens = self.pages(), tokenize(q)
+        if pages is None or not tokens:
+            return []
+        positions, scores = pages.search(tokens)
+        order = np.lexsort((positions, -scores))[:limit]
+        return [{**pages.link(positions[i]), 'score': round(float(scores[i]), 3),
+                 'snippet': pages.snippet(positions[i], tokens)} for i in order]
+
+    # {row id: [page positions]} for the projects of a dataset named in the reports
+    def mentions(self, dataset):
+        pages = self.pages()
+        if pages is None:
+            return {}
+        name = dataset['name']
+        version = (self._pages[0], DatasetCache.fingerprint(dataset['path']))
+        entry = self._mentions.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        names = dataset['frames']().fields['name']
+        found = {}
+        by_phrase = {}
+        for row_id, value in zip(names.index.tolist(), names.tolist()):
+            phrase = ' '.join(tokenize(value))
+            if len(phrase) < MIN_NAME_LENGTH:
+                continue
+            if phrase not in by_phrase:
+                by_phrase[phrase] = pages.pages_with(phrase)
+            if by_phrase[phrase]:
+                found[row_id] = by_phrase[phrase]
+        with self._lock:
+            self._mentions[name] = (version, found)
+        return found
+
+    def links(self, dataset, row_id):
+        pages = self.pages()
+        return [pages.link(position) for position in self.mentions(dataset).get(row_id, [])]
+
+    def clear(self):
+        with self._lock:
+            self._pages = None
+            self._mentions.clear()
+
+    def stats(self):
+        with self._lock:
+            pages = self._pages[1] if self._pages else None
+            return {
+                'reports': [r['file'] for r in pages.reports] if pages else [],
+                'pages': pages.size if pages else 0,
+                'terms': len(pages.terms) if pages else 0,
+                'mentions': {name: len(entry[1]) for name, entry in self._mentions.items()},
+                'queries': self.queries,
+                'builds': self.builds,
+            }
+
+
+# Footer for a map popup: the report pages naming the project
+def links_html(links):
+    items = ' · '.join(f"<a href=\"{escape(link['url'])}\" target=\"_blank\">{escape(link['report'])}, p. {link['page']}</a>"
+                       for link in links[:POPUP_LINKS])
+    return (f"<div style='font-family:Segoe UI;padding:6px 14px;font-size:12px;color:#475569;'>"
+            f"<i class='fas fa-book-open'></i> In the annual reports: {items}</div>")
+
+
+report_index = ReportIndex()
@@ -0,0 +1,267 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from projects.dataset_cache import DatasetCache
+from projects.datasets import DATASETS
+
+# Canonical fields searched, with the weight of a hit in each
+SEARCH_FIELDS = {'name': 3.0, 'district': 2.0, 'region': 1.0, 'type': 1.0, 'purpose': 1.0}
+# How much a query term is worth by how it matched an indexed term
+EXACT, PREFIX, TYPO = 1.0, 0.6, 0.4
+# Typos (one insert / delete / substitution / swap) only for terms this long
+MIN_TYPO_LENGTH = 4
+# Prefixes expand to at most this many indexed terms
+MAX_PREFIX_TERMS = 64
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+
+TOKEN_RE = re.compile(r'[0-9a-z]+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def deletions(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+# Optimal string alignment distance <= 1
+def within_one_edit(a, b):
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) == 1 or (len(diff) == 2 and diff[1] == diff[0] + 1
+                                  and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    return a in deletions(b)
+
+
+# (term ids, row positions, weights) of every term in the searched fields,
+# unsorted; new terms are numbered on in term_ids. Every distinct cell value
+# is tokenized once, however many rows share it.
+def field_postings(fields, term_ids):
+    term_parts, row_parts, weight_parts = [], [], []
+    for field, weight in SEARCH_FIELDS.items():
+        if field not in fields.columns:
+            continue
+        codes, uniques = pd.factorize(fields[field].astype(str))
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        pair_codes, pair_terms = [], []
+        for code, value in enumerate(uniques):
+            for term in set(tokenize(value)):
+                pair_codes.append(code)
+                pair_terms.append(term_ids.setdefault(term, len(term_ids)))
+        if not pair_codes:
+            continue
+        # Each (value, term) pair stands for every row holding the value
+        pair_codes = np.asarray(pair_codes)
+        lengths = bounds[pair_codes + 1] - bounds[pair_codes]
+        starts = np.repeat(bounds[pair_codes] - np.cumsum(lengths) + lengths, lengths)
+        row_parts.append(order[starts + np.arange(lengths.sum())])
+        term_parts.append(np.repeat(pair_terms, lengths))
+        weight_parts.append(np.full(lengths.sum(), weight))
+
+    if not term_parts:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+    return np.concatenate(term_parts), np.concatenate(row_parts), np.concatenate(weight_parts)
+
+
+# --- One dataset's inverted index ---
+# Postings live in flat arrays sorted by term: term -> slice of row
+# positions and the weight of the field each came from.
+#
+# Given the index of the previous version (base) and the rows both versions
+# share unchanged (kept: old positions, new positions), only the other rows
+# are tokenized; the kept rows' postings are renumbered to their new
+# positions, and terms left without any row are dropped.
+class DatasetTerms:
+    def __init__(self, fields, base=None, kept=None):
+        self.ids = fields.index.to_numpy()
+        self.size = len(fields)
+        self.names = fields['name'].tolist()
+        self.districts = fields['district'].tolist()
+        self.statuses = fields['status'].tolist()
+
+        if base is None:
+            term_ids = {}
+            terms, rows, weights = field_postings(fields, term_ids)
+        else:
+            old_rows, new_rows = kept
+            moved = np.full(base.size, -1)
+            moved[old_rows] = new_rows
+            moved = moved[base.rows]
+            alive = moved >= 0
+            base_terms = np.repeat(np.arange(len(base.term_ids)), np.diff(base.offsets))
+            fresh = np.setdiff1d(np.arange(self.size), new_rows)
+            term_ids = dict(base.term_ids)
+            terms, rows, weights = field_postings(fields.iloc[fresh], term_ids)
+            terms = np.concatenate([base_terms[alive], terms])
+            rows = np.concatenate([moved[alive], fresh[rows]])
+            weights = np.concatenate([base.weights[alive], weights])
+            # Renumber the terms still in use (ids follow term_ids' order)
+            live = np.unique(terms)
+            words = list(term_ids)
+            term_ids = {words[term_id]: n for n, term_id in enumerate(live)}
+            terms = np.searchsorted(live, terms)
+
+        by_term = np.argsort(terms, kind='stable')
+        self.rows = rows[by_term]
+        self.weights = weights[by_term]
+        self.offsets = np.searchsorted(terms[by_term], np.arange(len(term_ids) + 1))
+        self.term_ids = term_ids
+        self.terms = sorted(term_ids)
+        # Deletion neighbourhood: a misspelt word and the indexed one share a
+        # one-character deletion (or one is a deletion of the other).
+        # Numbers only match exactly or by prefix.
+        self.deletes = defaultdict(set)
+        for term in self.terms:
+            if len(term) >= MIN_TYPO_LENGTH and term.isalpha():
+                for variant in deletions(term):
+                    self.deletes[variant].add(term)
+
+    def postings(self, term):
+        term_id = self.term_ids[term]
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.rows[start:end], self.weights[start:end]
+
+    # {indexed term: match quality} for one query term
+    def expand(self, token):
+        matches = {}
+        start = bisect_left(self.terms, token)
+        for term in self.terms[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            matches[term] = EXACT if term == token else PREFIX
+        if len(token) >= MIN_TYPO_LENGTH and token.isalpha():
+            candidates = set(self.deletes.get(token, ()))
+            for variant in deletions(token):
+                candidates |= self.deletes.get(variant, set())
+                if variant in self.term_ids:
+                    candidates.add(variant)
+            for term in candidates:
+                if term not in matches and within_one_edit(token, term):
+                    matches[term] = TYPO
+        return matches
+
+    # (row positions, scores) of the rows matching every query term
+    def search(self, tokens):
+        total = np.zeros(self.size)
+        alive = np.ones(self.size, dtype=bool)
+        for token in tokens:
+            best = np.zeros(self.size)
+            for term, quality in self.expand(token).items():
+                rows, weights = self.postings(term)
+                np.maximum.at(best, rows, weights * quality)
+            alive &= best > 0
+            total += best
+        rows = np.flatnonzero(alive)
+        return rows, total[rows]
+
+    def hit(self, dataset, position, score):
+        return {
+            'dataset': dataset['name'],
+            'title': dataset['title'],
+            'id': int(self.ids[position]),
+            'name': self.names[position],
+            'district': self.districts[position],
+            'status': self.statuses[position],
+            'score': round(float(score), 3),
+        }
+
+
+# --- Cross-dataset index ---
+# One DatasetTerms per registered dataset, rebuilt only for the datasets
+# whose source file changed since it was indexed (patched instead when the
+# watcher knows which rows changed).
+class SearchIndex:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.builds = 0
+        self.patches = 0
+
+    # Index for a dataset, (re)built if its workbook changed
+    def terms(self, dataset):
+        name = dataset['name']
+        fingerprint = DatasetCache.fingerprint(dataset['path'])
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+
+        terms = DatasetTerms(dataset['frames']().fields)
+        with self._lock:
+            self.builds += 1
+            self._entries[name] = (fingerprint, terms)
+        return terms
+
+    # Ranked hits across datasets (all of them unless `names` is given)
+    def search(self, q, names=None, limit=DEFAULT_LIMIT):
+        with self._lock:
+            self.queries += 1
+        tokens = tokenize(q)
+        if not tokens:
+            return []
+
+        hits = []
+        for order, (name, dataset) in enumerate(DATASETS.items()):
+            if names and name not in names or dataset['frames'] is None:
+                continue
+            try:
+                terms = self.terms(dataset)
+            except Exception:
+                # An unreadable workbook should not take the other datasets' results down
+                continue
+            rows, scores = terms.search(tokens)
+            if len(rows) > limit:
+                top = np.argpartition(-scores, limit)[:limit]
+                rows, scores = rows[top], scores[top]
+            hits += [(-score, order, position, dataset, terms) for position, score in zip(rows, scores)]
+
+        hits.sort(key=lambda hit: hit[:3])
+        return [terms.hit(dataset, position, -score) for score, _, position, dataset, terms in hits[:limit]]
+
+    # Index for the version the watcher just published, patched from the
+    # one built on the version it replaced (previous) when there is one
+    def patch(self, dataset, previous, kept):
+        name = dataset['name']
+        entry = self._entries.get(name)
+        if entry is None or entry[0] != previous:
+            return self.terms(dataset)
+
+        fingerprint = DatasetCache.fingerprint(dataset['path'])
+        terms = DatasetTerms(dataset['frames']().fields, entry[1], kept)
+        with self._lock:
+            self.patches += 1
+            self._entries[name] = (fingerprint, terms)
+        return terms
+
+    def clear(self):
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'queries': self.queries,
+                'builds': self.builds,
+                'patches': self.patches,
+                'terms': {name: len(entry[1].terms) for name, entry in self._entries.items()},
+            }
+
+
+search_index = SearchIndex()
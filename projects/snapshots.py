@@ -0,0 +1,141 @@
+import hashlib
+import os
+from functools import lru_cache, partial
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # snapshots are optional, Excel still works without pyarrow
+    pa = None
+    feather = None
+
+
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_EXT = '.feather'
+# Schema metadata key holding the version of the code that wrote a snapshot
+VERSION_KEY = b'snapshot_version'
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# --- Read the original source file ---
+# options: read_excel/read_csv keyword arguments such as usecols and dtype;
+# dtype may also be a function of the header as written in the file
+# (-> dtype or None), resolved against the file's header row
+def read_source(path, options=None):
+    options = {k: v for k, v in (options or {}).items() if v is not None}
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        read = partial(pd.read_excel, path, engine='openpyxl')
+    else:
+        read = partial(pd.read_csv, path, encoding='latin1', on_bad_lines='skip')
+    dtype = options.get('dtype')
+    if callable(dtype) and not isinstance(dtype, type):
+        headers = read(nrows=0).columns
+        options['dtype'] = {header: dtype(header) for header in headers if dtype(header) is not None}
+    return read(**options)
+
+
+# --- Make a cleaned frame columnar-safe ---
+# Mixed object columns (numbers and text in one column) can't be stored in
+# Arrow, so they become numeric when every value parses and text otherwise.
+# Both load paths run this, so the Excel and snapshot frames are identical.
+def coerce_columns(df):
+    for col in df.columns:
+        if df[col].dtype != 'object':
+            continue
+        values = df[col]
+        numeric = pd.to_numeric(values, errors='coerce')
+        if numeric.notna().sum() == values.notna().sum():
+            df[col] = numeric
+        else:
+            df[col] = values.where(values.isna(), values.astype(str))
+    return df
+
+
+def snapshot_path(source):
+    folder, name = os.path.split(source)
+    return os.path.join(folder, SNAPSHOT_DIR, os.path.splitext(name)[0] + SNAPSHOT_EXT)
+
+
+# --- Snapshot versions ---
+# The schemas, normalize steps and parsers all live in this package, so a
+# hash of its sources (content, not mtimes: the same in every checkout) plus
+# the normalizer's name changes whenever a snapshot would come out different
+@lru_cache(maxsize=1)
+def code_digest():
+    digest = hashlib.sha1()
+    for base, folders, files in sorted(os.walk(PACKAGE_DIR)):
+        folders.sort()
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(base, name)
+                digest.update(os.path.relpath(path, PACKAGE_DIR).encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def snapshot_version(normalize):
+    func = getattr(normalize, 'func', normalize)  # functools.partial
+    name = f'{func.__module__}.{func.__qualname__}'
+    return hashlib.sha1(f'{code_digest()}:{name}'.encode()).hexdigest()[:20]
+
+
+# Fresh: newer than the source and written by the current code
+def snapshot_is_fresh(source, normalize):
+    if feather is None:
+        return False
+    path = snapshot_path(source)
+    try:
+        if os.stat(path).st_mtime_ns < os.stat(source).st_mtime_ns:
+            return False
+        with pa.memory_map(path) as f:
+            metadata = pa.ipc.open_file(f).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    return metadata.get(VERSION_KEY) == snapshot_version(normalize).encode()
+
+
+def write_snapshot(df, source, normalize):
+    if feather is None:
+        raise RuntimeError("pyarrow is required to build snapshots (pip install pyarrow)")
+    path = snapshot_path(source)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write to a temp file first so a reader never maps a half-written file;
+    # uncompressed so the columns can be memory-mapped directly.
+    tmp = path + '.tmp'
+    table = pa.Table.from_pandas(df)
+    metadata = {**(table.schema.metadata or {}), VERSION_KEY: snapshot_version(normalize).encode()}
+    feather.write_feather(table.replace_schema_metadata(metadata), tmp, compression='uncompressed')
+    os.replace(tmp, path)
+    return path
+
+
+# Columns come straight from the mapped file where Arrow allows it (one
+# block per column, no consolidation copy), and each Arrow column is
+# released as soon as it has been converted. Those columns are read-only:
+# callers replace columns (as the normalize and adapt steps do) or copy
+# before writing cells
+def read_snapshot(source):
+    table = feather.read_table(snapshot_path(source), memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+# --- Loader used by the blueprints ---
+# Memory-maps the snapshot when it is fresh (newer than the source, same
+# code version), otherwise parses the source and runs the normalize step.
+def load_frame(source, normalize, options=None):
+    if snapshot_is_fresh(source, normalize):
+        try:
+            return read_snapshot(source)
+        except Exception:
+            pass  # unreadable snapshot -> fall back to the source file
+    return coerce_columns(normalize(read_source(source, options)))
+
+
+def build_snapshot(source, normalize, options=None):
+    df = coerce_columns(normalize(read_source(source, options)))
+    return write_snapshot(df, source, normalize), len(df)
@@ -0,0 +1,150 @@
+import glob
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from projects.snapshots import coerce_columns, load_frame, snapshot_is_fresh
+
+SOURCE_EXTENSIONS = ('.xlsx', '.xlsm', '.csv')
+# Workbooks parsed at once when several changed (openpyxl is CPU-bound)
+MAX_PROCESSES = max(1, min(8, os.cpu_count() or 1))
+
+
+# --- Source paths ---
+# A dataset's path is one workbook, a folder of workbooks (per district /
+# per year; snapshots/ and Office lock files are skipped) or a glob such as
+# data/districts/*.xlsx. IRRIGATION2_SOURCE=... in the environment points a
+# dataset somewhere else without touching its blueprint.
+def source_path(name, default):
+    return os.environ.get(f'{name.upper()}_SOURCE', default)
+
+
+def is_multi_source(path):
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+def source_files(path):
+    if os.path.isdir(path):
+        names = [os.path.join(path, name) for name in os.listdir(path)]
+    elif glob.has_magic(path):
+        names = glob.glob(path)
+    else:
+        return [path]
+    return sorted(name for name in names
+                  if os.path.isfile(name) and name.lower().endswith(SOURCE_EXTENSIONS)
+                  and not os.path.basename(name).startswith(('~$', '.')))
+
+
+# (mtime, size) of a single workbook; for several, the newest mtime and a
+# digest of every file's name / mtime / size, so adding, removing or editing
+# any of them changes it (and it is the same in every process)
+def source_fingerprint(path):
+    if not is_multi_source(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    files = source_files(path)
+    if not files:
+        raise FileNotFoundError(f"No source files match {path}")
+    stats = [(name, os.stat(name)) for name in files]
+    digest = hashlib.sha1(repr([(name, st.st_mtime_ns, st.st_size) for name, st in stats]).encode())
+    return (max(st.st_mtime_ns for _, st in stats), digest.hexdigest()[:16])
+
+
+# Runs in a pool process: one workbook through the dataset's normalize step
+def parse_source(path, normalize, options):
+    return load_frame(path, normalize, options)
+
+
+# --- Multi-file datasets ---
+# Keeps every source file's cleaned frame with its fingerprint; a reload
+# re-reads only the files that changed (fresh snapshots are memory-mapped
+# in process, workbooks are parsed on a process pool), checks each against
+# the schema's columns, then concatenates them in file order and drops
+# duplicate rows (same key columns, or all columns; the later file wins).
+class SourceFrames:
+    def __init__(self, processes=MAX_PROCESSES):
+        self.processes = processes
+        self._sources = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+
+    def load(self, path, normalize, options=None, columns=(), key=None):
+        files = source_files(path)
+        if not files:
+            raise FileNotFoundError(f"No source files match {path}")
+        with self._lock:
+            cached = dict(self._sources.get(os.path.abspath(path), {}))
+
+        entries = {}
+        stale = []
+        for name in files:
+            fingerprint = source_fingerprint(name)
+            entry = cached.get(name)
+            if entry is not None and entry[0] == fingerprint:
+                entries[name] = entry
+            else:
+                stale.append((name, fingerprint))
+
+        parse = []
+        for name, fingerprint in stale:
+            if snapshot_is_fresh(name, normalize):
+                entries[name] = (fingerprint, load_frame(name, normalize, options))
+            else:
+                parse.append((name, fingerprint))
+        if len(parse) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.processes, len(parse))) as pool:
+                frames = pool.map(parse_source, [name for name, _ in parse],
+                                  [normalize] * len(parse), [options] * len(parse))
+                for (name, fingerprint), df in zip(parse, frames):
+                    entries[name] = (fingerprint, df)
+        else:
+            for name, fingerprint in parse:
+                entries[name] = (fingerprint, parse_source(name, normalize, options))
+
+        frames = [entries[name][1] for name in files]
+        check_columns(files, frames, columns)
+        df = pd.concat(frames, ignore_index=True)
+        before = len(df)
+        df = df.drop_duplicates(subset=key, keep='last', ignore_index=True)
+        df = coerce_columns(df)
+
+        with self._lock:
+            self._sources[os.path.abspath(path)] = entries
+            self.hits += len(files) - len(stale)
+            self.misses += len(stale)
+            self.duplicates += before - len(df)
+        return df
+
+    def clear(self):
+        with self._lock:
+            dropped = sum(len(entries) for entries in self._sources.values())
+            self._sources.clear()
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sources': {path: len(entries) for path, entries in self._sources.items()},
+                'processes': self.processes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'duplicates': self.duplicates,
+            }
+
+
+# Every file must carry the schema columns that any of them has, so one
+# sheet with a renamed or missing header cannot blank a column for the rest
+def check_columns(files, frames, columns):
+    present = [c for c in columns if any(c in df.columns for df in frames)]
+    for name, df in zip(files, frames):
+        missing = [c for c in present if c not in df.columns]
+        if missing:
+            raise ValueError(f"{os.path.basename(name)}: missing columns {missing}. Found: {list(df.columns)}")
+
+
+source_frames = SourceFrames()
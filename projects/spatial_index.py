@@ -0,0 +1,239 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+
+from projects.dataset_cache import DatasetCache
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+# Grid cells are sized so each holds about this many points on average
+POINTS_PER_CELL = 16
+# Nearest-neighbour search starts at one cell and doubles the radius until
+# k points are inside it; half the earth's circumference covers everything
+MAX_RADIUS_KM = math.pi * EARTH_RADIUS_KM
+# Largest change in point count a patched index keeps its cell size for
+PATCH_GROWTH = 2
+
+
+def haversine_km(lat, lon, lats, lons):
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# --- Uniform grid over a point frame ---
+# Points (the id/lat/lon/name/status/color frame from a dataset's points())
+# are sorted by grid cell, so every row of cells a query touches is one
+# contiguous slice found with searchsorted. Only those candidates get the
+# exact bbox / distance test.
+#
+# Given the index of the previous version (base) and the points both
+# versions share unchanged (kept: old positions, new positions), the grid is
+# reused while every point still falls inside it: the kept points keep their
+# cells and only the others are placed and merged in.
+class GridIndex:
+    def __init__(self, points, cell_degrees=None, base=None, kept=None):
+        self.points = points
+        lat = points['lat'].to_numpy(dtype=float)
+        lon = points['lon'].to_numpy(dtype=float)
+        self.size = len(points)
+        if base is not None and self._patch(base, kept, lat, lon):
+            return
+
+        if self.size:
+            self.south, self.west = lat.min(), lon.min()
+            self.north, self.east = lat.max(), lon.max()
+        else:
+            self.south = self.west = self.north = self.east = 0.0
+
+        if cell_degrees is None:
+            area = max((self.north - self.south) * (self.east - self.west), 1e-6)
+            cell_degrees = math.sqrt(area * POINTS_PER_CELL / max(self.size, 1))
+        self.cell = max(cell_degrees, 1e-5)
+
+        rows = self._cell(lat, self.south)
+        cols = self._cell(lon, self.west)
+        self.nrows = int(rows.max()) + 1 if self.size else 0
+        self.ncols = int(cols.max()) + 1 if self.size else 0
+
+        keys = rows * self.ncols + cols
+        order = np.argsort(keys, kind='stable')
+        self._order = order
+        self._keys = keys[order]
+        self._lat = lat[order]
+        self._lon = lon[order]
+
+    # False (build from scratch) when the points left base's grid or their
+    # number moved too far from the one its cell size was picked for
+    def _patch(self, base, kept, lat, lon):
+        if not base.size or not base.size / PATCH_GROWTH <= self.size <= base.size * PATCH_GROWTH:
+            return False
+        if lat.min() < base.south or lat.max() > base.north or lon.min() < base.west or lon.max() > base.east:
+            return False
+        self.south, self.west, self.north, self.east = base.south, base.west, base.north, base.east
+        self.cell, self.nrows, self.ncols = base.cell, base.nrows, base.ncols
+
+        old_positions, new_positions = kept
+        moved = np.full(base.size, -1)
+        moved[old_positions] = new_positions
+        moved = moved[base._order]
+        alive = moved >= 0
+        fresh = np.setdiff1d(np.arange(self.size), new_positions)
+        fresh_keys = self._cell(lat[fresh], self.south) * self.ncols + self._cell(lon[fresh], self.west)
+
+        # Sorted by (cell, position) as a full build would be; the kept points
+        # are already in that order unless the rows were reordered
+        kept_rank = base._keys[alive] * self.size + moved[alive]
+        if (np.diff(kept_rank) < 0).any():
+            kept_rank = np.sort(kept_rank)
+        fresh_rank = np.sort(fresh_keys * self.size + fresh)
+        rank = np.insert(kept_rank, np.searchsorted(kept_rank, fresh_rank), fresh_rank)
+
+        self._order = rank % self.size
+        self._keys = rank // self.size
+        self._lat = lat[self._order]
+        self._lon = lon[self._order]
+        return True
+
+    def _cell(self, values, origin):
+        return np.floor((np.asarray(values, dtype=float) - origin) / self.cell).astype(np.int64)
+
+    # Sorted positions of every point in the cells overlapping the box
+    def _candidates(self, west, south, east, north):
+        if not self.size:
+            return np.empty(0, dtype=np.int64)
+        r0 = max(int(self._cell(south, self.south)), 0)
+        r1 = min(int(self._cell(north, self.south)), self.nrows - 1)
+        c0 = max(int(self._cell(west, self.west)), 0)
+        c1 = min(int(self._cell(east, self.west)), self.ncols - 1)
+        if r0 > r1 or c0 > c1:
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.arange(r0, r1 + 1, dtype=np.int64) * self.ncols
+        starts = np.searchsorted(self._keys, rows + c0, side='left')
+        ends = np.searchsorted(self._keys, rows + c1, side='right')
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        # Concatenate the [start, end) ranges without a Python loop
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return offsets + np.arange(total, dtype=np.int64)
+
+    def _keep(self, positions, keep):
+        # positions are into the sorted arrays; keep is a mask over self.points
+        if keep is None:
+            return positions
+        return positions[keep[self._order[positions]]]
+
+    # Points inside (west, south, east, north), in source order
+    def within(self, bbox, keep=None):
+        west, south, east, north = bbox
+        cand = self._candidates(west, south, east, north)
+        lat, lon = self._lat[cand], self._lon[cand]
+        cand = cand[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)]
+        cand = self._keep(cand, keep)
+        return self.points.iloc[np.sort(self._order[cand])]
+
+    def _radius(self, lat, lon, km, keep=None):
+        dlat = km / KM_PER_DEGREE
+        dlon = km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        cand = self._keep(self._candidates(lon - dlon, lat - dlat, lon + dlon, lat + dlat), keep)
+        distance = haversine_km(lat, lon, self._lat[cand], self._lon[cand])
+        inside = distance <= km
+        cand, distance = cand[inside], distance[inside]
+        order = np.argsort(distance, kind='stable')
+        return cand[order], distance[order]
+
+    def _frame(self, positions, distance):
+        result = self.points.iloc[self._order[positions]].copy()
+        result['distance_km'] = distance
+        return result
+
+    # Points within km of (lat, lon), nearest first, with a distance_km column
+    def radius(self, lat, lon, km, keep=None):
+        return self._frame(*self._radius(lat, lon, km, keep))
+
+    # The k points closest to (lat, lon), nearest first
+    def nearest(self, lat, lon, k, keep=None):
+        available = self.size if keep is None else int(keep.sum())
+        k = min(k, available)
+        km = self.cell * KM_PER_DEGREE
+        positions, distance = np.empty(0, dtype=np.int64), np.empty(0)
+        while k > 0:
+            positions, distance = self._radius(lat, lon, km, keep)
+            if len(positions) >= k or km >= MAX_RADIUS_KM:
+                break
+            km = min(km * 2, MAX_RADIUS_KM)
+        return self._frame(positions[:k], distance[:k])
+
+
+# --- One index per dataset version ---
+# Rebuilt only when the dataset's source file changes (same fingerprint the
+# dataset cache uses), so queries never rescan the coordinate columns;
+# patched instead when the watcher knows which rows changed.
+class SpatialIndexCache:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.patches = 0
+
+    def get(self, dataset):
+        name = dataset['name']
+        fingerprint = DatasetCache.fingerprint(dataset['path'])
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == fingerprint:
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        index = GridIndex(dataset['points']({}))
+        with self._lock:
+            self.builds += 1
+            self._entries[name] = (fingerprint, index)
+        return index
+
+    # Index for the version the watcher just published, patched from the
+    # one built on the version it replaced (previous) when there is one.
+    # kept pairs up the (old, new) fields positions of the unchanged rows;
+    # points are matched to them through their id column.
+    def patch(self, dataset, previous, kept, old_fields, new_fields):
+        name = dataset['name']
+        entry = self._entries.get(name)
+        if entry is None or entry[0] != previous or 'id' not in entry[1].points.columns:
+            return self.get(dataset)
+
+        fingerprint = DatasetCache.fingerprint(dataset['path'])
+        base = entry[1]
+        points = dataset['points']({})
+        old_positions = pd.Index(base.points['id']).get_indexer(old_fields.index[kept[0]])
+        new_positions = pd.Index(points['id']).get_indexer(new_fields.index[kept[1]])
+        located = (old_positions >= 0) & (new_positions >= 0)
+        index = GridIndex(points, base=base, kept=(old_positions[located], new_positions[located]))
+        with self._lock:
+            self.patches += 1
+            self._entries[name] = (fingerprint, index)
+        return index
+
+    def clear(self):
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'builds': self.builds,
+                'patches': self.patches,
+                'points': {name: entry[1].size for name, entry in self._entries.items()},
+            }
+
+
+spatial_indexes = SpatialIndexCache()
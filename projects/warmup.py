@@ -0,0 +1,156 @@
+import gc
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from projects.compare import comparisons
+from projects.datasets import DATASETS
+from projects.precompute import precomputed
+from projects.reports import report_index
+from projects.search_index import search_index
+from projects.spatial_index import spatial_indexes
+
+
+# --- Warmup ---
+# Loads every registered dataset (frames, aggregates, filter / spatial /
+# search indexes, report page links) on a thread pool, builds the precomputed filter
+# combinations and the default dataset comparison, then renders each dashboard once so its default map and
+# stats are cached. Run in the gunicorn master with
+# preload_app (see gunicorn.conf.py), everything built here is inherited by
+# the forked workers; gc.freeze() moves it out of the collector's reach so
+# collections in the workers do not write to (and un-share) those pages.
+class WarmupState:
+    def __init__(self):
+        self.started = None
+        self.finished = None
+        self.datasets = {}
+        self.dashboards = {}
+        self.precompute = {}
+        self.comparisons = {}
+        self.reports = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        # Nothing to wait for when the app loads datasets lazily
+        return self.started is None or self.finished is not None
+
+    def record(self, section, name, **info):
+        with self._lock:
+            getattr(self, section)[name] = info
+
+    def stats(self):
+        with self._lock:
+            return {
+                'started': self.started,
+                'finished': self.finished,
+                'seconds': round(self.finished - self.started, 3) if self.finished else None,
+                'datasets': dict(self.datasets),
+                'dashboards': dict(self.dashboards),
+                'precompute': dict(self.precompute),
+                'comparisons': dict(self.comparisons),
+                'reports': dict(self.reports),
+            }
+
+
+warmup_state = WarmupState()
+
+
+def warm_dataset(dataset):
+    start = time.perf_counter()
+    try:
+        frames = dataset['frames']()
+        spatial_indexes.get(dataset)
+        search_index.terms(dataset)
+        report_index.mentions(dataset)
+        warmup_state.record('datasets', dataset['name'], rows=len(frames),
+                            seconds=round(time.perf_counter() - start, 3))
+    except Exception as e:
+        warmup_state.record('datasets', dataset['name'], error=str(e))
+
+
+def warm_reports():
+    start = time.perf_counter()
+    try:
+        pages = report_index.pages()
+        warmup_state.record('reports', 'index', pages=pages.size if pages else 0,
+                            seconds=round(time.perf_counter() - start, 3))
+    except Exception as e:
+        warmup_state.record('reports', 'index', error=str(e))
+
+
+def warm_comparison():
+    start = time.perf_counter()
+    try:
+        comparison = comparisons.get()
+        warmup_state.record('comparisons', f'{comparison.before}->{comparison.after}', matched=len(comparison.table),
+                            seconds=round(time.perf_counter() - start, 3))
+    except Exception as e:
+        warmup_state.record('comparisons', 'default', error=str(e))
+
+
+def warm_dashboard(client, dataset):
+    for url in (dataset['dashboard'], f"{dataset['dashboard']}/map"):
+        start = time.perf_counter()
+        response = client.get(url)
+        warmup_state.record('dashboards', url, status=response.status_code,
+                            seconds=round(time.perf_counter() - start, 3))
+
+
+def warm_up(app, workers=None):
+    warmup_state.started = time.time()
+    datasets = [d for d in DATASETS.values() if d['frames'] is not None]
+    warm_reports()
+    with ThreadPoolExecutor(max_workers=workers or len(datasets) or 1) as pool:
+        list(pool.map(warm_dataset, datasets))
+
+    # Every filter combination of datasets that declare them, built here in
+    # the master once and saved for the workers (see projects/precompute.py)
+    for dataset in datasets:
+        start = time.perf_counter()
+        built = precomputed.refresh(dataset['name'], wait=True)
+        if built:
+            warmup_state.record('precompute', dataset['name'], combinations=built,
+                                seconds=round(time.perf_counter() - start, 3))
+    warm_comparison()
+
+    # Default pages, maps and stats go through the real routes into the render cache
+    client = app.test_client()
+    for dataset in datasets:
+        warm_dashboard(client, dataset)
+
+    gc.collect()
+    gc.freeze()
+    warmup_state.finished = time.time()
+    return warmup_state.stats()
+
+
+# --- Worker memory ---
+# Resident set of this process, split into pages still shared with the
+# master / other workers and pages private to this worker (Linux only; other
+# platforms report the peak resident size)
+def memory_usage():
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line and not line.startswith(' '))
+        kb = {name: int(fields[name].split()[0]) for name in
+              ('Rss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty') if name in fields}
+        return {
+            'rss_mb': round(kb['Rss'] / 1024, 1),
+            'shared_mb': round((kb.get('Shared_Clean', 0) + kb.get('Shared_Dirty', 0)) / 1024, 1),
+            'private_mb': round((kb.get('Private_Clean', 0) + kb.get('Private_Dirty', 0)) / 1024, 1),
+        }
+    except (OSError, KeyError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {'max_rss_mb': round(peak / 1024, 1)}
+
+
+def readiness():
+    return {
+        'ready': warmup_state.ready,
+        'pid': os.getpid(),
+        'memory': memory_usage(),
+        'warmup': warmup_state.stats() if warmup_state.started else None,
+    }
@@ -0,0 +1,276 @@
+import ctypes
+import ctypes.util
+import glob
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from projects.compare import comparisons
+from projects.dataset_cache import DatasetCache, dataset_cache
+from projects.datasets import DATASETS
+from projects.precompute import precomputed
+from projects.search_index import search_index
+from projects.sources import source_fingerprint
+from projects.spatial_index import spatial_indexes
+
+log = logging.getLogger(__name__)
+
+# Seconds between checks when inotify is unavailable
+POLL_SECONDS = float(os.environ.get('WATCH_POLL_SECONDS', 2))
+# Quiet period after the last event before a refresh (a workbook being
+# saved or copied fires several events)
+DEBOUNCE_SECONDS = 0.5
+# Refreshes kept for /api/cache
+HISTORY = 20
+
+# inotify(7) events that mean a file appeared, changed or went away
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct('iIII')
+
+
+# Folder holding a dataset's source: the folder itself, the workbook's
+# folder, or the fixed part of a glob (folders below it are not watched)
+def watched_folder(path):
+    if not os.path.isdir(path):
+        path = os.path.dirname(path)
+        while glob.has_magic(path):
+            path = os.path.dirname(path)
+    return os.path.abspath(path or '.')
+
+
+# --- Row diff ---
+# Rows are matched by project key (the schema's 'key' headers, else the
+# project name; repeated keys are matched in order) and compared by a hash
+# of the columns both versions have
+def row_hashes(table, key, columns):
+    keys = table[key].astype(str).agg('\x1f'.join, axis=1)
+    keys = keys + '\x1e' + keys.groupby(keys).cumcount().astype(str)
+    hashes = pd.util.hash_pandas_object(table[columns], index=False).to_numpy()
+    return pd.Series(hashes, index=pd.Index(keys.to_numpy()))
+
+
+# -> ({'added', 'changed', 'removed'} counts, (old positions, new positions)
+# of the rows left unchanged, which the indexes are patched with)
+def diff_rows(old, new, key):
+    columns = [c for c in new.columns if c in old.columns]
+    old_rows, new_rows = row_hashes(old, key, columns), row_hashes(new, key, columns)
+    # position of each new row's key in the old version, -1 when it is new
+    matches = old_rows.index.get_indexer(new_rows.index)
+    matched = matches >= 0
+    same = np.zeros(len(new_rows), dtype=bool)
+    same[matched] = old_rows.to_numpy()[matches[matched]] == new_rows.to_numpy()[matched]
+    if list(old.columns) != list(new.columns):
+        same[:] = False  # a column was added / removed / moved: every row changed
+    diff = {
+        'added': int((~matched).sum()),
+        'changed': int((matched & ~same).sum()),
+        'removed': len(old_rows) - int(matched.sum()),
+    }
+    return diff, (matches[same], np.flatnonzero(same))
+
+
+def project_key(dataset):
+    schema = dataset['schema'] or {}
+    if schema.get('key'):
+        return list(schema['key'])
+    name = schema.get('fields', {}).get('name')
+    return [name[0] if isinstance(name, tuple) else name] if name else None
+
+
+# --- Data folder watcher ---
+# Watches each dataset's data folder (inotify on Linux, polling elsewhere)
+# and pushes changes into the worker instead of every request stat-ing the
+# workbooks: a changed dataset is loaded in this thread (multi-file sources
+# only re-read the files that changed), diffed against the version being
+# served by project key, and swapped in together with its spatial / search
+# indexes, precomputed views and dataset comparisons, so no request waits on
+# a reload. The spatial and search indexes are patched with the diff (only
+# added / changed rows are placed / tokenized); the frames' aggregates and
+# filter index, the precomputed views and the comparisons are rebuilt from
+# the new version. A save that changes no rows keeps the served version, and
+# with it every cache and ETag built on it. Each refresh logs its added /
+# changed / removed counts.
+class DataWatcher:
+    def __init__(self):
+        self.mode = None
+        self.refreshes = deque(maxlen=HISTORY)
+        self._seen = {}
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    # Starts the watcher thread (again after a fork, e.g. in each gunicorn
+    # worker); the current version of every dataset is published first
+    def start(self):
+        if self.running:
+            return self
+        datasets = [d for d in DATASETS.values() if d['frames'] is not None]
+        for dataset in datasets:
+            try:
+                fingerprint = source_fingerprint(dataset['path'])
+            except OSError:
+                continue
+            self._seen[dataset['name']] = fingerprint
+            DatasetCache.publish(dataset['path'], fingerprint)
+
+        folders = {}
+        for dataset in datasets:
+            folders.setdefault(watched_folder(dataset['path']), []).append(dataset)
+        self._stop.clear()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, args=(folders,), daemon=True, name='data-watcher')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.running:
+            self._thread.join()
+        for dataset in DATASETS.values():
+            DatasetCache.publish(dataset['path'], None)
+
+    def _run(self, folders):
+        try:
+            fd, watches = inotify_watch(folders)
+        except OSError as e:
+            log.info("data watcher polling every %ss (inotify unavailable: %s)", POLL_SECONDS, e)
+            fd = None
+        if fd is None:
+            self.mode = 'polling'
+            while not self._stop.wait(POLL_SECONDS):
+                self.refresh_all([d for group in folders.values() for d in group])
+            return
+
+        self.mode = 'inotify'
+        try:
+            pending = {}
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd], [], [], DEBOUNCE_SECONDS if pending else 1.0)
+                if ready:
+                    for wd in read_events(fd):
+                        for dataset in watches.get(wd, ()):
+                            pending[dataset['name']] = dataset
+                elif pending:
+                    self.refresh_all(list(pending.values()))
+                    pending = {}
+        finally:
+            os.close(fd)
+
+    def refresh_all(self, datasets):
+        for dataset in datasets:
+            try:
+                self.refresh(dataset)
+            except Exception as e:
+                # typically a workbook still being written; retried later
+                log.warning("refreshing %s failed: %s", dataset['name'], e)
+
+    # Loads, diffs and publishes one dataset if its source changed; returns
+    # the diff, or None when there was nothing to do
+    def refresh(self, dataset):
+        name, path = dataset['name'], dataset['path']
+        try:
+            fingerprint = source_fingerprint(path)
+        except OSError:
+            return None  # folder emptied / file mid-copy: keep serving what we have
+        with self._lock:
+            if self._seen.get(name) == fingerprint:
+                return None
+            self._seen[name] = fingerprint
+
+        current = dataset_cache.peek(path)
+        if current is None:
+            # Never loaded in this process: the next request loads it
+            DatasetCache.publish(path, fingerprint)
+            return None
+
+        start = time.perf_counter()
+        previous, served, loader = current
+        try:
+            frames = loader(path)
+        except Exception:
+            with self._lock:
+                self._seen.pop(name, None)  # retried on the next event / poll
+            raise
+        key = project_key(dataset)
+        if key and all(k in frames.table.columns and k in served.table.columns for k in key):
+            diff, kept = diff_rows(served.table, frames.table, key)
+        else:
+            diff, kept = {'added': len(frames), 'changed': 0, 'removed': len(served)}, None
+
+        if any(diff.values()):
+            dataset_cache.replace(path, fingerprint, frames)
+            DatasetCache.publish(path, fingerprint)
+            if kept is None:
+                spatial_indexes.get(dataset)
+                search_index.terms(dataset)
+            else:
+                spatial_indexes.patch(dataset, previous, kept, served.fields, frames.fields)
+                search_index.patch(dataset, previous, kept)
+            precomputed.refresh(name)
+            comparisons.refresh(name)
+        seconds = round(time.perf_counter() - start, 3)
+
+        self.refreshes.append({'dataset': name, 'at': time.time(), 'rows': len(frames), 'seconds': seconds, **diff})
+        log.info("%s refreshed in %.2fs: %d added, %d changed, %d removed%s", name, seconds,
+                 diff['added'], diff['changed'], diff['removed'], '' if any(diff.values()) else ' (kept)')
+        return diff
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'mode': self.mode,
+            'refreshes': list(self.refreshes),
+        }
+
+
+# --- inotify via libc (Linux) ---
+# -> (fd, {watch descriptor: [datasets in that folder]}); OSError when
+# inotify is not available, so the caller polls instead
+def inotify_watch(folders):
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        raise OSError("libc not found")
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, 'inotify_init1'):
+        raise OSError("no inotify in this libc")
+    fd = libc.inotify_init1(os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    watches = {}
+    for folder, datasets in folders.items():
+        wd = libc.inotify_add_watch(fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), f"cannot watch {folder}")
+        watches[wd] = datasets
+    return fd, watches
+
+
+# Watch descriptors of the events waiting on fd
+def read_events(fd):
+    data = os.read(fd, 64 * 1024)
+    offset = 0
+    while offset + EVENT.size <= len(data):
+        wd, _, _, length = EVENT.unpack_from(data, offset)
+        offset += EVENT.size + length
+        yield wd
+
+
+data_watcher = DataWatcher()
@@ -0,0 +1,27 @@
+import pytest
+
+from benchmarks.synthetic import write_tree
+
+# Rows per synthetic workbook (enough for every status / district / dam type)
+ROWS = 300
+
+
+# The three dashboards' workbooks, generated once per test session at the
+# paths the blueprints read relative to the working directory
+@pytest.fixture(scope='session')
+def data_root(tmp_path_factory):
+    root = tmp_path_factory.mktemp('irrigation')
+    write_tree(str(root), ROWS)
+    return root
+
+
+# Test client running from data_root with every cache emptied
+@pytest.fixture
+def client(data_root, monkeypatch):
+    monkeypatch.chdir(data_root)
+    from app import app, invalidate_caches
+
+    client = app.test_client()
+    invalidate_caches()
+    yield client
+    invalidate_caches()
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_irr3
+from tests.conftest import ROWS
+
+
+def test_projects_are_paged(client):
+    first = client.get('/api/irrigation1/projects?size=40').get_json()
+    second = client.get('/api/irrigation1/projects?size=40&page=2').get_json()
+    assert first['total'] == first['filtered'] > 40
+    assert len(first['projects']) == len(second['projects']) == 40
+    assert not {p['id'] for p in first['projects']} & {p['id'] for p in second['projects']}
+
+
+def test_projects_follow_filters_and_search(client):
+    data = client.get('/api/irrigation3/projects?size=500&dam_type=earthen&status=completed&q=dam 1').get_json()
+    source = make_irr3(ROWS)
+    expected = source[source['Dam_Type'].fillna('').str.lower().str.contains('earthen')
+                      & (source['Status'].str.lower() == 'completed')
+                      & source['Project Name'].str.lower().str.contains('dam 1')]
+    assert sorted(p['name'] for p in data['projects']) == sorted(expected['Project Name'])
+    assert data['filtered'] == len(expected)
+
+
+def test_dashboard_html_does_not_list_projects(client):
+    names = pd.Series([p['name'] for p in client.get('/api/irrigation1/projects?size=5').get_json()['projects']])
+    page = client.get('/irrigation1').get_data(as_text=True)
+    assert 'project-item' not in page
+    assert not any(name in page for name in names)
+
+
+def test_cache_invalidation_needs_the_admin_token(client, monkeypatch):
+    from app import app
+
+    assert client.post('/api/cache/invalidate').status_code == 403
+    monkeypatch.setitem(app.config, 'CACHE_ADMIN_TOKEN', 'secret')
+    assert client.post('/api/cache/invalidate').status_code == 403
+    assert client.post('/api/cache/invalidate', headers={'X-Cache-Token': 'wrong'}).status_code == 403
+
+    client.get('/irrigation2')
+    response = client.post('/api/cache/invalidate', headers={'X-Cache-Token': 'secret'})
+    assert response.status_code == 200
+    assert response.get_json()['invalidated'] == 1
+
+
+@pytest.mark.parametrize('url', ['/api/irrigation2/rows', '/api/irrigation2/projects',
+                                 '/api/irrigation2/export?format=csv', '/api/irrigation2/stats'])
+def test_unreadable_workbook_is_a_json_503(client, monkeypatch, url):
+    from projects.irrigation_projects2 import routes as irr2
+
+    def unreadable(path):
+        raise ValueError("workbook is being written")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(irr2, 'load_data', unreadable)
+        failed = client.get(url)
+    assert failed.status_code == 503
+    assert failed.get_json() == {'error': 'Dataset is temporarily unavailable'}
+    assert client.get(url).status_code == 200
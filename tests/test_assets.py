@@ -0,0 +1,43 @@
+import gzip
+import re
+import shutil
+
+from projects import assets as asset_module
+from projects.assets import IMMUTABLE, AssetPipeline, assets
+
+
+def test_asset_url_is_fingerprinted(client):
+    from app import app
+
+    with app.test_request_context():
+        url = app.jinja_env.globals['asset_url']('dashboard.js')
+    bundle = assets.build()['dashboard.js']
+    assert re.fullmatch(r'/assets/dashboard\.[0-9a-f]{12}\.js', url)
+    assert url == f'/assets/{bundle.filename}'
+    assert f'src="{url}"' in client.get('/irrigation1').get_data(as_text=True)
+
+
+def test_asset_is_immutable_for_a_year(client):
+    bundle = assets.build()['dashboard.css']
+    response = client.get(f'/assets/{bundle.filename}', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE == 'public, max-age=31536000, immutable'
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == bundle.bodies['identity']
+
+    etag = response.headers['ETag']
+    assert client.get(f'/assets/{bundle.filename}', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/assets/dashboard.000000000000.css').status_code == 404
+
+
+def test_changed_source_gets_a_new_hash(tmp_path, monkeypatch):
+    shutil.copytree(asset_module.ASSETS_DIR, tmp_path, dirs_exist_ok=True)
+    monkeypatch.setattr(asset_module, 'ASSETS_DIR', str(tmp_path))
+    before = AssetPipeline().build()
+    assert before['dashboard.js'].filename == assets.build()['dashboard.js'].filename
+
+    with open(tmp_path / 'dashboard.js', 'a', encoding='utf-8') as f:
+        f.write('\nwindow.assetsChanged = true;\n')
+    after = AssetPipeline().build()
+    assert after['dashboard.js'].filename != before['dashboard.js'].filename
+    assert after['dashboard.css'].filename == before['dashboard.css'].filename
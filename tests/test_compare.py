@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from projects.compare import MAX_BLOCK, MIN_CONFIDENCE, Comparison, assign, match_names, name_key
+from projects.datasets import DATASETS
+
+
+@pytest.fixture(scope='module')
+def names():
+    rng = np.random.default_rng(3)
+    words = ['Krishna', 'Cauvery', 'Tunga', 'Bhadra', 'Upper', 'Lower', 'Lift', 'Irrigation', 'Tank',
+             'Barrage', 'Stage', 'Project', 'Scheme', 'Hemavathi', 'Kabini', 'Varahi']
+    make = lambda n: [' '.join(rng.choice(words, rng.integers(1, 4))) + (' Canal' if rng.random() < 0.6 else '')
+                      for _ in range(n)]
+    # 'canal' is on more than MAX_BLOCK names, so it never blocks on its own
+    return make(150), make(120)
+
+
+# Every pair sharing a token that blocks, scored like match_names
+def brute_pairs(before, after):
+    before_keys, after_keys = [name_key(n) for n in before], [name_key(n) for n in after]
+    counts = {}
+    for key in before_keys + after_keys:
+        for token in key:
+            counts[token] = counts.get(token, 0) + 1
+    total = len(before_keys) + len(after_keys)
+    idf = {token: math.log(1 + total / count) for token, count in counts.items()}
+    blocking = {token for token in counts if sum(token in key for key in after_keys) <= MAX_BLOCK}
+    pairs = {}
+    for i, a in enumerate(before_keys):
+        for j, b in enumerate(after_keys):
+            if a & b & blocking:
+                pairs[(i, j)] = sum(idf[t] for t in a & b) / sum(idf[t] for t in a | b)
+    return pairs
+
+
+def test_blocked_pairs_match_all_pairs(names):
+    before, after = names
+    assert sum('canal' in name_key(n) for n in after) > MAX_BLOCK
+    found = {(i, j): score for score, i, j in match_names(before, after)}
+    assert found == pytest.approx(brute_pairs(before, after))
+
+
+def test_assign_takes_the_best_free_pair_first(names):
+    pairs = match_names(*names)
+    matches = assign(pairs, MIN_CONFIDENCE)
+
+    remaining = {(i, j): score for score, i, j in pairs if score >= MIN_CONFIDENCE}
+    expected = []
+    while remaining:
+        (i, j), score = min(remaining.items(), key=lambda item: (-item[1], item[0]))
+        expected.append((i, j, score))
+        remaining = {(a, b): s for (a, b), s in remaining.items() if a != i and b != j}
+    assert matches == expected
+
+
+def test_comparison_table_matches_a_join(client):
+    before, after = DATASETS['irrigation2'], DATASETS['irrigation1']
+    comparison = Comparison(before, after)
+    table = comparison.table
+    old, new = before['frames']().fields, after['frames']().fields
+
+    assert len(table) and table['before_id'].is_unique and table['after_id'].is_unique
+    assert (table['confidence'] >= MIN_CONFIDENCE).all()
+    joined = (table[['before_id', 'after_id']]
+              .merge(old, left_on='before_id', right_index=True)
+              .merge(new, left_on='after_id', right_index=True, suffixes=('_before', '_after')))
+    assert len(joined) == len(table)
+    joined = joined.set_index('before_id').loc[table['before_id']]
+    np.testing.assert_array_equal(table['before_name'], joined['name_before'])
+    np.testing.assert_array_equal(table['after_name'], joined['name_after'])
+    np.testing.assert_allclose(table['amount_change'], joined['amount_after'] - joined['amount_before'])
+    np.testing.assert_allclose(table['hectares_change'], joined['hectares_after'] - joined['hectares_before'])
+    changed = (joined['status_before'].astype(str).str.strip().str.lower()
+               != joined['status_after'].astype(str).str.strip().str.lower())
+    np.testing.assert_array_equal(table['status_changed'], changed)
+
+    summary = comparison.summary
+    assert summary['matched'] == len(table)
+    assert summary['status_changed'] == int(changed.sum())
+    assert sum(t['count'] for t in summary['transitions']) == summary['status_changed']
+    assert summary['amount_change'] == pytest.approx(float(np.nansum(table['amount_change'])))
+    pd.testing.assert_frame_equal(comparison.select('status'), table[table['status_changed']])
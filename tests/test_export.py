@@ -0,0 +1,60 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_irr3
+from projects import export
+
+from tests.conftest import ROWS
+
+FILTERS = 'dam_type=earthen&status=completed'
+
+
+def expected_names():
+    source = make_irr3(ROWS)
+    selected = source[source['Dam_Type'].fillna('').str.lower().str.contains('earthen')
+                      & (source['Status'].str.lower() == 'completed')]
+    return sorted(selected['Project Name'])
+
+
+def read_export(fmt, body):
+    if fmt == 'csv':
+        return pd.read_csv(io.BytesIO(body))
+    if fmt == 'ndjson':
+        return pd.DataFrame([json.loads(line) for line in body.decode().splitlines()])
+    return pd.read_excel(io.BytesIO(body))
+
+
+@pytest.mark.parametrize('fmt, mimetype', [
+    ('csv', 'text/csv'),
+    ('ndjson', 'application/x-ndjson'),
+    ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+])
+def test_export_is_the_filtered_table(client, fmt, mimetype):
+    response = client.get(f'/api/irrigation3/export?format={fmt}&{FILTERS}')
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+    assert response.headers['Content-Disposition'] == f'attachment; filename="irrigation3.{fmt}"'
+
+    df = read_export(fmt, response.get_data())
+    names = expected_names()
+    assert sorted(df['Project Name']) == names
+    assert response.headers['X-Total-Rows'] == str(len(names))
+
+
+def test_export_is_streamed_in_chunks(client, monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_ROWS', 50)
+    response = client.get('/api/irrigation1/export?format=ndjson')
+    assert response.is_streamed
+    rows = int(response.headers['X-Total-Rows'])
+    pieces = list(response.response)
+    assert rows > 200 and len(pieces) == -(-rows // 50)
+    assert sum(piece.count(b'\n') for piece in pieces) == rows
+
+
+def test_unknown_export_format_is_rejected(client):
+    response = client.get('/api/irrigation1/export?format=pdf')
+    assert response.status_code == 400
+    assert response.get_json()['formats'] == ['csv', 'ndjson', 'xlsx']
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from projects.filters import FilterError, FilterIndex, parse_filters
+
+NAMES = ['status', 'district', 'type', 'amount', 'hectares', 'dam_length']
+
+
+@pytest.fixture(scope='module')
+def fields():
+    rng = np.random.default_rng(7)
+    n = 500
+    amount = rng.uniform(0, 100, n).round(1)
+    amount[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        'status': rng.choice(['Completed', 'Ongoing', ' ongoing ', 'Under construction', None], n),
+        'district': rng.choice(['Mysuru', 'Belagavi', 'Hassan', 'Mandya'], n),
+        'type': rng.choice(['Earthen', 'Concrete Gravity', 'Masonry Gravity', 'Composite'], n),
+        'amount': amount,
+        'hectares': rng.integers(0, 5000, n).astype(float),
+        'dam_length': rng.choice([0.0, 450.0, 850.0, 1500.0, 3000.0], n),
+    })
+
+
+def text(column):
+    return column.astype(str).str.strip().str.lower()
+
+
+# The same clauses evaluated directly on the columns
+def brute_clause(fields, field, op, values):
+    column = fields[field]
+    if op == 'contains':
+        return text(column).apply(lambda v: any(n.lower() in v for n in values)).to_numpy()
+    if pd.api.types.is_numeric_dtype(column):
+        numbers = [float(v) for v in values]
+        if op == 'eq':
+            return column.isin(numbers).to_numpy()
+        if op == 'min':
+            return (column >= min(numbers)).to_numpy()
+        return (column <= max(numbers)).to_numpy()
+    return text(column).isin([v.strip().lower() for v in values]).to_numpy()
+
+
+def brute_mask(fields, query):
+    mask = np.ones(len(fields), dtype=bool)
+    for group in query.groups:
+        mask &= np.logical_or.reduce([brute_clause(fields, *clause) for clause in group])
+    return mask
+
+
+@pytest.mark.parametrize('args', [
+    {},
+    {'status': 'ongoing'},
+    {'status': 'Completed, under construction'},
+    {'status': 'none'},
+    {'type__contains': 'gravity'},
+    {'type__contains': 'GRAV,earth', 'district': 'mysuru'},
+    {'amount__min': '40'},
+    {'amount__min': '20', 'amount__max': '22.5'},
+    {'amount__max': '99.9'},
+    {'hectares__min': '4990'},
+    {'dam_length': '850,1500'},
+    {'or': 'status:completed|type__contains:earth', 'dam_length__max': '850'},
+    {'or': 'district:hassan|amount__min:95', 'status': 'ongoing'},
+    {'page': '2', 'sort': 'name'},
+])
+def test_mask_matches_column_scans(fields, args):
+    index = FilterIndex(fields, NAMES)
+    query = parse_filters(args, index)
+    np.testing.assert_array_equal(index.mask(query), brute_mask(fields, query))
+
+
+@pytest.mark.parametrize('args', [
+    {'amount': 'lots'},
+    {'status__min': '3'},
+    {'amount__contains': '5'},
+    {'or': 'nothing:1'},
+])
+def test_bad_filters_are_rejected(fields, args):
+    index = FilterIndex(fields, NAMES)
+    with pytest.raises(FilterError):
+        index.mask(parse_filters(args, index))
+
+
+def test_dataset_selection_matches_the_mask(client):
+    from projects.datasets import DATASETS
+
+    frames = DATASETS['irrigation3']['frames']()
+    query = parse_filters({'status': 'ongoing', 'amount__min': '20'}, frames.filter_index)
+    selected = frames.select(query)
+    expected = frames.fields[brute_mask(frames.fields, query)]
+    pd.testing.assert_frame_equal(selected.fields, expected)
+    assert selected.aggregates.totals()['count'] == len(expected)
+
+
+@pytest.mark.parametrize('args', [
+    {},
+    {'status': 'ongoing,completed'},
+    {'status': 'ongoing', 'region': 'south karnataka'},
+    {'or': 'type:lift irrigation|district:mandya'},
+])
+def test_aggregates_match_a_groupby(client, args):
+    from projects.datasets import DATASETS
+
+    frames = DATASETS['irrigation1']['frames']()
+    query = parse_filters(args, frames.filter_index)
+    store = frames.aggregates.select(query)
+    fields = frames.fields[brute_mask(frames.fields, query)]
+    assert len(fields) and store.count() == len(fields)
+
+    totals = store.totals()
+    assert totals['count'] == len(fields)
+    for measure in ('amount', 'hectares'):
+        assert totals[measure] == pytest.approx(fields[measure].sum())
+    assert store.counts('status') == fields['status'].value_counts().to_dict()
+
+    expected = fields.groupby(['region', 'type'])[['amount', 'hectares']].sum()
+    expected.insert(0, 'count', fields.groupby(['region', 'type']).size())
+    grouped = pd.DataFrame(store.group(['region', 'type'])).set_index(['region', 'type'])
+    pd.testing.assert_frame_equal(grouped.sort_index(), expected, check_dtype=False)
@@ -0,0 +1,59 @@
+import json
+import re
+from html import escape
+
+import pytest
+
+from projects import app_original
+from projects.datasets import DATASETS
+from projects.geo import COORD_DECIMALS, in_bbox, parse_bbox
+from projects.irrigation_projects2 import routes as irr2
+from projects.irrigation_projects3 import routes as irr3
+
+BBOX = '75,12.5,77,15'
+
+
+# The data block a bulk map document draws its markers from
+def bulk_data(html):
+    match = re.search(r'var data = (\{.*?\});\n', html)
+    assert match, 'no bulk points in the map'
+    return json.loads(match.group(1))
+
+
+@pytest.mark.parametrize('module, dataset, query', [
+    (app_original, 'irrigation1', {'status': 'completed'}),
+    (irr2, 'irrigation2', {'status': 'ongoing', 'amount__min': '100'}),
+    (irr3, 'irrigation3', {'dam_type': 'earthen'}),
+])
+def test_bulk_map_carries_the_filtered_points(client, monkeypatch, module, dataset, query):
+    monkeypatch.setattr(module, 'MAP_MODE', 'bulk')
+    response = client.get(f'/{dataset}/map', query_string=query)
+    assert response.status_code == 200
+    data = bulk_data(response.get_data(as_text=True))
+
+    points = DATASETS[dataset]['points'](query)
+    assert 0 < len(points) < len(DATASETS[dataset]['points']({}))
+    assert data['id'] == points['id'].tolist()
+    assert data['lat'] == points['lat'].round(COORD_DECIMALS).tolist()
+    assert data['lon'] == points['lon'].round(COORD_DECIMALS).tolist()
+    assert [data['colors'][code] for code in data['status']] == points['color'].tolist()
+    if 'names' in data:
+        assert data['names'] == [escape(str(name)) for name in points['name']]
+        assert [data['labels'][code] for code in data['status']] == [escape(str(s)) for s in points['status']]
+
+
+@pytest.mark.parametrize('dataset, query', [
+    ('irrigation1', {}),
+    ('irrigation2', {'status': 'completed,ongoing'}),
+    ('irrigation3', {'dam_type': 'earthen'}),
+])
+def test_geojson_keeps_the_points_inside_bbox(client, dataset, query):
+    collection = client.get(f'/api/{dataset}/geojson', query_string=dict(query, bbox=BBOX)).get_json()
+    expected = in_bbox(DATASETS[dataset]['points'](query), parse_bbox(BBOX))
+    assert 0 < len(expected) < len(DATASETS[dataset]['points'](query))
+    assert sorted(feature['id'] for feature in collection['features']) == sorted(expected['id'])
+
+    west, south, east, north = parse_bbox(BBOX)
+    for feature in collection['features']:
+        lon, lat = feature['geometry']['coordinates']
+        assert west <= lon <= east and south <= lat <= north
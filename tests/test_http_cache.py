@@ -0,0 +1,41 @@
+import pytest
+
+from projects import app_original
+from projects.irrigation_projects2 import routes as irr2
+from projects.irrigation_projects3 import routes as irr3
+
+
+def unreadable(path):
+    raise ValueError("workbook is being written")
+
+
+@pytest.mark.parametrize('module, url', [
+    (app_original, '/irrigation1'),
+    (irr2, '/irrigation2'),
+    (irr3, '/irrigation3'),
+])
+def test_failed_load_is_not_cached(client, monkeypatch, module, url):
+    with monkeypatch.context() as patch:
+        patch.setattr(module, 'load_data', unreadable)
+        failed = client.get(url)
+    assert failed.status_code == 503
+    assert failed.headers.get('ETag') is None
+
+    page = client.get(url)
+    assert page.status_code == 200
+    assert page.headers.get('ETag')
+    assert page.get_data() != failed.get_data()
+
+
+def test_page_is_revalidated(client):
+    etag = client.get('/irrigation2').headers['ETag']
+    assert client.get('/irrigation2', headers={'If-None-Match': etag}).status_code == 304
+
+
+@pytest.mark.parametrize('url', ['/irrigation1', '/irrigation2', '/irrigation3'])
+def test_malformed_filter_is_a_bad_request(client, url):
+    page = client.get(url + '?amount__min=abc<b>')
+    assert page.status_code == 400
+    assert page.headers.get('ETag') is None
+    assert b"needs numbers, got abc&lt;b&gt;" in page.get_data()
+    assert client.get('/api/irrigation1/rows?amount__min=abc').status_code == 400
@@ -0,0 +1,29 @@
+import re
+
+ROWS_ROUTE = '/api/<dataset>/rows'
+
+
+# Value of one series in the /metrics exposition, 0 when it is not there yet
+def sample(client, series):
+    text = client.get('/metrics').get_data(as_text=True)
+    match = re.search(rf'^{re.escape(series)} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else 0
+
+
+def test_stages_are_sent_as_server_timing(client):
+    response = client.get('/api/irrigation2/rows?status=completed')
+    assert response.status_code == 200
+    timings = response.headers['Server-Timing'].split(', ')
+    assert [timing.split(';')[0] for timing in timings] == ['filter', 'search', 'total']
+    assert all(re.fullmatch(r'\w+;dur=\d+\.\d', timing) for timing in timings)
+
+
+def test_route_counters_grow_per_request(client):
+    requests = f'irrigation_stage_seconds_count{{route="{ROWS_ROUTE}",stage="total"}}'
+    filtered = f'irrigation_stage_seconds_count{{route="{ROWS_ROUTE}",stage="filter"}}'
+    rows = f'irrigation_rows_count{{route="{ROWS_ROUTE}"}}'
+    before = [sample(client, series) for series in (requests, filtered, rows)]
+    for page in (1, 2, 3):
+        client.get(f'/api/irrigation1/rows?page={page}')
+    after = [sample(client, series) for series in (requests, filtered, rows)]
+    assert [b - a for a, b in zip(before, after)] == [3, 3, 3]
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from projects.frame_utils import map_unique
+from projects.normalize import (DEFAULT_COLOR, StatusScheme, digits_number, digits_series, numbers_sum_series,
+                                sum_of_numbers)
+
+COLORS = {'completed': '#16a34a', 'ongoing': '#f59e0b'}
+RULES = [(r'complet', 'completed'), (r'progress|ongoing|under', 'ongoing')]
+
+
+def test_first_matching_rule_wins():
+    scheme = StatusScheme(COLORS, RULES)
+    assert scheme.canonical('  Completed ') == 'completed'
+    assert scheme.canonical('Under construction') == 'ongoing'
+    assert scheme.canonical('Completed, work in progress') == 'completed'
+    assert StatusScheme(COLORS, RULES[::-1]).canonical('Completed, work in progress') == 'ongoing'
+    # unmatched values are only cleaned up; None is 'unknown'
+    assert scheme.canonical(' Tender STAGE ') == 'tender stage'
+    assert scheme.canonical(None) == 'unknown'
+
+
+def test_color_follows_the_canonical_status():
+    scheme = StatusScheme(COLORS, RULES, default_color='#000000')
+    assert scheme.color('In Progress') == COLORS['ongoing']
+    assert scheme.color('COMPLETED') == COLORS['completed']
+    assert scheme.color('dropped') == '#000000'
+    assert scheme.color('') == '#000000'
+    assert scheme.color(None) == '#000000'
+    assert StatusScheme(COLORS).color('dropped') == DEFAULT_COLOR
+
+
+def test_lookups_are_memoized():
+    scheme = StatusScheme(COLORS, RULES)
+    scheme.canonical_series(pd.Series(['Ongoing', 'Completed'] * 50))
+    scheme.canonical('Ongoing')
+    info = scheme.canonical.cache_info()
+    assert info.misses == 3  # 'ongoing', 'completed' and the missing-value 'nan'
+    assert info.hits == 1
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('300-400 ha', 700.0),
+    ('1,234.5', 1234.5),
+    ('12,00,000 Ha', 1200000.0),
+    ('2.5 to 3.5 TMC', 6.0),
+    ('Rs. 1,250 Cr + 75.5 Cr', 1325.5),
+    ('nil', 0.0),
+    ('', 0.0),
+])
+def test_sum_of_numbers(text, expected):
+    assert sum_of_numbers(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('1,450 m', 1450.0),
+    ('850', 850.0),
+    ('12.5 km', 12.5),
+    ('1.2.3', 0.0),
+    ('-', 0.0),
+    ('nan', 0.0),
+])
+def test_digits_number(text, expected):
+    assert digits_number(text) == expected
+
+
+def test_missing_values_map_like_the_text_nan():
+    series = pd.Series(['300-400', np.nan, '1,450', None, '300-400'], index=[10, 11, 12, 13, 14])
+    sums = numbers_sum_series(series)
+    assert sums.tolist() == [700.0, 0.0, 1450.0, 0.0, 700.0]
+    assert sums.index.tolist() == [10, 11, 12, 13, 14]
+    assert digits_series(series).tolist() == [300400.0, 0.0, 1450.0, 0.0, 300400.0]
+
+    seen = []
+    mapped = map_unique(series, lambda value: seen.append(value) or value.upper())
+    assert mapped.tolist() == ['300-400', 'NAN', '1,450', 'NAN', '300-400']
+    assert sorted(seen) == ['1,450', '300-400', 'nan']  # each distinct value once
+
+    scheme = StatusScheme(COLORS, RULES)
+    assert scheme.canonical_series(pd.Series(['Ongoing', np.nan])).tolist() == ['ongoing', 'nan']
+    assert scheme.color_series(pd.Series(['Ongoing', np.nan])).tolist() == [COLORS['ongoing'], DEFAULT_COLOR]
@@ -0,0 +1,37 @@
+from projects.dataset_cache import dataset_cache
+from projects.precompute import START_METHOD, Precomputer, claim, precomputed
+from projects.irrigation_projects3 import routes as irr3
+
+
+def test_version_is_built_once_for_every_worker(client, tmp_path):
+    master = Precomputer(processes=2, folder=str(tmp_path))
+    assert master.refresh('irrigation3', wait=True) > 0
+    assert len(list(tmp_path.glob('irrigation3.*.pickle'))) == 1
+
+    # a forked worker sees the same version and reads the file instead of building
+    worker = Precomputer(processes=2, folder=str(tmp_path))
+    assert worker.refresh('irrigation3', wait=True) == 0
+    assert worker.get('irrigation3', {'dam_type': 'all'}) == master.get('irrigation3', {})
+    assert worker.stats()['builds'] == 0
+    assert worker.stats()['loads'] == 1
+
+
+def test_build_in_progress_elsewhere_is_not_repeated(client, tmp_path):
+    worker = Precomputer(processes=2, folder=str(tmp_path))
+    dataset_cache.get(irr3.DATA_PATH, irr3.load_data)
+    version = dataset_cache.version(irr3.DATA_PATH)
+    building = claim(worker.path('irrigation3', version) + '.lock')
+    try:
+        assert worker.refresh('irrigation3', wait=True) == 0
+        assert worker.get('irrigation3', {}) is None
+    finally:
+        building.close()
+    assert not list(tmp_path.glob('*.pickle'))
+
+
+def test_requests_never_start_a_build(client):
+    builds = precomputed.stats()['builds']
+    assert client.get('/irrigation3?dam_type=earthen').status_code == 200
+    assert precomputed.stats()['pending'] == []
+    assert precomputed.stats()['builds'] == builds
+    assert START_METHOD != 'fork'
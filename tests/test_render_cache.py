@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_tree, write_workbook
+from projects.http_cache import page_cache
+from projects.irrigation_projects2 import routes as irr2
+from projects.render_cache import RenderCache, map_cache
+
+from tests.conftest import ROWS
+
+
+# Workbooks of their own (one gets rewritten), with maps rendered into the
+# document so they are cached per data version
+@pytest.fixture
+def markers(tmp_path, monkeypatch):
+    paths = write_tree(str(tmp_path), ROWS)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(irr2, 'MAP_MODE', 'bulk')
+    from app import app, invalidate_caches
+
+    invalidate_caches()
+    yield paths, app.test_client()
+    invalidate_caches()
+
+
+# Renders the map view again: the page cache in front of it would otherwise
+# answer repeated requests itself
+def get_map(client, query=''):
+    page_cache.clear()
+    response = client.get('/irrigation2/map' + query)
+    assert response.status_code == 200
+    return response.get_data()
+
+
+# Map cache counters from /api/cache, relative to those in before
+def map_stats(client, before=None):
+    stats = client.get('/api/cache').get_json()['maps']
+    before = before or {}
+    return {name: stats[name] - before.get(name, 0) for name in ('hits', 'misses', 'evictions')}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RenderCache(max_entries=2, max_bytes=10)
+    cache.put('a', 'aaa')
+    cache.put('b', 'bbb')
+    assert cache.get('a') == 'aaa'
+    cache.put('c', 'ccc')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'aaa' and cache.get('c') == 'ccc'
+
+    cache.put('d', 'dddddddd')  # over max_bytes: a and c go, oldest first
+    assert cache.get('a') is None and cache.get('c') is None
+    assert cache.put('e', 'e' * 11) == 'e' * 11  # larger than the whole cache: not kept
+    assert cache.stats() == {'entries': 1, 'bytes': 8, 'max_entries': 2, 'max_bytes': 10,
+                             'hits': 3, 'misses': 3, 'evictions': 3}
+
+
+def test_map_is_rendered_once_per_data_version(markers):
+    paths, client = markers
+    before = map_stats(client)
+    first = get_map(client)
+    assert get_map(client) == first
+    assert map_stats(client, before) == {'hits': 1, 'misses': 1, 'evictions': 0}
+
+    df = pd.read_excel(paths['irrigation2'])
+    write_workbook(df.iloc[:100], paths['irrigation2'])
+    assert get_map(client) != first
+    assert map_stats(client, before) == {'hits': 1, 'misses': 2, 'evictions': 0}
+    assert client.get('/api/cache').get_json()['maps']['entries'] == 2
+
+
+def test_maps_for_other_filters_evict_the_oldest(markers, monkeypatch):
+    _, client = markers
+    monkeypatch.setattr(map_cache, 'max_entries', 2)
+    before = map_stats(client)
+    for query in ['', '?status=completed', '?status=ongoing']:
+        get_map(client, query)
+    get_map(client, '?status=ongoing')
+    get_map(client)
+    assert map_stats(client, before) == {'hits': 1, 'misses': 4, 'evictions': 2}
@@ -0,0 +1,70 @@
+import json
+import os
+
+from pypdf import PdfWriter
+
+from projects.reports import MANIFEST, ReportIndex, extract_reports, report_index
+
+
+def write_text(text_dir, reports, texts):
+    os.makedirs(text_dir, exist_ok=True)
+    for report, pages in zip(reports, texts):
+        if pages is not None:
+            with open(os.path.join(text_dir, report['sha256'] + '.json'), 'w') as f:
+                json.dump({'pages': pages}, f)
+    with open(os.path.join(text_dir, MANIFEST), 'w') as f:
+        json.dump({'reports': reports}, f)
+
+
+REPORTS = [
+    {'file': 'a.pdf', 'title': 'Report A', 'sha256': 'a' * 64},
+    {'file': 'missing.pdf', 'title': 'Missing', 'sha256': 'b' * 64},
+]
+
+
+def test_zero_page_pdf_gets_a_text_file(tmp_path):
+    reports_dir, text_dir = tmp_path / 'reports', tmp_path / 'text'
+    reports_dir.mkdir()
+    with open(reports_dir / 'empty.pdf', 'wb') as f:
+        PdfWriter().write(f)
+
+    results, _ = extract_reports(str(reports_dir), str(text_dir), processes=1)
+    assert [r['status'] for r in results] == ['extracted']
+    pages = ReportIndex(str(text_dir)).pages()
+    assert pages.size == 0 and [r['file'] for r in pages.reports] == ['empty.pdf']
+
+
+def test_missing_text_file_is_skipped(tmp_path):
+    write_text(str(tmp_path), REPORTS, [['Hemavathi canal lining works'], None])
+    index = ReportIndex(str(tmp_path))
+    assert [r['file'] for r in index.pages().reports] == ['a.pdf']
+    assert [hit['file'] for hit in index.search('hemavathi canal', 5)] == ['a.pdf']
+
+
+def test_unreadable_manifest_means_no_reports(tmp_path):
+    (tmp_path / MANIFEST).write_text('{not json')
+    index = ReportIndex(str(tmp_path))
+    assert index.pages() is None
+    assert index.search('canal', 5) == []
+
+
+def test_popup_and_search_survive_a_missing_report(client, tmp_path, monkeypatch):
+    write_text(str(tmp_path), REPORTS, [['Synthetic Dam 7 spillway repairs'], None])
+    monkeypatch.setattr(report_index, 'text_dir', str(tmp_path))
+    report_index.clear()
+
+    assert client.get('/api/reports/search?q=spillway').status_code == 200
+    assert client.get('/api/irrigation3/reports/7').status_code == 200
+    popup = client.get('/api/irrigation3/popup/7')
+    assert popup.status_code == 200
+    assert 'Report A, p. 1' in popup.get_data(as_text=True)
+
+
+def test_popup_without_report_links_on_index_errors(client, monkeypatch):
+    def broken(dataset, row_id):
+        raise RuntimeError("report index unavailable")
+
+    monkeypatch.setattr(report_index, 'links', broken)
+    popup = client.get('/api/irrigation1/popup/3')
+    assert popup.status_code == 200
+    assert 'annual reports' not in popup.get_data(as_text=True)
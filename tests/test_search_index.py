@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from projects.search_index import (EXACT, MIN_TYPO_LENGTH, PREFIX, SEARCH_FIELDS, TYPO, DatasetTerms, tokenize,
+                                   within_one_edit)
+
+
+@pytest.fixture(scope='module')
+def fields():
+    rng = np.random.default_rng(5)
+    n = 400
+    words = ['Krishna', 'Cauvery', 'Tunga', 'Bhadra', 'Hemavathi', 'Upper', 'Lower', 'Lift', 'Irrigation',
+             'Canal', 'Tank', 'Barrage', 'Dam', 'Stage', '2', '12', '2021']
+    names = [' '.join(rng.choice(words, rng.integers(2, 5))) for _ in range(n)]
+    return pd.DataFrame({
+        'name': names,
+        'district': rng.choice(['Mysuru', 'Mandya', 'Hassan', 'Belagavi', 'Vijayapura'], n),
+        'status': rng.choice(['Ongoing', 'Completed'], n),
+        'type': rng.choice(['Earthen', 'Masonry', 'Composite', 'Canal lining'], n),
+    }, index=np.arange(n) * 2 + 1)
+
+
+# How a query term matches an indexed term, as expand() should find it
+def quality(token, term):
+    if term == token:
+        return EXACT
+    if term.startswith(token):
+        return PREFIX
+    if len(token) >= MIN_TYPO_LENGTH and token.isalpha() and within_one_edit(token, term):
+        # indexed terms are typo-matched when long and alphabetic, or one
+        # letter short of the query
+        if (len(term) >= MIN_TYPO_LENGTH and term.isalpha()) or len(term) == len(token) - 1:
+            return TYPO
+    return 0.0
+
+
+# Every row scored by scanning every word of every searched field
+def brute_search(fields, tokens):
+    scores = {}
+    for position, row in enumerate(fields.itertuples(index=False)):
+        row = row._asdict()
+        total = 0.0
+        for token in tokens:
+            best = max((weight * quality(token, term)
+                        for field, weight in SEARCH_FIELDS.items() if field in row
+                        for term in tokenize(row[field])), default=0.0)
+            if not best:
+                break
+            total += best
+        else:
+            scores[position] = total
+    return scores
+
+
+@pytest.mark.parametrize('q', ['krishna', 'KRISHNA lift', 'kris', 'hemavathy', 'caverry', 'irigation canal',
+                               'mysuru dam', 'canal', '20', '2021 stage', 'upper lowr', 'nothing'])
+def test_search_matches_a_scan(fields, q):
+    terms = DatasetTerms(fields)
+    rows, scores = terms.search(tokenize(q))
+    expected = brute_search(fields, tokenize(q))
+    assert dict(zip(rows.tolist(), scores.tolist())) == pytest.approx(expected)
+
+
+def test_hits_carry_the_row_ids(fields):
+    terms = DatasetTerms(fields)
+    rows, scores = terms.search(tokenize('bhadra'))
+    hit = terms.hit({'name': 'irrigation3', 'title': 'Ongoing Projects'}, rows[0], scores[0])
+    assert hit['id'] == fields.index[rows[0]]
+    assert hit['name'] == fields['name'].iloc[rows[0]]
+
+
+def test_patched_terms_match_a_full_build(fields):
+    old = fields.iloc[:350]
+    new = pd.concat([old.iloc[40:].sample(frac=1, random_state=2), fields.iloc[350:]])
+    new.iloc[:5, new.columns.get_loc('district')] = 'Chikkamagaluru'
+    matches = pd.Index(old.index).get_indexer(new.index)
+    kept = matches >= 0
+    kept[:5] = False
+
+    patched = DatasetTerms(new, DatasetTerms(old), (matches[kept], np.flatnonzero(kept)))
+    full = DatasetTerms(new)
+    assert patched.terms == full.terms
+    for q in ['krishna', 'chikkamagaluru', 'hassan', 'irigation', 'stage 2']:
+        rows, scores = patched.search(tokenize(q))
+        expected_rows, expected_scores = full.search(tokenize(q))
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_allclose(scores, expected_scores)
@@ -0,0 +1,72 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+
+from projects import snapshots
+from projects.snapshots import build_snapshot, load_frame, read_source, snapshot_is_fresh, snapshot_path
+
+
+def normalize(df):
+    df['total'] = df['a'] + df['b']
+    return df
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'projects.csv'
+    pd.DataFrame({'a': [1, 2, 3], 'b': [4, 5, 6]}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_snapshot_is_fresh_after_build(source):
+    build_snapshot(source, normalize)
+    assert snapshot_is_fresh(source, normalize)
+    assert load_frame(source, normalize)['total'].tolist() == [5, 7, 9]
+
+
+def test_snapshot_from_other_code_is_stale(source, monkeypatch):
+    build_snapshot(source, normalize)
+    monkeypatch.setattr(snapshots, 'code_digest', lambda: 'changed normalize code')
+    assert not snapshot_is_fresh(source, normalize)
+
+
+def test_snapshot_without_version_is_stale(source):
+    build_snapshot(source, normalize)
+    # written the way snapshots were before they carried a version
+    feather.write_feather(pa.Table.from_pandas(pd.DataFrame({'total': [0, 0, 0]})), snapshot_path(source))
+    assert not snapshot_is_fresh(source, normalize)
+    assert load_frame(source, normalize)['total'].tolist() == [5, 7, 9]
+
+
+# The schema names headers as normalize_frame leaves them; the file has them
+# padded, capitalised and misspelt
+def test_text_headers_match_the_sheet_as_written(tmp_path):
+    from projects.adapters import read_options
+    from projects.app_original import SCHEMA
+
+    path = str(tmp_path / 'irrigation1.csv')
+    pd.DataFrame({' Project_Name ': ['007', '010'], 'Current_Status': ['1', '2'],
+                  'Latitude': [12.5, 13.0], 'Logitude': [76.1, 77.2]}).to_csv(path, index=False)
+    df = read_source(path, read_options(SCHEMA))
+    assert df[' Project_Name '].tolist() == ['007', '010']
+    assert df['Current_Status'].tolist() == ['1', '2']
+    assert df['Latitude'].tolist() == [12.5, 13.0]
+
+    options = read_options(dict(SCHEMA, usecols=['project_name', 'longitude']))
+    assert list(read_source(path, options).columns) == [' Project_Name ', 'Logitude']
+
+
+# Columns may share the mapped file's memory: the frame equals one parsed
+# from the source and takes new columns, but cells are only written on a copy
+def test_snapshot_frame_is_read_only_in_place(source):
+    build_snapshot(source, normalize)
+    df = load_frame(source, normalize)
+    pd.testing.assert_frame_equal(df, normalize(pd.read_csv(source)))
+    df['a'] = df['a'] + 1
+    assert df['a'].tolist() == [2, 3, 4]
+    with pytest.raises(ValueError):
+        df.loc[0, 'total'] = 0
+    copy = df.copy()
+    copy.loc[0, 'total'] = 0
+    assert copy['total'].tolist() == [0, 7, 9]
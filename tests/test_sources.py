@@ -0,0 +1,79 @@
+import os
+from functools import partial
+
+import pytest
+
+from benchmarks.synthetic import make_irr3, write_workbook
+from projects.adapters import normalize_frame, read_options, schema_headers
+from projects.dataset_cache import DatasetCache, DatasetUnavailable
+from projects.irrigation_projects3.routes import SCHEMA
+from projects import sources as source_module
+from projects.sources import SourceFrames, source_fingerprint
+
+normalize = partial(normalize_frame, schema=SCHEMA)
+KEY = ['Project Name']
+
+
+def load(sources, folder, key=KEY):
+    return sources.load(str(folder), normalize, read_options(SCHEMA), schema_headers(SCHEMA), key)
+
+
+# Per-district style split: two workbooks overlapping on 20 projects, the
+# second with a newer status for them
+@pytest.fixture
+def folder(tmp_path):
+    rows = make_irr3(120)
+    first, second = rows.iloc[:100], rows.iloc[80:].copy()
+    second.iloc[:20, second.columns.get_loc('Status')] = 'Completed (revised)'
+    write_workbook(first, str(tmp_path / 'a_north.xlsx'))
+    write_workbook(second, str(tmp_path / 'b_south.xlsx'))
+    (tmp_path / '~$a_north.xlsx').write_bytes(b'lock file')
+    return tmp_path
+
+
+def test_duplicates_across_files_keep_the_later_file(folder):
+    sources = SourceFrames(processes=2)
+    df = load(sources, folder)
+    assert len(df) == 120
+    assert df['Project Name'].is_unique
+    overlap = df[df['Project Name'].isin([f'Synthetic Dam {i}' for i in range(80, 100)])]
+    assert (overlap['Status'] == 'Completed (revised)').all()
+    assert sources.stats()['duplicates'] == 20
+
+    # without a key only identical rows are dropped
+    df = load(SourceFrames(processes=2), folder, key=None)
+    assert len(df) == 140
+
+
+def test_reload_reads_only_the_changed_file(folder, monkeypatch):
+    sources = SourceFrames(processes=2)
+    load(sources, folder)
+    assert (sources.stats()['hits'], sources.stats()['misses']) == (0, 2)
+
+    before = source_fingerprint(str(folder))
+    load(sources, folder)
+    assert (sources.stats()['hits'], sources.stats()['misses']) == (2, 2)
+
+    parsed = []
+    monkeypatch.setattr(source_module, 'parse_source',
+                        lambda path, *args: parsed.append(path) or source_module.load_frame(path, *args))
+    changed = make_irr3(130).iloc[100:]
+    write_workbook(changed, str(folder / 'b_south.xlsx'))
+    df = load(sources, folder)
+    assert parsed == [str(folder / 'b_south.xlsx')]
+    assert (sources.stats()['hits'], sources.stats()['misses']) == (3, 3)
+    assert len(df) == 130
+    assert source_fingerprint(str(folder)) != before
+
+
+def test_file_missing_a_schema_column_is_rejected(folder):
+    write_workbook(make_irr3(10).drop(columns=['Dam_Type']), str(folder / 'c_east.xlsx'))
+    with pytest.raises(ValueError, match=r"c_east.xlsx: missing columns \['Dam_Type'\]"):
+        load(SourceFrames(processes=2), folder)
+
+    # the dashboards and /api see it as an unavailable dataset (503)
+    cache = DatasetCache()
+    with pytest.raises(DatasetUnavailable):
+        cache.get(str(folder), lambda path: load(SourceFrames(processes=2), path))
+    os.remove(folder / 'c_east.xlsx')
+    assert len(cache.get(str(folder), lambda path: load(SourceFrames(processes=2), path))) == 120
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from projects.spatial_index import GridIndex, haversine_km
+
+
+@pytest.fixture(scope='module')
+def points():
+    rng = np.random.default_rng(11)
+    n = 2000
+    # clustered around a few towns plus a uniform spread, as in the sheets
+    towns = rng.uniform([11.5, 74.5], [18.0, 78.0], (8, 2))
+    picks = towns[rng.integers(0, len(towns), n)] + rng.normal(0, 0.2, (n, 2))
+    picks[: n // 4] = rng.uniform([11.5, 74.0], [18.5, 78.5], (n // 4, 2))
+    return pd.DataFrame({
+        'id': np.arange(n) * 3,
+        'lat': picks[:, 0],
+        'lon': picks[:, 1],
+        'name': [f'Project {i}' for i in range(n)],
+    })
+
+
+def distances(points, lat, lon):
+    return haversine_km(lat, lon, points['lat'].to_numpy(), points['lon'].to_numpy())
+
+
+@pytest.mark.parametrize('bbox', [
+    (74.0, 11.0, 79.0, 19.0),
+    (76.0, 13.0, 76.5, 13.4),
+    (77.9, 17.9, 78.0, 18.0),
+    (60.0, 0.0, 61.0, 1.0),
+])
+def test_within_matches_a_scan(points, bbox):
+    index = GridIndex(points)
+    west, south, east, north = bbox
+    expected = points[points['lat'].between(south, north) & points['lon'].between(west, east)]
+    pd.testing.assert_frame_equal(index.within(bbox), expected)
+
+    keep = (points['id'] % 2 == 0).to_numpy()
+    pd.testing.assert_frame_equal(index.within(bbox, keep), expected[keep[expected.index]])
+
+
+@pytest.mark.parametrize('lat, lon, km', [(13.0, 76.0, 25), (15.5, 75.5, 80), (12.0, 78.4, 5), (20.0, 80.0, 100)])
+def test_radius_matches_a_scan(points, lat, lon, km):
+    index = GridIndex(points)
+    found = index.radius(lat, lon, km)
+    distance = distances(points, lat, lon)
+    expected = points[distance <= km]
+    assert sorted(found['id']) == sorted(expected['id'])
+    assert found['distance_km'].is_monotonic_increasing
+    np.testing.assert_allclose(found['distance_km'], np.sort(distance[distance <= km]))
+
+
+@pytest.mark.parametrize('lat, lon, k', [(13.0, 76.0, 1), (15.5, 75.5, 25), (25.0, 90.0, 10), (14.0, 76.0, 5000)])
+def test_nearest_matches_a_scan(points, lat, lon, k):
+    index = GridIndex(points)
+    found = index.nearest(lat, lon, k)
+    expected = np.sort(distances(points, lat, lon))[:k]
+    np.testing.assert_allclose(found['distance_km'], expected)
+
+    keep = (points['lat'] > 15).to_numpy()
+    found = index.nearest(lat, lon, k, keep)
+    expected = np.sort(distances(points[keep], lat, lon))[:k]
+    np.testing.assert_allclose(found['distance_km'], expected)
+    assert (found['lat'] > 15).all()
+
+
+def test_empty_index():
+    index = GridIndex(pd.DataFrame({'id': [], 'lat': [], 'lon': []}))
+    assert index.within((0, 0, 90, 90)).empty
+    assert index.radius(13, 76, 100).empty
+    assert index.nearest(13, 76, 5).empty
+
+
+def test_patched_index_matches_a_full_build(points):
+    old = points.iloc[:1800].reset_index(drop=True)
+    extra = points.iloc[1800:]
+    extra = extra[extra['lat'].between(old['lat'].min(), old['lat'].max())
+                  & extra['lon'].between(old['lon'].min(), old['lon'].max())]
+    new = pd.concat([old.iloc[100:], extra]).sample(frac=1, random_state=3).reset_index(drop=True)
+    matches = pd.Index(old['id']).get_indexer(new['id'])
+    kept = matches >= 0
+
+    base = GridIndex(old)
+    patched = GridIndex(new, base=base, kept=(matches[kept], np.flatnonzero(kept)))
+    full = GridIndex(new)
+    assert patched.cell == base.cell
+    for bbox in [(74.0, 11.0, 79.0, 19.0), (76.0, 13.0, 76.5, 13.4)]:
+        pd.testing.assert_frame_equal(patched.within(bbox), full.within(bbox))
+    for lat, lon in [(13.0, 76.0), (16.2, 77.1)]:
+        assert sorted(patched.radius(lat, lon, 40)['id']) == sorted(full.radius(lat, lon, 40)['id'])
+        np.testing.assert_allclose(patched.nearest(lat, lon, 30)['distance_km'],
+                                   full.nearest(lat, lon, 30)['distance_km'])
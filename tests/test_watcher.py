@@ -0,0 +1,150 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_tree, write_workbook
+from projects.dataset_cache import DatasetCache
+from projects.datasets import DATASETS
+from projects.precompute import precomputed
+from projects.search_index import DatasetTerms, search_index, tokenize
+from projects.sources import source_fingerprint
+from projects.spatial_index import GridIndex, spatial_indexes
+from projects.watcher import DataWatcher, diff_rows
+
+from tests.conftest import ROWS
+
+QUERIES = ['dam', 'synthetic dam 1', 'phase', 'hassan north', 'tumkuru', 'kalaburagi gravity']
+BOXES = [(74, 12, 78, 16), (75.5, 13, 76.5, 14), (70, 5, 90, 20)]
+
+
+# Workbooks of their own (they get rewritten), with a watcher that has not
+# seen them yet
+@pytest.fixture
+def workbooks(tmp_path, monkeypatch):
+    paths = write_tree(str(tmp_path), ROWS)
+    monkeypatch.chdir(tmp_path)
+    from app import invalidate_caches
+
+    invalidate_caches()
+    watcher = DataWatcher()
+    yield paths, watcher
+    watcher.stop()
+    invalidate_caches()
+
+
+def rewrite(path, reorder=False):
+    df = pd.read_excel(path)
+    df = df.iloc[50:].copy()
+    df['Location_District'] = df['Location_District'].astype(object)
+    df.iloc[:10, df.columns.get_loc('Location_District')] = 'Hassan North'
+    extra = df.iloc[10:30].copy()
+    extra['Project Name'] = extra['Project Name'] + ' Phase II'
+    df = pd.concat([df, extra], ignore_index=True)
+    if reorder:
+        df = df.iloc[::-1]
+    write_workbook(df, path)
+    return len(df)
+
+
+def wait_for(fn, seconds=60):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        value = fn()
+        if value is not None:
+            return value
+        time.sleep(0.1)
+    raise AssertionError("timed out")
+
+
+# Rows keyed by (name, occurrence of the name) and compared cell by cell
+def brute_diff(old, new, key):
+    def rows(df):
+        seen, keyed = {}, {}
+        for position, row in enumerate(df.itertuples(index=False)):
+            name = tuple(str(getattr(row, k)) for k in key)
+            seen[name] = seen.get(name, -1) + 1
+            keyed[name + (seen[name],)] = (position, tuple(row))
+        return keyed
+
+    before, after = rows(old), rows(new)
+    common = before.keys() & after.keys()
+    same = sorted((before[k][0], after[k][0]) for k in common if before[k][1] == after[k][1])
+    diff = {
+        'added': len(after.keys() - before.keys()),
+        'changed': len(common) - len(same),
+        'removed': len(before.keys() - after.keys()),
+    }
+    return diff, same
+
+
+def test_row_diff_matches_a_scan():
+    rng = np.random.default_rng(1)
+    old = pd.DataFrame({
+        'name': rng.choice([f'Tank {i}' for i in range(80)], 300),  # repeated names
+        'district': rng.choice(['Mysuru', 'Hassan'], 300),
+        'amount': rng.integers(0, 5, 300).astype(float),
+    })
+    new = old.drop(index=rng.choice(300, 30, replace=False))
+    new.loc[new.sample(20, random_state=1).index, 'amount'] += 1
+    new = pd.concat([new, old.sample(10, random_state=2).assign(name=lambda df: df['name'] + ' B')])
+    new = new.sample(frac=1, random_state=3)
+
+    diff, (old_positions, new_positions) = diff_rows(old, new, ['name'])
+    expected, same = brute_diff(old, new, ['name'])
+    assert diff == expected
+    assert sorted(zip(old_positions.tolist(), new_positions.tolist())) == same
+
+    # moving a column changes every row both versions have
+    diff, kept = diff_rows(old, new[['name', 'amount', 'district']], ['name'])
+    assert diff['changed'] == expected['changed'] + len(same)
+    assert not len(kept[0])
+
+
+def test_precomputed_views_follow_a_rewritten_workbook(workbooks):
+    paths, watcher = workbooks
+    dataset = DATASETS['irrigation3']
+    # published as when the watcher starts in a worker, before any build
+    DatasetCache.publish(dataset['path'], source_fingerprint(dataset['path']))
+    dataset['frames']()
+    precomputed.refresh('irrigation3', wait=True)
+    assert precomputed.get('irrigation3', {})['stats']['total_projects'] == ROWS
+
+    rows = rewrite(paths['irrigation3'])
+    watcher.refresh(dataset)
+    artifacts = wait_for(lambda: precomputed.get('irrigation3', {}))
+    assert artifacts['stats']['total_projects'] == rows != ROWS
+
+
+@pytest.mark.parametrize('reorder', [False, True])
+def test_patched_indexes_match_a_full_build(workbooks, reorder):
+    paths, watcher = workbooks
+    dataset = DATASETS['irrigation3']
+    dataset['frames']()
+    spatial_indexes.get(dataset)
+    search_index.terms(dataset)
+    patches = spatial_indexes.stats()['patches'], search_index.stats()['patches']
+
+    rewrite(paths['irrigation3'], reorder)
+    diff = watcher.refresh(dataset)
+    assert diff == {'added': 20, 'changed': 10, 'removed': 50}
+    assert spatial_indexes.stats()['patches'] == patches[0] + 1
+    assert search_index.stats()['patches'] == patches[1] + 1
+
+    patched = spatial_indexes.get(dataset)
+    full = GridIndex(dataset['points']({}))
+    for box in BOXES:
+        pd.testing.assert_frame_equal(patched.within(box), full.within(box))
+    lat, lon = full.points['lat'].iloc[0], full.points['lon'].iloc[0]
+    assert sorted(patched.radius(lat, lon, 50)['id']) == sorted(full.radius(lat, lon, 50)['id'])
+    np.testing.assert_allclose(patched.nearest(lat, lon, 10)['distance_km'], full.nearest(lat, lon, 10)['distance_km'])
+
+    patched = search_index.terms(dataset)
+    full = DatasetTerms(dataset['frames']().fields)
+    assert patched.terms == full.terms
+    for q in QUERIES:
+        rows, scores = patched.search(tokenize(q))
+        expected_rows, expected_scores = full.search(tokenize(q))
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_allclose(scores, expected_scores)